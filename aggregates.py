@@ -0,0 +1,345 @@
+"""
+Cricket Analytics - Delivery Aggregates
+Batting and bowling figures computed from ball-by-ball data with NumPy group-bys
+"""
+
+import threading
+
+import numpy as np
+
+# Inclusive over ranges, overs numbered from 1
+PHASES = {
+    'powerplay': (1, 6),
+    'middle': (7, 15),
+    'death': (16, 20),
+}
+
+# Dismissals that do not count as the bowler's wicket
+NOT_BOWLER_WICKETS = {'run out', 'retired hurt', 'retired out', 'retired not out',
+                      'obstructing the field'}
+
+# Field order of the rows given to DeliveryAggregates.append()
+ROW_FIELDS = ('id', 'match_no', 'innings', 'over', 'batting_team', 'bowling_team',
+              'batter', 'bowler', 'runs', 'extras', 'extra_type', 'player_out',
+              'wicket_kind', 'league', 'season', 'venue')
+
+# Bits of a match key given to the match number; the league and season code takes the rest
+MATCH_BITS = 20
+
+# Columns held per delivery; names and teams are stored as integer codes
+COLUMN_TYPES = {
+    'match_no': np.int32,
+    'partition': np.int32,      # code of the (league, season) pair
+    'match': np.int32,          # match number unique across seasons, see MATCH_BITS
+    'innings': np.int8,
+    'over': np.int16,
+    'venue': np.int32,
+    'batting_team': np.int32,
+    'bowling_team': np.int32,
+    'batter': np.int32,
+    'bowler': np.int32,
+    'player_out': np.int32,
+    'runs': np.int16,           # off the bat
+    'conceded': np.int16,       # charged to the bowler: bat runs plus wides and no-balls
+    'faced': np.bool_,          # counts as a ball faced (not a wide)
+    'legal': np.bool_,          # counts as a ball bowled (not a wide or no-ball)
+    'bowler_wicket': np.bool_,
+}
+
+BATTING_SORTS = ('runs', 'balls', 'average', 'strike_rate', 'fours', 'sixes', 'matches')
+BOWLING_SORTS = ('wickets', 'balls', 'economy', 'average', 'strike_rate', 'dots', 'matches')
+# Bowling figures where lower is better
+ASCENDING_SORTS = {'economy', 'average', 'strike_rate'}
+
+APPEND_CHUNK = 100000
+
+class Names:
+    """Interns strings as integer codes; code 0 stands for a missing value"""
+
+    def __init__(self):
+        self.codes = {None: 0, '': 0}
+        self.names = [None]
+
+    def __len__(self):
+        return len(self.names)
+
+    def encode(self, values):
+        codes = self.codes
+        for value in set(values) - codes.keys():
+            codes[value] = len(self.names)
+            self.names.append(value)
+        return np.fromiter(map(codes.__getitem__, values), dtype=np.int32, count=len(values))
+
+    def lookup(self, name):
+        """Code for name, or -1 (matching nothing) if it has never been seen"""
+        return self.codes.get(name, -1) if name else -1
+
+def count(codes, n, where=None, weights=None):
+    """Per-code totals: rows (or weights) for each code, optionally only where `where`"""
+    if where is not None:
+        codes = codes[where]
+        weights = weights[where] if weights is not None else None
+    if weights is None:
+        return np.bincount(codes, minlength=n)
+    return np.bincount(codes, weights=weights, minlength=n).astype(np.int64)
+
+def distinct(keys):
+    """Sorted distinct values of an int64 array"""
+    if len(keys) < 2:
+        return np.sort(keys)
+    # Consecutive balls mostly share a bowler or batter, so drop those repeats before sorting
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    keys.sort()
+    return keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+
+def match_pairs(match_no, codes):
+    """Sorted distinct (match, player) pairs packed into one int64 each"""
+    return distinct((match_no.astype(np.int64) << 32) | codes.astype(np.int64))
+
+def matches_from_pairs(pairs, n):
+    return np.bincount((pairs & 0xFFFFFFFF).astype(np.int64), minlength=n)
+
+def batting_sums(c, n):
+    batter, runs, faced = c['batter'], c['runs'], c['faced']
+    return {
+        'runs': count(batter, n, weights=runs),
+        'balls': count(batter, n, where=faced),
+        'outs': count(c['player_out'], n),
+        'fours': count(batter, n, where=runs == 4),
+        'sixes': count(batter, n, where=runs == 6),
+        'dots': count(batter, n, where=faced & (runs == 0)),
+    }
+
+def bowling_sums(c, n):
+    bowler, legal = c['bowler'], c['legal']
+    return {
+        'balls': count(bowler, n, where=legal),
+        'runs': count(bowler, n, weights=c['conceded']),
+        'wickets': count(bowler, n, where=c['bowler_wicket']),
+        'dots': count(bowler, n, where=legal & (c['conceded'] == 0)),
+    }
+
+def ratio(numerator, denominator, scale=1):
+    """numerator / denominator * scale, NaN where the denominator is 0"""
+    out = np.full(len(numerator), np.nan)
+    np.divide(numerator * scale, denominator, out=out, where=denominator > 0)
+    return out
+
+def rounded(value):
+    return None if np.isnan(value) else round(float(value), 2)
+
+class DeliveryAggregates:
+    """Columnar copy of the deliveries table with vectorized batting and bowling figures
+
+    Rows arrive in id order through append(), so a new match is added without
+    reloading anything already held. Every figure is an np.bincount over
+    player codes, under a boolean mask when the request is sliced by venue,
+    team, opponent, phase, over range or innings. Whole-career sums are
+    updated from just the appended rows, so unsliced leaderboards need no pass
+    over the data at all.
+
+    Not thread safe on its own; hold .lock while appending.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.players = Names()
+        self.teams = Names()
+        self.venues = Names()
+        self.partitions = Names()   # (league, season) pairs
+        self.labels = Names()   # extra types and dismissal kinds
+        self.columns = {name: np.empty(0, dtype) for name, dtype in COLUMN_TYPES.items()}
+        # The data generation loaded, plus what is needed to notice edits behind our back
+        self.generation = None
+        self.last_id = 0
+        self.count = 0
+        self.run_total = 0
+        self._totals = {'batting': batting_sums(self.columns, 0),
+                        'bowling': bowling_sums(self.columns, 0)}
+        self._pairs = {'batting': np.empty(0, np.int64), 'bowling': np.empty(0, np.int64)}
+        self._last_team = {'batting': np.zeros(0, np.int32), 'bowling': np.zeros(0, np.int32)}
+
+    def _encode(self, rows):
+        """Column arrays for one chunk of ROW_FIELDS tuples"""
+        f = dict(zip(ROW_FIELDS, zip(*rows)))
+        runs = np.array([r or 0 for r in f['runs']], dtype=np.int16)
+        extras = np.array([e or 0 for e in f['extras']], dtype=np.int16)
+        labels = self.labels
+        extra_type = labels.encode(f['extra_type'])
+        wide = extra_type == labels.lookup('wide')
+        noball = extra_type == labels.lookup('noball')
+        kind = labels.encode(f['wicket_kind'])
+        not_bowlers = [labels.lookup(k) for k in NOT_BOWLER_WICKETS]
+        bowler_wicket = (kind != 0) & ~np.isin(kind, not_bowlers)
+        match_no = np.array(f['match_no'], dtype=np.int32)
+        partition = self.partitions.encode(list(zip(f['league'], f['season'])))
+        chunk = {
+            'match_no': match_no,
+            'partition': partition,
+            'match': (partition << MATCH_BITS) | match_no,
+            'innings': np.array(f['innings'], dtype=np.int8),
+            'over': np.array(f['over'], dtype=np.int16),
+            'venue': self.venues.encode(f['venue']),
+            'batting_team': self.teams.encode(f['batting_team']),
+            'bowling_team': self.teams.encode(f['bowling_team']),
+            'batter': self.players.encode(f['batter']),
+            'bowler': self.players.encode(f['bowler']),
+            'player_out': self.players.encode(f['player_out']),
+            'runs': runs,
+            'conceded': runs + np.where(wide | noball, extras, 0).astype(np.int16),
+            'faced': ~wide,
+            'legal': ~(wide | noball),
+            'bowler_wicket': bowler_wicket,
+        }
+        return chunk, f['id'][-1]
+
+    def append(self, rows):
+        """Add deliveries given as ROW_FIELDS tuples in ascending id order; returns how many"""
+        chunks = []
+        batch = []
+        last_id = self.last_id
+        for row in rows:
+            batch.append(tuple(row))
+            if len(batch) >= APPEND_CHUNK:
+                chunk, last_id = self._encode(batch)
+                chunks.append(chunk)
+                batch = []
+        if batch:
+            chunk, last_id = self._encode(batch)
+            chunks.append(chunk)
+        if not chunks:
+            return 0
+
+        new = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in COLUMN_TYPES}
+        self.columns = {name: np.concatenate([self.columns[name], new[name]])
+                        for name in COLUMN_TYPES}
+        added = len(new['runs'])
+        self.count += added
+        self.run_total += int(new['runs'].sum(dtype=np.int64))
+        self.last_id = last_id
+        self._update_totals(new)
+        return added
+
+    def _update_totals(self, new):
+        """Fold the sums of newly appended rows into the whole-career totals"""
+        n = len(self.players)
+        for role, sums in (('batting', batting_sums(new, n)), ('bowling', bowling_sums(new, n))):
+            totals = self._totals[role]
+            for name, values in sums.items():
+                totals[name] = np.pad(totals[name], (0, n - len(totals[name]))) + values
+            player = new['batter' if role == 'batting' else 'bowler']
+            self._pairs[role] = np.union1d(self._pairs[role], match_pairs(new['match'], player))
+            # Later deliveries overwrite earlier ones, leaving each player's latest team
+            last_team = np.pad(self._last_team[role], (0, n - len(self._last_team[role])))
+            last_team[player] = new[f'{role}_team']
+            self._last_team[role] = last_team
+
+    def mask(self, role, league=None, season=None, venue=None, team=None, opponent=None,
+             phase=None, overs=None, innings=None):
+        """Boolean row mask for a slice, or None when the slice is everything
+
+        team and opponent are from the point of view of role: the batting side
+        for 'batting' figures, the bowling side for 'bowling'. overs is an
+        inclusive (first, last) pair; phase names one of PHASES.
+        """
+        c = self.columns
+        own, other = ('batting_team', 'bowling_team') if role == 'batting' else ('bowling_team', 'batting_team')
+        conditions = []
+        if league or season:
+            codes = [code for code, pair in enumerate(self.partitions.names)
+                     if pair and (not league or pair[0] == league) and (not season or pair[1] == season)]
+            conditions.append(np.isin(c['partition'], codes))
+        if venue:
+            conditions.append(c['venue'] == self.venues.lookup(venue))
+        if team:
+            conditions.append(c[own] == self.teams.lookup(team))
+        if opponent:
+            conditions.append(c[other] == self.teams.lookup(opponent))
+        if phase:
+            if phase not in PHASES:
+                raise ValueError(f"unknown phase {phase!r}; expected one of {', '.join(PHASES)}")
+            overs = PHASES[phase]
+        if overs:
+            first, last = overs
+            conditions.append((c['over'] >= first) & (c['over'] <= last))
+        if innings:
+            conditions.append(c['innings'] == innings)
+        if not conditions:
+            return None
+        return np.logical_and.reduce(conditions)
+
+    def _sliced(self, role, filters):
+        """(sums, matches) for the slice described by filters"""
+        n = len(self.players)
+        m = self.mask(role, **filters)
+        if m is None:
+            totals = self._totals[role]
+            return totals, matches_from_pairs(self._pairs[role], n)
+        c = {name: values[m] for name, values in self.columns.items()}
+        sums = batting_sums(c, n) if role == 'batting' else bowling_sums(c, n)
+        player = c['batter' if role == 'batting' else 'bowler']
+        return sums, matches_from_pairs(match_pairs(c['match'], player), n)
+
+    def _ranked(self, role, figures, sort, n, sorts):
+        if sort not in sorts:
+            raise ValueError(f"cannot sort {role} by {sort!r}; expected one of {', '.join(sorts)}")
+        players = np.nonzero(figures['balls'])[0]
+        players = players[players != 0]
+        key = figures[sort][players].astype(np.float64)
+        if not (role == 'bowling' and sort in ASCENDING_SORTS):
+            key = -key
+        # Equal figures are ordered by name, so every worker ranks them the same way
+        names = self.players.names
+        by_name = np.empty(len(players), dtype=np.int64)
+        by_name[sorted(range(len(players)), key=lambda i: names[players[i]])] = np.arange(len(players))
+        ranked = players[np.lexsort((by_name, key))]
+        # n=None ranks everyone; any number is a row count, never a slice from the end
+        return ranked if n is None else ranked[:max(n, 0)]
+
+    def batting(self, n=None, sort='runs', **filters):
+        """Batting figures per player for a slice, best first; a list of dicts"""
+        sums, matches = self._sliced('batting', filters)
+        figures = dict(sums, matches=matches,
+                       average=ratio(sums['runs'], sums['outs']),
+                       strike_rate=ratio(sums['runs'], sums['balls'], 100))
+        team = self._last_team['batting']
+        return [{
+            'rank': rank,
+            'player_name': self.players.names[p],
+            'team': self.teams.names[team[p]],
+            'matches': int(figures['matches'][p]),
+            'runs': int(figures['runs'][p]),
+            'balls': int(figures['balls'][p]),
+            'outs': int(figures['outs'][p]),
+            'average': rounded(figures['average'][p]),
+            'strike_rate': rounded(figures['strike_rate'][p]),
+            'fours': int(figures['fours'][p]),
+            'sixes': int(figures['sixes'][p]),
+            'dots': int(figures['dots'][p]),
+        } for rank, p in enumerate(self._ranked('batting', figures, sort, n, BATTING_SORTS), 1)]
+
+    def bowling(self, n=None, sort='wickets', **filters):
+        """Bowling figures per player for a slice, best first; a list of dicts"""
+        sums, matches = self._sliced('bowling', filters)
+        figures = dict(sums, matches=matches,
+                       economy=ratio(sums['runs'], sums['balls'], 6),
+                       average=ratio(sums['runs'], sums['wickets']),
+                       strike_rate=ratio(sums['balls'], sums['wickets']))
+        team = self._last_team['bowling']
+        return [{
+            'rank': rank,
+            'player_name': self.players.names[p],
+            'team': self.teams.names[team[p]],
+            'matches': int(figures['matches'][p]),
+            'overs': f"{figures['balls'][p] // 6}.{figures['balls'][p] % 6}",
+            'balls': int(figures['balls'][p]),
+            'runs': int(figures['runs'][p]),
+            'wickets': int(figures['wickets'][p]),
+            'economy': rounded(figures['economy'][p]),
+            'average': rounded(figures['average'][p]),
+            'strike_rate': rounded(figures['strike_rate'][p]),
+            'dots': int(figures['dots'][p]),
+        } for rank, p in enumerate(self._ranked('bowling', figures, sort, n, BOWLING_SORTS), 1)]
@@ -1,18 +1,65 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request, make_response, abort
 from flask_sqlalchemy import SQLAlchemy
+from functools import wraps
+from datetime import date, datetime
 from config import Config
-import os
+from cache import ResponseCache
+from database import engine_options, install_engine_profile
+from aggregates import DeliveryAggregates, ROW_FIELDS, ASCENDING_SORTS
+from venues import canonical_venue, venue_slug
+from search import PlayerIndex
+from stats_tables import StatsSnapshot
+from assets import Assets
+from metrics import Metrics
+import re
+import json
 
 app = Flask(__name__)
 app.config.from_object(Config)
+app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
 db = SQLAlchemy(app)
+with app.app_context():
+    install_engine_profile(db.engine, app.config['SQLITE_PRAGMAS'],
+                           read_only_requests=app.config['DB_READ_ONLY_REQUESTS'])
+response_cache = ResponseCache(app.config['RESPONSE_CACHE_PATH'])
+# Fingerprinted static files (python assets.py build)
+assets = Assets(app.static_folder)
+assets.init_app(app)
+# Request, SQL, template and cache timings for /metrics, summed across workers
+metrics = Metrics(app.config['METRICS_PATH'], app.config['METRICS_FLUSH_SECONDS'])
+with app.app_context():
+    metrics.init_app(app, db.engine)
 
 # Database Models
+
+# Every table is partitioned by league and season; indexes lead on these columns
+# so a season's queries cost the same however much history is stored
+PARTITION = ('league', 'season')
+
+def partition_index(name, *columns, unique=False):
+    return db.Index(name, *PARTITION, *columns, unique=unique)
+
 class BBLMatch(db.Model):
+    # Natural key matching incoming rows to stored ones on incremental imports
+    natural_key = PARTITION + ('match_no',)
+    # Filled in at import time from other tables, never by source files; an
+    # upsert neither writes nor compares them, so unchanged rows stay unchanged
+    maintained_columns = ('venue_id',)
+    __table_args__ = (
+        db.Index('uq_bbl_match_natural_key', *natural_key, unique=True),
+        partition_index('ix_bbl_match_season_date', 'match_date'),
+        partition_index('ix_bbl_match_season_margin_runs', 'margin_runs'),
+        partition_index('ix_bbl_match_season_margin_wickets', 'margin_wickets'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
+    league = db.Column(db.String(20))
+    season = db.Column(db.String(10))
     match_no = db.Column(db.Integer)
     date = db.Column(db.String(20))
+    match_date = db.Column(db.Date)
     venue = db.Column(db.String(100))
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), index=True)  # set by venues.refresh_venues
     team1 = db.Column(db.String(50))
     score1 = db.Column(db.String(20))
     team2 = db.Column(db.String(50))
@@ -22,11 +69,30 @@ class BBLMatch(db.Model):
     margin = db.Column(db.String(30))
     player_of_match = db.Column(db.String(50))
 
+    # Parsed from the text columns at ingest (scores.match_numbers); balls are legal balls
+    runs1 = db.Column(db.Integer, index=True)
+    wickets1 = db.Column(db.Integer)
+    balls1 = db.Column(db.Integer)
+    runs2 = db.Column(db.Integer, index=True)
+    wickets2 = db.Column(db.Integer)
+    balls2 = db.Column(db.Integer)
+    margin_runs = db.Column(db.Integer)
+    margin_wickets = db.Column(db.Integer)
+
 class BBLBatting(db.Model):
+    natural_key = PARTITION + ('player_name', 'team')
+    __table_args__ = (
+        db.Index('uq_bbl_batting_natural_key', *natural_key, unique=True),
+        partition_index('ix_bbl_batting_season_rank', 'rank'),
+        partition_index('ix_bbl_batting_season_runs', 'runs'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
+    league = db.Column(db.String(20))
+    season = db.Column(db.String(10))
     rank = db.Column(db.Integer)
-    player_name = db.Column(db.String(100))
-    team = db.Column(db.String(50))
+    player_name = db.Column(db.String(100), index=True)
+    team = db.Column(db.String(50), index=True)
     matches = db.Column(db.Integer)
     runs = db.Column(db.Integer)
     average = db.Column(db.Float)
@@ -38,10 +104,19 @@ class BBLBatting(db.Model):
     sixes = db.Column(db.Integer)
 
 class BBLBowling(db.Model):
+    natural_key = PARTITION + ('player_name', 'team')
+    __table_args__ = (
+        db.Index('uq_bbl_bowling_natural_key', *natural_key, unique=True),
+        partition_index('ix_bbl_bowling_season_rank', 'rank'),
+        partition_index('ix_bbl_bowling_season_wickets', 'wickets'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
+    league = db.Column(db.String(20))
+    season = db.Column(db.String(10))
     rank = db.Column(db.Integer)
-    player_name = db.Column(db.String(100))
-    team = db.Column(db.String(50))
+    player_name = db.Column(db.String(100), index=True)
+    team = db.Column(db.String(50), index=True)
     matches = db.Column(db.Integer)
     wickets = db.Column(db.Integer)
     best_figures = db.Column(db.String(10))
@@ -49,37 +124,491 @@ class BBLBowling(db.Model):
     economy = db.Column(db.Float)
     strike_rate = db.Column(db.Float)
 
+class Delivery(db.Model):
+    """One ball bowled; overs count from 1 and balls from 1 within the over, extras included"""
+    natural_key = PARTITION + ('match_no', 'innings', 'over', 'ball')
+    __table_args__ = (db.Index('uq_delivery_natural_key', *natural_key, unique=True),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    league = db.Column(db.String(20))
+    season = db.Column(db.String(10))
+    match_no = db.Column(db.Integer, nullable=False)
+    innings = db.Column(db.Integer, nullable=False)
+    over = db.Column(db.Integer, nullable=False)
+    ball = db.Column(db.Integer, nullable=False)
+    batting_team = db.Column(db.String(50))
+    bowling_team = db.Column(db.String(50))
+    batter = db.Column(db.String(100))
+    bowler = db.Column(db.String(100))
+    runs = db.Column(db.Integer)            # off the bat
+    extras = db.Column(db.Integer)
+    extra_type = db.Column(db.String(10))   # wide, noball, bye, legbye, penalty
+    player_out = db.Column(db.String(100))
+    wicket_kind = db.Column(db.String(30))  # caught, bowled, run out, ...
+
+class Standing(db.Model):
+    """Points table row per team and season, kept current by triggers on bbl_match (standings.py)"""
+    __table_args__ = (
+        partition_index('uq_standing_team', 'team', unique=True),
+        partition_index('ix_standing_rank', 'points', 'nrr'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    league = db.Column(db.String(20), nullable=False)
+    season = db.Column(db.String(10), nullable=False)
+    team = db.Column(db.String(50), nullable=False)
+    played = db.Column(db.Integer, nullable=False, default=0)
+    won = db.Column(db.Integer, nullable=False, default=0)
+    lost = db.Column(db.Integer, nullable=False, default=0)
+    no_result = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0)
+    runs_for = db.Column(db.Integer, nullable=False, default=0)
+    balls_for = db.Column(db.Integer, nullable=False, default=0)
+    runs_against = db.Column(db.Integer, nullable=False, default=0)
+    balls_against = db.Column(db.Integer, nullable=False, default=0)
+    nrr = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+
+class Venue(db.Model):
+    """A ground; the free-text BBLMatch.venue variants map to one row (venues.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    slug = db.Column(db.String(100), unique=True, nullable=False)
+
+class VenueStats(db.Model):
+    """Per-venue match figures for one league and season, recomputed at import time"""
+    league = db.Column(db.String(20), primary_key=True)
+    season = db.Column(db.String(10), primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), primary_key=True)
+    matches = db.Column(db.Integer, nullable=False)
+    results = db.Column(db.Integer, nullable=False)         # matches won by either side
+    bat_first_wins = db.Column(db.Integer, nullable=False)
+    chase_wins = db.Column(db.Integer, nullable=False)
+    first_innings = db.Column(db.Integer, nullable=False)   # innings with a parsed score
+    avg_first_innings = db.Column(db.Float)
+    avg_second_innings = db.Column(db.Float)
+    highest_total = db.Column(db.Integer)
+
+class VenuePerformer(db.Model):
+    """Leading players at a venue in one league and season, per role (batting, bowling, player_of_match)"""
+    __table_args__ = (partition_index('ix_venue_performer_rank', 'venue_id', 'role', 'rank'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    league = db.Column(db.String(20), nullable=False)
+    season = db.Column(db.String(10), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
+    role = db.Column(db.String(20), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    player = db.Column(db.String(100))
+    team = db.Column(db.String(50))
+    runs = db.Column(db.Integer)
+    balls = db.Column(db.Integer)
+    wickets = db.Column(db.Integer)
+    awards = db.Column(db.Integer)
+
+def overs(balls):
+    """Legal balls in overs notation, e.g. 111 -> 18.3"""
+    return f"{balls // 6}.{balls % 6}" if balls % 6 else str(balls // 6)
+
+class DataGeneration(db.Model):
+    """Single-row counter bumped by every import so caches know the data changed"""
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Last generation that edited or removed deliveries or matches, rather than only adding them
+    rewritten_generation = db.Column(db.Integer, default=0)
+
+def current_generation():
+    """Return (generation, updated_at) for the data currently in the database"""
+    row = db.session.get(DataGeneration, 1)
+    if row is None:
+        return 0, datetime(1970, 1, 1)
+    return row.generation, row.updated_at
+
+def bump_generation(rewrite=False):
+    """Mark the data as changed; call inside the import transaction before commit
+
+    Pass rewrite=True when stored deliveries or matches were edited or
+    removed, so workers reload their delivery aggregates instead of appending.
+    """
+    row = db.session.get(DataGeneration, 1)
+    if row is None:
+        row = DataGeneration(id=1, generation=0)
+        db.session.add(row)
+    row.generation += 1
+    row.updated_at = datetime.utcnow().replace(microsecond=0)
+    if rewrite:
+        row.rewritten_generation = row.generation
+    return row.generation
+
+def rewritten_generation():
+    """Generation of the last import that edited or removed deliveries or matches"""
+    row = db.session.get(DataGeneration, 1)
+    return (row.rewritten_generation or 0) if row is not None else 0
+
+def cached(conditional=False, params=()):
+    """Serve a view from the shared response cache for the current data generation
+
+    Entries are keyed by the view, its URL arguments and the query parameters
+    it reads, which it must list in params; anything else in the query string
+    cannot change the response and is left out of the key, so made-up
+    parameters do not each add an entry.
+
+    With conditional=True the response also carries an ETag and Last-Modified
+    derived from the generation, and matching conditional GETs get a 304.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            generation, updated_at = current_generation()
+            enabled = app.config['RESPONSE_CACHE_ENABLED']
+            # Pages name the hashed asset files, so a new asset build is a new entry
+            key = json.dumps([assets.version, view.__name__, args, sorted(kwargs.items()),
+                              [(name, request.args.getlist(name)) for name in params]])
+
+            hit = response_cache.get(key, generation) if enabled else None
+            if enabled:
+                metrics.cache_lookup('response', hit is not None)
+            if hit is not None:
+                body, mimetype = hit
+                response = app.response_class(body, mimetype=mimetype)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if enabled and response.status_code == 200:
+                    response_cache.set(key, generation, response.get_data(), response.mimetype)
+
+            if conditional:
+                response.set_etag(f'gen-{generation}-{assets.version}' if assets.version else f'gen-{generation}')
+                response.last_modified = updated_at
+                response.cache_control.no_cache = True
+                response = response.make_conditional(request)
+            return response
+        return wrapper
+    return decorator
+
+# Ball-by-ball aggregates, held in memory per worker
+delivery_aggregates = DeliveryAggregates()
+
+def refreshed_aggregates():
+    """The worker's delivery aggregates, caught up with the database
+
+    Checked once per data generation: deliveries with ids above the last one
+    loaded are appended, so a new match costs only its own rows. Everything
+    is reloaded when an import since the last load edited or removed
+    deliveries or matches (bump_generation(rewrite=True)), and, for writes
+    that bypass the importers, when the count or run total of the loaded
+    ids has changed.
+    """
+    engine = delivery_aggregates
+    generation, _ = current_generation()
+    with engine.lock:
+        if engine.generation == generation:
+            metrics.cache_lookup('aggregates', True)
+            return engine
+        metrics.cache_lookup('aggregates', False)
+        if engine.generation is not None and rewritten_generation() > engine.generation:
+            engine.reset()
+        count, runs = db.session.query(
+            db.func.count(Delivery.id), db.func.coalesce(db.func.sum(Delivery.runs), 0)
+        ).filter(Delivery.id <= engine.last_id).one()
+        if (count, runs) != (engine.count, engine.run_total):
+            engine.reset()
+        columns = [getattr(Delivery, name) for name in ROW_FIELDS if name != 'venue']
+        rows = db.session.execute(
+            db.select(*columns, db.func.coalesce(Venue.name, BBLMatch.venue))
+            .outerjoin(BBLMatch, db.and_(BBLMatch.league == Delivery.league,
+                                         BBLMatch.season == Delivery.season,
+                                         BBLMatch.match_no == Delivery.match_no))
+            .outerjoin(Venue, Venue.id == BBLMatch.venue_id)
+            .where(Delivery.id > engine.last_id)
+            .order_by(Delivery.id)
+            .execution_options(yield_per=50000)
+        )
+        engine.append(rows)
+        engine.generation = generation
+    return engine
+
+# Player name typeahead, held in memory per worker
+player_index = PlayerIndex()
+
+def refreshed_player_index():
+    """The worker's player index, caught up with the database once per data generation
+
+    Rows with ids above those already indexed are added; if any indexed row
+    was renamed or deleted the index is rebuilt from scratch.
+    """
+    index = player_index
+    generation, _ = current_generation()
+    with index.lock:
+        if index.generation == generation:
+            metrics.cache_lookup('player_index', True)
+            return index
+        metrics.cache_lookup('player_index', False)
+        sources = {'batting': BBLBatting, 'bowling': BBLBowling}
+        for source, model in sources.items():
+            stored = dict(db.session.query(model.id, model.player_name)
+                          .filter(model.id <= index.last_id(source)))
+            if stored != index.loaded(source):
+                index.reset()
+                break
+        for source, model in sources.items():
+            index.add(source, db.session.query(model.id, model.player_name)
+                      .filter(model.id > index.last_id(source)).order_by(model.id))
+        index.generation = generation
+    return index
+
+# Batting, bowling and match tables, held in memory per worker
+stats_snapshot = StatsSnapshot()
+STATS_TABLES = {'batting': BBLBatting, 'bowling': BBLBowling, 'matches': BBLMatch}
+
+def numeric_columns(model):
+    """Number columns of a model other than its keys, which leaderboards can rank by"""
+    columns = []
+    for column in model.__table__.columns:
+        if column.primary_key or column.foreign_keys:
+            continue
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            continue
+        if python_type in (int, float):
+            columns.append(column.name)
+    return columns
+
+def refreshed_stats():
+    """The worker's stats snapshot, reloaded once per data generation
+
+    Pages and APIs over the batting, bowling and match tables read from it,
+    so after the first request of a generation they run no SQL of their own.
+    """
+    snapshot = stats_snapshot
+    generation, _ = current_generation()
+    with snapshot.lock:
+        if snapshot.generation == generation:
+            metrics.cache_lookup('stats_snapshot', True)
+            return snapshot
+        metrics.cache_lookup('stats_snapshot', False)
+        sources = {}
+        for name, model in STATS_TABLES.items():
+            table = model.__table__
+            rows = db.session.execute(db.select(table).order_by(table.c.id)).tuples()
+            sources[name] = ([c.name for c in table.columns], rows, numeric_columns(model))
+        snapshot.load(sources)
+        snapshot.generation = generation
+    return snapshot
+
+# Query parameters of the analytics APIs: aggregate_filters() and sort
+AGGREGATE_PARAMS = ('league', 'season', 'venue', 'team', 'opponent', 'phase', 'innings',
+                    'overs', 'n', 'sort')
+
+def aggregate_filters():
+    """Slice and ranking arguments for the aggregates from the query string"""
+    args = request.args
+    filters = {
+        'league': args.get('league'),
+        'season': args.get('season'),
+        # Any name a ground appears under ("MCG") selects its canonical name
+        'venue': canonical_venue(args.get('venue')),
+        'team': args.get('team'),
+        'opponent': args.get('opponent'),
+        'phase': args.get('phase'),
+        'innings': args.get('innings', type=int),
+    }
+    overs = args.get('overs')
+    if overs:
+        # "16-20", or "7" for a single over
+        try:
+            first, _, last = overs.partition('-')
+            filters['overs'] = (int(first), int(last or first))
+        except ValueError:
+            raise ValueError(f"overs must look like 16-20, not {overs!r}")
+    n = max(min(args.get('n', default=50, type=int), 1000), 1)
+    return n, {name: value for name, value in filters.items() if value}
+
+# League and season scoping
+SEASON_PATTERN = re.compile(r'^\d{4}(-\d{2})?$')
+
+# Query parameters season_scope() reads when the URL names no season
+SEASON_PARAMS = ('league', 'season')
+
+def season_scope(league=None, season=None):
+    """(league, season) from the URL, else ?league=&season=, else the default season
+
+    Aborts with 404 for a league the site does not cover or a malformed season.
+    """
+    league = league or request.args.get('league') or app.config['DEFAULT_LEAGUE']
+    season = season or request.args.get('season') or app.config['DEFAULT_SEASON']
+    if league not in app.config['LEAGUES'] or not SEASON_PATTERN.match(season):
+        abort(404)
+    return league, season
+
+def in_season(model, league, season):
+    return model.query.filter_by(league=league, season=season)
+
+@app.context_processor
+def season_navigation():
+    """Seasons with match data, newest first, plus the page's own league and season"""
+    seasons = refreshed_stats().seasons('matches')
+    # Newest season first within each league, the default league leading
+    seasons.sort(key=lambda pair: pair[1], reverse=True)
+    seasons.sort(key=lambda pair: (pair[0] != app.config['DEFAULT_LEAGUE'], pair[0]))
+    return {
+        'league_names': app.config['LEAGUES'],
+        'nav_seasons': seasons,
+        'nav_league': app.config['DEFAULT_LEAGUE'],
+        'nav_season': app.config['DEFAULT_SEASON'],
+    }
+
+def season_context(league, season):
+    """Template variables naming the league and season a page shows"""
+    return {'league': league, 'season': season, 'league_name': app.config['LEAGUES'][league],
+            'nav_league': league, 'nav_season': season}
+
 # Routes
 @app.route('/')
+@cached(params=SEASON_PARAMS)
 def index():
     # Get top stats for dashboard
-    top_batsmen = BBLBatting.query.order_by(BBLBatting.runs.desc()).limit(5).all()
-    top_bowlers = BBLBowling.query.order_by(BBLBowling.wickets.desc()).limit(5).all()
-    recent_matches = BBLMatch.query.order_by(BBLMatch.match_no.desc()).limit(10).all()
+    league, season = season_scope()
+    stats = refreshed_stats()
+    top_batsmen = stats.table('batting', league, season).top('runs', 5)
+    top_bowlers = stats.table('bowling', league, season).top('wickets', 5)
+    recent_matches = stats.table('matches', league, season).top('match_no', 10)
 
     return render_template('index.html', 
                          top_batsmen=top_batsmen,
                          top_bowlers=top_bowlers,
-                         recent_matches=recent_matches)
+                         recent_matches=recent_matches,
+                         **season_context(league, season))
 
+@app.route('/<league>/<season>/matches')
+def season_matches(league, season):
+    league, season = season_scope(league, season)
+    has_data = len(refreshed_stats().table('matches', league, season)) > 0
+    return render_template('bbl_matches.html', has_data=has_data, **season_context(league, season))
+
+@app.route('/<league>/<season>/batting')
+def season_batting(league, season):
+    league, season = season_scope(league, season)
+    has_data = len(refreshed_stats().table('batting', league, season)) > 0
+    return render_template('bbl_batting.html', has_data=has_data, **season_context(league, season))
+
+@app.route('/<league>/<season>/bowling')
+def season_bowling(league, season):
+    league, season = season_scope(league, season)
+    has_data = len(refreshed_stats().table('bowling', league, season)) > 0
+    return render_template('bbl_bowling.html', has_data=has_data, **season_context(league, season))
+
+@app.route('/<league>/<season>/standings')
+@cached()
+def season_standings(league, season):
+    league, season = season_scope(league, season)
+    standings = (in_season(Standing, league, season)
+                 .order_by(Standing.points.desc(), Standing.nrr.desc()).all())
+    return render_template('bbl_standings.html', standings=standings, overs=overs,
+                           **season_context(league, season))
+
+# The original BBL pages show the default season
 @app.route('/bbl/matches')
 def bbl_matches():
-    matches = BBLMatch.query.order_by(BBLMatch.match_no).all()
-    return render_template('bbl_matches.html', matches=matches)
+    return season_matches(*season_scope('bbl'))
 
 @app.route('/bbl/batting')
 def bbl_batting():
-    players = BBLBatting.query.order_by(BBLBatting.rank).all()
-    return render_template('bbl_batting.html', players=players)
+    return season_batting(*season_scope('bbl'))
 
 @app.route('/bbl/bowling')
 def bbl_bowling():
-    players = BBLBowling.query.order_by(BBLBowling.rank).all()
-    return render_template('bbl_bowling.html', players=players)
+    return season_bowling(*season_scope('bbl'))
+
+@app.route('/bbl/standings')
+def bbl_standings():
+    return season_standings(*season_scope('bbl'))
+
+# DataTables server-side endpoints
+MATCH_COLUMNS = ['match_no', 'date', 'venue', 'team1', 'score1', 'team2', 'score2', 'winner', 'margin']
+BATTING_COLUMNS = ['rank', 'player_name', 'team', 'matches', 'runs', 'average', 'strike_rate',
+                   'high_score', 'hundreds', 'fifties', 'fours', 'sixes']
+BOWLING_COLUMNS = ['rank', 'player_name', 'team', 'matches', 'wickets', 'best_figures',
+                   'average', 'economy', 'strike_rate']
+
+DATATABLES_PAGE_SIZE = 25
+DATATABLES_MAX_PAGE_SIZE = 500
+
+def datatables_page(name, columns, search_columns, default_order, league, season):
+    """Answer a DataTables server-side request with one page of one season's rows
+
+    Ordering uses the stats snapshot's precomputed sort orders, with ties
+    broken on id in the direction of the last sort key so pages never overlap
+    or skip rows. default_order is a (column_name, descending) pair used when
+    the client sends no order.
+    """
+    args = request.args
+    draw = args.get('draw', default=0, type=int)
+    start = max(args.get('start', default=0, type=int), 0)
+    length = args.get('length', default=DATATABLES_PAGE_SIZE, type=int)
+    if length < 0 or length > DATATABLES_MAX_PAGE_SIZE:
+        length = DATATABLES_MAX_PAGE_SIZE
+
+    table = refreshed_stats().table(name, league, season)
+    records_total = len(table)
+
+    search = args.get('search[value]', '').strip()
+    matching = table.contains(search_columns, search) if search else None
+
+    ordering = []
+    i = 0
+    while f'order[{i}][column]' in args:
+        idx = args.get(f'order[{i}][column]', type=int)
+        if idx is not None and 0 <= idx < len(columns):
+            ordering.append((columns[idx], args.get(f'order[{i}][dir]') == 'desc'))
+        i += 1
+    if not ordering:
+        ordering = [default_order]
+
+    order = table.ordered(ordering, matching)
+    rows = [table.rows[i] for i in order[start:start + length]]
+
+    return jsonify({
+        'draw': draw,
+        'recordsTotal': records_total,
+        'recordsFiltered': len(order),
+        'data': [{c: getattr(row, c) for c in columns} for row in rows]
+    })
+
+@app.route('/api/<league>/<season>/matches')
+def api_season_matches(league, season):
+    return datatables_page('matches', MATCH_COLUMNS,
+                           ['venue', 'team1', 'team2', 'winner'],
+                           ('match_no', False), *season_scope(league, season))
+
+@app.route('/api/<league>/<season>/batting')
+def api_season_batting(league, season):
+    return datatables_page('batting', BATTING_COLUMNS,
+                           ['player_name', 'team'],
+                           ('runs', True), *season_scope(league, season))
+
+@app.route('/api/<league>/<season>/bowling')
+def api_season_bowling(league, season):
+    return datatables_page('bowling', BOWLING_COLUMNS,
+                           ['player_name', 'team'],
+                           ('wickets', True), *season_scope(league, season))
+
+@app.route('/api/bbl/matches')
+def api_bbl_matches():
+    return api_season_matches(*season_scope('bbl'))
+
+@app.route('/api/bbl/batting')
+def api_bbl_batting():
+    return api_season_batting(*season_scope('bbl'))
+
+@app.route('/api/bbl/bowling')
+def api_bbl_bowling():
+    return api_season_bowling(*season_scope('bbl'))
 
 @app.route('/api/stats/batting')
+@cached(conditional=True, params=SEASON_PARAMS)
 def api_batting_stats():
-    players = BBLBatting.query.order_by(BBLBatting.runs.desc()).limit(10).all()
+    players = refreshed_stats().table('batting', *season_scope()).top('runs', 10)
     data = {
         'labels': [p.player_name for p in players],
         'runs': [p.runs for p in players],
@@ -89,8 +618,9 @@ def api_batting_stats():
     return jsonify(data)
 
 @app.route('/api/stats/bowling')
+@cached(conditional=True, params=SEASON_PARAMS)
 def api_bowling_stats():
-    players = BBLBowling.query.order_by(BBLBowling.wickets.desc()).limit(10).all()
+    players = refreshed_stats().table('bowling', *season_scope()).top('wickets', 10)
     data = {
         'labels': [p.player_name for p in players],
         'wickets': [p.wickets for p in players],
@@ -98,8 +628,249 @@ def api_bowling_stats():
     }
     return jsonify(data)
 
+# Leaderboard columns where the lowest value leads
+LEADERBOARD_ASCENDING = {
+    'batting': {'rank'},
+    'bowling': {'rank'} | ASCENDING_SORTS,
+}
+LEADERBOARD_MAX = 500
+
+def leaderboard_row(position, row):
+    values = {name: value.isoformat() if isinstance(value, date) else value
+              for name, value in row._asdict().items()}
+    return dict(values, position=position)
+
+@app.route('/api/leaderboard')
+def api_leaderboard():
+    """Top n of a season's batting, bowling or match rows by any numeric column
+
+    ?metric=sixes&n=10&team=Sydney%20Sixers. A metric found in several tables
+    (average, strike_rate, matches) is ranked from the first of batting,
+    bowling and matches unless ?table= names one; ?order=asc|desc overrides
+    the usual direction. Served from the stats snapshot's precomputed sort
+    orders, so every combination costs the same and is not response-cached.
+    """
+    league, season = season_scope()
+    stats = refreshed_stats()
+    args = request.args
+    metric = args.get('metric', 'runs')
+    name = args.get('table') or next((t for t in STATS_TABLES if metric in stats.metrics[t]), None)
+    if name not in STATS_TABLES or metric not in stats.metrics[name]:
+        choices = '; '.join(f"{t}: {', '.join(stats.metrics[t])}" for t in STATS_TABLES)
+        return jsonify({'error': f"unknown metric {metric!r}; expected one of {choices}"}), 400
+    order = args.get('order')
+    if order not in (None, 'asc', 'desc'):
+        return jsonify({'error': f"order must be asc or desc, not {order!r}"}), 400
+    descending = order == 'desc' if order else metric not in LEADERBOARD_ASCENDING.get(name, ())
+    n = max(min(args.get('n', default=10, type=int), LEADERBOARD_MAX), 1)
+
+    table = stats.table(name, league, season)
+    team = args.get('team')
+    where = None
+    if team:
+        where = (table.equals('team1', team) | table.equals('team2', team) if name == 'matches'
+                 else table.equals('team', team))
+    rows = table.top(metric, n, descending, where)
+    return jsonify({
+        'league': league,
+        'season': season,
+        'table': name,
+        'metric': metric,
+        'order': 'desc' if descending else 'asc',
+        'team': team,
+        'rows': [leaderboard_row(position, row) for position, row in enumerate(rows, 1)],
+    })
+
+@app.route('/api/<league>/<season>/standings')
+@cached(conditional=True)
+def api_season_standings(league, season):
+    league, season = season_scope(league, season)
+    standings = (in_season(Standing, league, season)
+                 .order_by(Standing.points.desc(), Standing.nrr.desc()).all())
+    return jsonify([{
+        'position': position,
+        'team': s.team,
+        'played': s.played,
+        'won': s.won,
+        'lost': s.lost,
+        'no_result': s.no_result,
+        'points': s.points,
+        'runs_for': s.runs_for,
+        'overs_for': overs(s.balls_for),
+        'runs_against': s.runs_against,
+        'overs_against': overs(s.balls_against),
+        'nrr': round(s.nrr, 3),
+    } for position, s in enumerate(standings, 1)])
+
+@app.route('/api/bbl/standings')
+def api_bbl_standings():
+    return api_season_standings(*season_scope('bbl'))
+
+def venue_summary(venue, stats):
+    results = stats.results
+    return {
+        'id': venue.id,
+        'name': venue.name,
+        'slug': venue.slug,
+        'matches': stats.matches,
+        'avg_first_innings': round(stats.avg_first_innings, 1) if stats.avg_first_innings is not None else None,
+        'avg_second_innings': round(stats.avg_second_innings, 1) if stats.avg_second_innings is not None else None,
+        'highest_total': stats.highest_total,
+        'bat_first_wins': stats.bat_first_wins,
+        'chase_wins': stats.chase_wins,
+        'chase_win_pct': round(100 * stats.chase_wins / results, 1) if results else None,
+    }
+
+def venue_performers(venue_id, league, season):
+    """Top players at a venue in a season as {role: [player, ...]}"""
+    performers = {'batting': [], 'bowling': [], 'player_of_match': []}
+    rows = (in_season(VenuePerformer, league, season).filter_by(venue_id=venue_id)
+            .order_by(VenuePerformer.role, VenuePerformer.rank).all())
+    for p in rows:
+        if p.role == 'batting':
+            entry = {'runs': p.runs, 'balls': p.balls}
+        elif p.role == 'bowling':
+            entry = {'wickets': p.wickets, 'runs': p.runs, 'overs': overs(p.balls or 0)}
+        else:
+            entry = {'awards': p.awards}
+        performers.setdefault(p.role, []).append({'player': p.player, 'team': p.team, **entry})
+    return performers
+
+def venues_in_season(league, season):
+    """(Venue, VenueStats) of every ground played at in a season, by name"""
+    rows = (db.session.query(Venue, VenueStats)
+            .join(VenueStats, VenueStats.venue_id == Venue.id)
+            .filter(VenueStats.league == league, VenueStats.season == season).all())
+    # A season's handful of grounds, found through the partition key; sorted here
+    return sorted(rows, key=lambda row: row[0].name)
+
+@app.route('/<league>/<season>/venues')
+@cached()
+def season_venues(league, season):
+    league, season = season_scope(league, season)
+    venues = [(venue_summary(venue, stats), venue_performers(venue.id, league, season))
+              for venue, stats in venues_in_season(league, season)]
+    return render_template('bbl_venues.html', venues=venues, **season_context(league, season))
+
+@app.route('/bbl/venues')
+def bbl_venues():
+    return season_venues(*season_scope('bbl'))
+
+@app.route('/api/venues')
+@cached(conditional=True, params=SEASON_PARAMS)
+def api_venues():
+    return jsonify([venue_summary(venue, stats) for venue, stats in venues_in_season(*season_scope())])
+
+@app.route('/api/venues/<venue>')
+@cached(conditional=True, params=SEASON_PARAMS)
+def api_venue(venue):
+    """One ground by id, slug or any name it appears under ("MCG", "Melbourne"), in a season"""
+    league, season = season_scope()
+    if venue.isdigit():
+        found = db.session.get(Venue, int(venue))
+    else:
+        name = canonical_venue(venue.replace('-', ' '))
+        found = Venue.query.filter_by(slug=venue_slug(name)).first() if name else None
+    if found is None:
+        return jsonify({'error': f'Unknown venue: {venue}'}), 404
+    stats = db.session.get(VenueStats, (league, season, found.id))
+    if stats is None:
+        return jsonify({'error': f'No {league} {season} matches at {found.name}'}), 404
+    return jsonify({**venue_summary(found, stats),
+                    'top_performers': venue_performers(found.id, league, season)})
+
+@app.route('/api/players/search')
+def api_player_search():
+    """Typeahead over player names with merged batting and bowling figures, newest season first
+
+    Every word of q matches as a prefix, ignoring case and accents, so
+    "jo smi" finds "José Smith". Not response-cached: each keystroke is a
+    new query and the index answers faster than a cache write.
+    """
+    query = request.args.get('q', '')
+    n = max(min(request.args.get('n', default=10, type=int), 50), 1)
+    names = refreshed_player_index().search(query, n)
+
+    players = {name: {'name': name, 'teams': [], 'batting': [], 'bowling': []} for name in names}
+    if names:
+        stats = refreshed_stats()
+        for p in (row for name in names for row in stats.lookup('batting', 'player_name', name)):
+            players[p.player_name]['batting'].append({
+                'league': p.league, 'season': p.season, 'team': p.team, 'matches': p.matches, 'runs': p.runs, 'average': p.average,
+                'strike_rate': p.strike_rate, 'high_score': p.high_score,
+            })
+        for p in (row for name in names for row in stats.lookup('bowling', 'player_name', name)):
+            players[p.player_name]['bowling'].append({
+                'league': p.league, 'season': p.season, 'team': p.team, 'matches': p.matches, 'wickets': p.wickets,
+                'economy': p.economy, 'best_figures': p.best_figures,
+            })
+        for player in players.values():
+            for role in ('batting', 'bowling'):
+                player[role].sort(key=lambda row: (row['season'], row['league']), reverse=True)
+            for row in player['batting'] + player['bowling']:
+                if row['team'] not in player['teams']:
+                    player['teams'].append(row['team'])
+    return jsonify({'query': query, 'players': list(players.values())})
+
+@app.route('/api/stats/matches')
+@cached(conditional=True, params=SEASON_PARAMS)
+def api_match_stats():
+    """Scoring, chasing and win-margin summary for a season, from the parsed score columns"""
+    league, season = season_scope()
+    table = refreshed_stats().table('matches', league, season)
+    played = [m for m in table.rows
+              if m.runs1 is not None and m.balls1 is not None and m.balls2 is not None]
+    first_innings = sum(m.runs1 for m in played) / len(played) if played else None
+    runs = sum(m.runs1 + m.runs2 for m in played if m.runs2 is not None)
+    balls = sum(m.balls1 + m.balls2 for m in played)
+    chases_won = sum(1 for m in played if m.margin_wickets is not None)
+    defended = sum(1 for m in played if m.margin_runs is not None)
+
+    def biggest(column):
+        match = table.first(column)
+        if match is None:
+            return None
+        return {'match_no': match.match_no, 'winner': match.winner, 'margin': match.margin,
+                'date': match.match_date.isoformat() if match.match_date else None}
+
+    decided = chases_won + defended
+    return jsonify({
+        'league': league,
+        'season': season,
+        'matches': len(played),
+        'avg_first_innings': round(first_innings, 1) if first_innings is not None else None,
+        'run_rate': round(runs * 6 / balls, 2) if balls else None,
+        'chases_won': chases_won,
+        'totals_defended': defended,
+        'chase_win_pct': round(100 * chases_won / decided, 1) if decided else None,
+        'biggest_win_by_runs': biggest('margin_runs'),
+        'biggest_win_by_wickets': biggest('margin_wickets'),
+    })
+
+@app.route('/api/analytics/batting')
+@cached(conditional=True, params=AGGREGATE_PARAMS)
+def api_analytics_batting():
+    """Batting figures from ball-by-ball data, sliceable by venue/team/opponent/phase/overs"""
+    try:
+        n, filters = aggregate_filters()
+        players = refreshed_aggregates().batting(n=n, sort=request.args.get('sort', 'runs'), **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'filters': filters, 'players': players})
+
+@app.route('/api/analytics/bowling')
+@cached(conditional=True, params=AGGREGATE_PARAMS)
+def api_analytics_bowling():
+    """Bowling figures from ball-by-ball data, sliceable like the batting endpoint"""
+    try:
+        n, filters = aggregate_filters()
+        players = refreshed_aggregates().bowling(n=n, sort=request.args.get('sort', 'wickets'), **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'filters': filters, 'players': players})
+
 if __name__ == '__main__':
-    os.makedirs('data', exist_ok=True)
+    from migrations import upgrade
     with app.app_context():
-        db.create_all()
+        upgrade()
     app.run(host='0.0.0.0', port=5000, debug=True)
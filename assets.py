@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Cricket Analytics - Front-End Assets
+Vendored libraries, content-hashed filenames and precompressed copies of static/
+
+`vendor` downloads the pinned Bootstrap, jQuery, DataTables and Chart.js
+builds into static/vendor/, so pages no longer wait on third-party DNS and
+TLS. `build` copies every file under static/ to static/dist/ with a hash of
+its content in the name, writes .gz (and, with the Brotli package, .br)
+copies beside each text file, and records the names in a manifest. While
+the manifest exists, url_for('static', filename=...) emits the hashed name
+and the response says it never changes, so repeat visits make no asset
+requests at all.
+
+Usage:
+    python assets.py vendor     # download the pinned, digest-checked libraries (--force to refresh)
+    python assets.py build      # fingerprint static/ into static/dist/
+"""
+
+import sys
+import os
+import re
+import gzip
+import json
+import base64
+import hashlib
+import hmac
+import argparse
+import posixpath
+import urllib.request
+
+from flask import request, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+# Hashed names change whenever their content does, so browsers may keep them forever
+IMMUTABLE = 'public, max-age=31536000, immutable'
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.ttf', '.eot')
+
+# static/ path -> (pinned release, its published SRI digest). vendor() writes
+# only files matching their digest, byte for byte, and build re-checks them.
+# An entry whose digest is None is pinned on first download: its sha384 is
+# recorded in static/vendor/.integrity.json and holds from then on, until the
+# publisher's digest is copied here. Until `vendor` has run, asset_url()
+# links the CDN copy so a fresh checkout still renders.
+VENDOR = {
+    'vendor/bootstrap/bootstrap.min.css': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css',
+        'sha384-T3c6CoIi6uLrA9TneNEoa7RxnatzjcDSCmG1MXxSR1GAsXEV/Dwwykc2MPK8M2HN'),
+    'vendor/bootstrap/bootstrap.bundle.min.js': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js',
+        'sha384-C6RzsynM9kWDrMNeT87bh95OGNyZPhcTNXj1NW7RuBCsyN/o0jlpcV8Qyq46cDfL'),
+    'vendor/jquery/jquery.min.js': (
+        'https://code.jquery.com/jquery-3.7.1.min.js',
+        'sha256-/JqT3SQfawRcv/BIHPThkBvs0OEvtFFmqPF/lYI/Cxo='),
+    'vendor/datatables/dataTables.bootstrap5.min.css': (
+        'https://cdn.datatables.net/1.13.7/css/dataTables.bootstrap5.min.css', None),
+    'vendor/datatables/jquery.dataTables.min.js': (
+        'https://cdn.datatables.net/1.13.7/js/jquery.dataTables.min.js', None),
+    'vendor/datatables/dataTables.bootstrap5.min.js': (
+        'https://cdn.datatables.net/1.13.7/js/dataTables.bootstrap5.min.js', None),
+    'vendor/chartjs/chart.umd.min.js': (
+        'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js', None),
+}
+
+# Digests of VENDOR entries without a published one, recorded by vendor()
+RECORDED_INTEGRITY = 'vendor/.integrity.json'
+
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+class Assets:
+    """The build manifest, applied to url_for('static', ...) and static responses"""
+
+    def __init__(self, static_folder=STATIC_DIR):
+        self.static_folder = static_folder
+        self.load()
+
+    def load(self):
+        """Read the manifest written by `build`; without one, names are left as they are"""
+        manifest = read_manifest(self.static_folder)
+        self.files = manifest.get('files', {})
+        self.version = manifest.get('version', '')
+        self.vendored = {name for name in VENDOR
+                         if os.path.exists(os.path.join(self.static_folder, name))}
+
+    def init_app(self, app):
+        app.url_defaults(self.hashed_filename)
+        app.after_request(self.cache_headers)
+        app.jinja_env.globals['asset_url'] = self.url
+
+    def hashed_filename(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.files:
+            values['filename'] = self.files[values['filename']]
+
+    def cache_headers(self, response):
+        filename = (request.view_args or {}).get('filename', '') if request.endpoint == 'static' else ''
+        if filename.startswith(DIST + '/') and response.status_code in (200, 206, 304):
+            response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+    def url(self, filename):
+        """url_for('static', filename=filename), or the CDN copy of a library not yet vendored"""
+        if filename in VENDOR and filename not in self.vendored and filename not in self.files:
+            return VENDOR[filename][0]
+        return url_for('static', filename=filename)
+
+def read_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_atomically(path, body):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'wb') as f:
+        f.write(body)
+    os.replace(temp, path)
+
+def sri_digest(body, algorithm='sha384'):
+    return f'{algorithm}-{base64.b64encode(hashlib.new(algorithm, body).digest()).decode()}'
+
+def matches_integrity(body, integrity):
+    """Whether body has the SRI digest integrity, e.g. 'sha384-<base64>'"""
+    return hmac.compare_digest(sri_digest(body, integrity.partition('-')[0]), integrity)
+
+def read_recorded_integrity(static_folder):
+    try:
+        with open(os.path.join(static_folder, RECORDED_INTEGRITY)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def pinned_integrity(static_folder=STATIC_DIR):
+    """static/ path -> SRI digest for every VENDOR entry pinned so far"""
+    recorded = read_recorded_integrity(static_folder)
+    return {name: integrity or recorded.get(name) for name, (_, integrity) in VENDOR.items()
+            if integrity or recorded.get(name)}
+
+def vendor(static_folder=STATIC_DIR, force=False):
+    """Download each VENDOR file not already present; returns (downloaded, failed)
+
+    Files are written exactly as published, so their digest can be checked
+    again at any time; nothing is written unless it matches its pin. An
+    entry without one is pinned to what this first download fetched.
+    """
+    pins = pinned_integrity(static_folder)
+    recorded = read_recorded_integrity(static_folder)
+    downloaded = failed = 0
+    for name, (url, _) in VENDOR.items():
+        path = os.path.join(static_folder, name)
+        if os.path.exists(path) and not force:
+            continue
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                body = response.read()
+        except OSError as e:
+            print(f"   ❌ {name}: {e}")
+            failed += 1
+            continue
+        integrity = pins.get(name)
+        if integrity is None:
+            integrity = recorded[name] = sri_digest(body)
+            write_atomically(os.path.join(static_folder, RECORDED_INTEGRITY),
+                             json.dumps(recorded, indent=1, sort_keys=True).encode())
+            print(f"   📌 {name}: pinned to {integrity}; compare it with the publisher's and add it to VENDOR")
+        elif not matches_integrity(body, integrity):
+            print(f"   ❌ {name}: download does not match {integrity.partition('-')[0]} pin, not written")
+            failed += 1
+            continue
+        write_atomically(path, body)
+        print(f"   📥 {name} ({len(body):,} bytes) ← {url}")
+        downloaded += 1
+    return downloaded, failed
+
+def tampered_vendor_files(static_folder=STATIC_DIR):
+    """Vendored files present on disk that are unpinned or no longer match their pin"""
+    pins = pinned_integrity(static_folder)
+    tampered = []
+    for name in VENDOR:
+        path = os.path.join(static_folder, name)
+        integrity = pins.get(name)
+        if not os.path.exists(path):
+            continue
+        if integrity is None:
+            tampered.append(name)
+            continue
+        with open(path, 'rb') as f:
+            if not matches_integrity(f.read(), integrity):
+                tampered.append(name)
+    return tampered
+
+def source_files(static_folder):
+    """static/ paths to fingerprint, CSS last so its url() references can be rewritten"""
+    names = []
+    for root, dirs, files in os.walk(static_folder):
+        rel = os.path.relpath(root, static_folder)
+        if rel == DIST:
+            dirs[:] = []
+            continue
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for filename in files:
+            if filename.startswith('.') or filename.endswith(('.gz', '.br', '.tmp')):
+                continue
+            names.append(posixpath.normpath(posixpath.join(rel.replace(os.sep, '/'), filename)))
+    return sorted(names, key=lambda name: (name.endswith('.css'), name))
+
+def hashed_name(name, body):
+    stem, ext = posixpath.splitext(name)
+    return f'{DIST}/{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}'
+
+def rewrite_css_urls(name, text, files):
+    """Point relative url() references in a stylesheet at the hashed files"""
+    directory = posixpath.dirname(name)
+
+    def replace(match):
+        quote, ref = match.groups()
+        if ref.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        # Keep any ?query or #fragment (font hacks use both)
+        path = re.split(r'[?#]', ref, maxsplit=1)[0]
+        suffix = ref[len(path):]
+        target = files.get(posixpath.normpath(posixpath.join(directory, path)))
+        if target is None:
+            return match.group(0)
+        # The stylesheet moves to dist/ too, so the reference stays relative
+        relative = posixpath.relpath(target, posixpath.dirname(f'{DIST}/{name}'))
+        return f'url({quote}{relative}{suffix}{quote})'
+
+    return CSS_URL.sub(replace, text)
+
+def compressed_copies(path, body):
+    """Write .gz and .br copies of a text file when they are smaller; returns how many"""
+    if not path.endswith(COMPRESSIBLE):
+        return 0
+    variants = [('.gz', gzip.compress(body, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(body, quality=11)))
+    written = 0
+    for suffix, compressed in variants:
+        if len(compressed) < len(body):
+            write_atomically(path + suffix, compressed)
+            written += 1
+    return written
+
+def build(static_folder=STATIC_DIR):
+    """Fingerprint static/ into static/dist/; returns (files, compressed copies, removed)
+
+    Files of the previous build are kept, so pages rendered before a deploy
+    (in the response cache, frozen, or open in a browser) still load.
+    """
+    previous = read_manifest(static_folder)
+    files = {}
+    compressed = 0
+    for name in source_files(static_folder):
+        with open(os.path.join(static_folder, name), 'rb') as f:
+            body = f.read()
+        if name.endswith('.css'):
+            body = rewrite_css_urls(name, body.decode('utf-8'), files).encode('utf-8')
+        files[name] = hashed_name(name, body)
+        path = os.path.join(static_folder, files[name])
+        if not os.path.exists(path):
+            write_atomically(path, body)
+            compressed += compressed_copies(path, body)
+
+    keep = set(files.values()) | set(previous.get('files', {}).values())
+    removed = 0
+    for root, _, filenames in os.walk(os.path.join(static_folder, DIST)):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            if name == f'{DIST}/{MANIFEST}' or re.sub(r'\.(gz|br)$', '', name) in keep:
+                continue
+            os.remove(path)
+            removed += 1
+
+    version = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()[:12]
+    write_atomically(os.path.join(static_folder, DIST, MANIFEST),
+                     json.dumps({'version': version, 'files': files}, indent=1, sort_keys=True).encode())
+    return len(files), compressed, removed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Vendor and fingerprint the front-end assets')
+    parser.add_argument('command', choices=('vendor', 'build'))
+    parser.add_argument('--force', action='store_true', help='vendor: download files already present')
+    args = parser.parse_args(argv)
+
+    print("="*60)
+    print("🎨 Cricket Analytics - Front-End Assets")
+    print("="*60)
+    if args.command == 'vendor':
+        downloaded, failed = vendor(force=args.force)
+        vendored = sum(os.path.exists(os.path.join(STATIC_DIR, name)) for name in VENDOR)
+        print(f"✅ {downloaded} downloaded, {failed} failed, {vendored} of {len(VENDOR)} vendored")
+        if failed:
+            sys.exit(1)
+        return
+    tampered = tampered_vendor_files()
+    if tampered:
+        sys.exit(f"❌ Not building: {', '.join(tampered)} are unpinned or do not match their pinned digests")
+    if brotli is None:
+        print("⚠️  Brotli not installed; writing .gz copies only (pip install Brotli)")
+    count, compressed, removed = build()
+    print(f"✅ {count} files fingerprinted, {compressed} compressed copies, "
+          f"{removed} stale files removed → {os.path.join(STATIC_DIR, DIST)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Cricket Analytics - Concurrent Read/Write Benchmark
+Measures how long page queries wait while an import publishes a new data snapshot
+
+Builds a scratch SQLite database with synthetic deliveries, then runs
+reader processes issuing the site's leaderboard queries in a loop while the
+main process publishes snapshots exactly as import_data.py does. Each
+journal mode is run in turn on the engine profile from config.py, so the
+rollback journal's stalled readers can be compared with WAL's.
+
+Usage:
+    python benchmark_db.py                            # wal vs delete, 3 readers
+    python benchmark_db.py --readers 6 --deliveries 500000 --journal wal
+"""
+
+import sys
+import os
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import multiprocessing
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import create_engine
+
+from app import app, db, Delivery, BBLBatting
+from database import apply_pragmas, install_engine_profile
+from snapshot import copy_database
+
+# What the busiest pages run against the data tables
+READ_QUERIES = (
+    "SELECT player_name, team, runs FROM bbl_batting "
+    "WHERE league = 'bbl' AND season = '2024-25' ORDER BY runs DESC LIMIT 20",
+    "SELECT COUNT(*), SUM(runs) FROM delivery WHERE league = 'bbl' AND season = '2024-25' AND match_no = ?",
+)
+
+# A read slower than this is counted as stalled behind a writer
+STALL_SECONDS = 0.05
+
+TEAMS = ('Sydney Sixers', 'Perth Scorchers', 'Brisbane Heat', 'Hobart Hurricanes',
+         'Adelaide Strikers', 'Melbourne Stars', 'Melbourne Renegades', 'Sydney Thunder')
+
+def synthetic_deliveries(count, seed):
+    """count delivery rows spread over 20-over innings of as many matches as needed"""
+    rng = random.Random(seed)
+    match_no = innings = 1
+    over = ball = 1
+    for _ in range(count):
+        batting = TEAMS[(match_no + innings) % len(TEAMS)]
+        bowling = TEAMS[(match_no + innings + 1) % len(TEAMS)]
+        yield {
+            'league': 'bbl', 'season': '2024-25', 'match_no': match_no, 'innings': innings,
+            'over': over, 'ball': ball, 'batting_team': batting, 'bowling_team': bowling,
+            'batter': f'{batting} batter {rng.randint(1, 11)}',
+            'bowler': f'{bowling} bowler {rng.randint(1, 6)}',
+            'runs': rng.choice((0, 0, 0, 1, 1, 2, 4, 6)), 'extras': 0,
+        }
+        ball += 1
+        if ball > 6:
+            ball, over = 1, over + 1
+        if over > 20:
+            over, innings = 1, innings + 1
+        if innings > 2:
+            innings, match_no = 1, match_no + 1
+
+def build_database(path, deliveries, pragmas, seed=0):
+    """Scratch database with the app's schema, some batting rows and synthetic deliveries"""
+    engine = create_engine('sqlite:///' + path)
+    install_engine_profile(engine, pragmas)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(BBLBatting.__table__.insert(), [{
+            'league': 'bbl', 'season': '2024-25', 'rank': i, 'player_name': f'Player {i}',
+            'team': TEAMS[i % len(TEAMS)], 'runs': 600 - i,
+        } for i in range(1, 201)])
+        rows = list(synthetic_deliveries(deliveries, seed))
+        conn.execute(Delivery.__table__.insert(), rows)
+    engine.dispose()
+    return rows[-1]['match_no'] if rows else 1
+
+def reader(path, pragmas, matches, stop, results):
+    """Run READ_QUERIES until stop is set; report (latencies in seconds, failed reads)"""
+    conn = sqlite3.connect(path, timeout=pragmas['busy_timeout'] / 1000, isolation_level=None)
+    apply_pragmas(conn, pragmas)
+    conn.execute('PRAGMA query_only = 1')
+    rng = random.Random(os.getpid())
+    latencies = []
+    failed = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            conn.execute(READ_QUERIES[0]).fetchall()
+            conn.execute(READ_QUERIES[1], (rng.randint(1, matches),)).fetchall()
+        except sqlite3.OperationalError:
+            failed += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    results.put((latencies, failed))
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else float('nan')
+
+def run(journal_mode, args, workdir):
+    """Benchmark one journal mode; returns a dict of reader and publish figures"""
+    pragmas = dict(app.config['SQLITE_PRAGMAS'], journal_mode=journal_mode)
+    live = os.path.join(workdir, f'live-{journal_mode}.db')
+    shadow = os.path.join(workdir, f'shadow-{journal_mode}.db')
+    matches = build_database(live, args.deliveries, pragmas)
+    # The published snapshot differs from the live one, so every page is rewritten
+    build_database(shadow, args.deliveries, pragmas, seed=1)
+
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    readers = [multiprocessing.Process(target=reader, args=(live, pragmas, matches, stop, results))
+               for _ in range(args.readers)]
+    for process in readers:
+        process.start()
+    time.sleep(0.5)
+
+    publishes = []
+    for _ in range(args.publishes):
+        started = time.perf_counter()
+        copy_database(shadow, live)
+        publishes.append(time.perf_counter() - started)
+        time.sleep(0.25)
+
+    stop.set()
+    latencies, failed = [], 0
+    for _ in readers:
+        reader_latencies, reader_failed = results.get()
+        latencies.extend(reader_latencies)
+        failed += reader_failed
+    for process in readers:
+        process.join()
+    latencies.sort()
+    return {
+        'reads': len(latencies),
+        'stalled': sum(1 for latency in latencies if latency > STALL_SECONDS),
+        'failed': failed,
+        'p50': percentile(latencies, 0.50),
+        'p99': percentile(latencies, 0.99),
+        'max': latencies[-1] if latencies else float('nan'),
+        'publish': sum(publishes) / len(publishes),
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Measure reader stalls while imports publish')
+    parser.add_argument('--journal', action='append', choices=('wal', 'delete', 'truncate'),
+                        help='journal mode to run; repeat to compare (default: wal and delete)')
+    parser.add_argument('--readers', type=int, default=3,
+                        help='reader processes, like gunicorn workers (default 3)')
+    parser.add_argument('--deliveries', type=int, default=300000,
+                        help='synthetic deliveries in the scratch database (default 300000)')
+    parser.add_argument('--publishes', type=int, default=5,
+                        help='snapshots published while the readers run (default 5)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    modes = args.journal or ['wal', 'delete']
+
+    print("="*60)
+    print("⏱️  Cricket Analytics - Concurrent Read/Write Benchmark")
+    print("="*60)
+    print(f"   {args.readers} readers, {args.deliveries:,} deliveries, {args.publishes} publishes")
+    print()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in modes:
+            print(f"📊 journal_mode={mode}...")
+            r = run(mode, args, workdir)
+            print(f"✅ {mode}: {r['reads']:,} reads, p50 {r['p50'] * 1000:.2f}ms, "
+                  f"p99 {r['p99'] * 1000:.2f}ms, max {r['max'] * 1000:.1f}ms, "
+                  f"{r['stalled']} stalled over {STALL_SECONDS * 1000:.0f}ms, "
+                  f"{r['failed']} failed; publish {r['publish']:.2f}s")
+    print()
+    print("Under a rollback journal a reader waits for each publish to finish; under WAL")
+    print("it keeps reading the previous snapshot while the new one is written.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cricket Analytics - Shared Response Cache
+SQLite-backed store of rendered responses, shared by all gunicorn workers
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+class ResponseCache:
+    """Rendered response bodies keyed by (cache key, data generation)
+
+    Every worker opens the same SQLite file, so a page rendered by one worker
+    is served from the cache by the others. Entries are never invalidated in
+    place: a new data generation simply stops matching the old rows, which
+    are pruned the next time a newer generation is stored.
+    """
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._pruned_generation = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        # sqlite3 connections must not cross a fork or a thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT NOT NULL, '
+            'generation INTEGER NOT NULL, '
+            'mimetype TEXT NOT NULL, '
+            'body BLOB NOT NULL, '
+            'created_at REAL NOT NULL, '
+            'PRIMARY KEY (key, generation))'
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, generation):
+        """Return (body, mimetype) for key at generation, or None"""
+        try:
+            row = self._connect().execute(
+                'SELECT body, mimetype FROM responses WHERE key = ? AND generation = ?',
+                (key, generation)
+            ).fetchone()
+        except sqlite3.Error:
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return bytes(row[0]), row[1]
+
+    def set(self, key, generation, body, mimetype):
+        """Store a rendered body; failures are ignored, the cache is optional"""
+        try:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, generation, mimetype, body, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, generation, mimetype, body, time.time())
+            )
+            if self._pruned_generation != generation:
+                conn.execute('DELETE FROM responses WHERE generation < ?', (generation,))
+                self._pruned_generation = generation
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        try:
+            self._connect().execute('DELETE FROM responses')
+        except sqlite3.Error:
+            pass
@@ -1,8 +1,57 @@
 import os
 from pathlib import Path
 
+from database import database_url
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'cricket-analytics-secret-key-change-in-production'
     BASE_DIR = Path(__file__).parent
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(BASE_DIR / 'data' / 'cricket_data.db')
+    # DATABASE_URL points the same models at another database, e.g. postgresql://...
+    SQLALCHEMY_DATABASE_URI = (database_url(os.environ.get('DATABASE_URL'), BASE_DIR)
+                               or 'sqlite:///' + str(BASE_DIR / 'data' / 'cricket_data.db'))
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Applied to every SQLite connection, in this order (see database.py). WAL lets
+    # page views keep reading while an import publishes; cache_size is per connection.
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS') or 5000),
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE') or 'wal',
+        'synchronous': 'normal',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -16 * 1024,           # negative: KiB, so 16 MiB
+        'journal_size_limit': 64 * 1024 * 1024,
+        'temp_store': 'memory',
+    }
+    # Connection pool per worker process
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 5)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or 10)
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)
+    # Connections used while handling a request refuse writes
+    DB_READ_ONLY_REQUESTS = os.environ.get('DB_READ_ONLY_REQUESTS', '1') != '0'
+
+    # Every table is partitioned by league and season; this one is the site's front page
+    LEAGUES = {
+        'bbl': 'BBL',
+        'wbbl': 'WBBL',
+        'super-smash': 'Super Smash',
+        'international': 'Internationals',
+    }
+    DEFAULT_LEAGUE = os.environ.get('DEFAULT_LEAGUE') or 'bbl'
+    DEFAULT_SEASON = os.environ.get('DEFAULT_SEASON') or '2024-25'
+
+    # Static copies of every page for nginx (freeze.py), refreshed after each import
+    FREEZE_DIR = os.environ.get('FREEZE_DIR') or str(BASE_DIR / 'frozen')
+    FREEZE_ON_IMPORT = os.environ.get('FREEZE_ON_IMPORT', '1') != '0'
+
+    # Prometheus metrics at /metrics, summed across workers in one SQLite file (metrics.py)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+    METRICS_PATH = os.environ.get('METRICS_PATH') or str(BASE_DIR / 'data' / 'metrics.db')
+    METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS') or 5)
+    # Bearer token /metrics requires when set; nginx also limits it to localhost
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+    # Requests slower than this are logged with their slowest SQL statements
+    SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS') or 1.0)
+
+    # Rendered responses shared by all workers, keyed by data generation
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') != '0'
+    RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH') or str(BASE_DIR / 'data' / 'response_cache.db')
@@ -0,0 +1,112 @@
+"""
+Cricket Analytics - Database Engine Profile
+Connection settings for SQLite shared by several gunicorn workers, or a server database from DATABASE_URL
+"""
+
+import os
+
+from flask import has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DisconnectionError
+
+def database_url(url, base_dir):
+    """SQLAlchemy URL for a DATABASE_URL value, or None when it is unset
+
+    Hosting providers still hand out postgres:// URLs, which SQLAlchemy no
+    longer accepts, and a relative SQLite path is taken from base_dir rather
+    than Flask's instance folder.
+    """
+    if not url:
+        return None
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    parsed = make_url(url)
+    if (parsed.get_backend_name() == 'sqlite' and parsed.database not in (None, '', ':memory:')
+            and not os.path.isabs(parsed.database) and not parsed.database.startswith('file:')):
+        return parsed.set(database=os.path.join(str(base_dir), parsed.database)).render_as_string(hide_password=False)
+    return url
+
+def engine_options(config):
+    """create_engine() options for the configured database
+
+    Each gunicorn worker keeps its own pool. A file-backed SQLite engine
+    gets a small pool of reusable connections so its pragmas are paid once
+    per connection, not once per request; server databases also ping
+    pooled connections so a restarted server is not seen as an error.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    }
+    if url.get_backend_name() != 'sqlite':
+        options['pool_pre_ping'] = True
+    return options
+
+def apply_pragmas(dbapi_conn, pragmas):
+    """Run PRAGMA name = value for each item on a raw SQLite connection, in order"""
+    cursor = dbapi_conn.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+def set_read_only(dbapi_conn, backend, read_only):
+    """Refuse (or allow again) writes on a raw connection"""
+    cursor = dbapi_conn.cursor()
+    try:
+        if backend == 'sqlite':
+            cursor.execute(f'PRAGMA query_only = {int(read_only)}')
+        else:
+            mode = 'READ ONLY' if read_only else 'READ WRITE'
+            cursor.execute(f'SET SESSION CHARACTERISTICS AS TRANSACTION {mode}')
+    finally:
+        cursor.close()
+    if backend != 'sqlite':
+        # The SET opened a transaction; end it so the next one starts in the new mode
+        dbapi_conn.commit()
+
+def install_engine_profile(engine, pragmas=None, read_only_requests=False):
+    """Attach connect-time SQLite pragmas and the request read-only switch to an engine
+
+    A file-backed SQLite engine also reconnects when an import has published
+    a new snapshot of the database since a pooled connection was opened.
+
+    With read_only_requests, a connection checked out while a Flask request
+    is being handled cannot write: page views only ever read, and a stray
+    write from one would otherwise take the lock imports need. Scripts run
+    outside a request, so the same pooled connection is writable for them.
+    """
+    backend = engine.url.get_backend_name()
+
+    if backend == 'sqlite' and pragmas:
+        @event.listens_for(engine, 'connect')
+        def configure_connection(dbapi_conn, record):
+            apply_pragmas(dbapi_conn, pragmas)
+
+    path = engine.url.database
+    if backend == 'sqlite' and path not in (None, '', ':memory:'):
+        # An import publishes by pointing the path at a new file (snapshot.publish);
+        # a pooled connection still reading the old one is replaced at checkout
+        @event.listens_for(engine, 'connect')
+        def record_file(dbapi_conn, record):
+            record.info['file'] = dbapi_conn.execute('PRAGMA database_list').fetchone()[2]
+
+        @event.listens_for(engine, 'checkout')
+        def reopen_published(dbapi_conn, record, proxy):
+            if record.info.get('file') != os.path.realpath(path):
+                raise DisconnectionError('database file was replaced by an import')
+
+    if read_only_requests:
+        @event.listens_for(engine, 'checkout')
+        def switch_read_only(dbapi_conn, record, proxy):
+            read_only = has_request_context()
+            # Only issue the statement when the mode changes, not on every checkout
+            if record.info.get('read_only', False) != read_only:
+                set_read_only(dbapi_conn, backend, read_only)
+                record.info['read_only'] = read_only
@@ -46,9 +46,15 @@ mkdir -p data static/css static/js templates
 
 # Initialize database
 echo -e "${YELLOW}💾 Initializing database...${NC}"
-python app.py &
-sleep 3
-pkill -f "python app.py" || true
+python migrations.py upgrade
+
+# Front-end assets
+echo -e "${YELLOW}🎨 Building assets...${NC}"
+# A CDN hiccup must not stop the deploy: pages link the CDN copy of anything not vendored
+python assets.py vendor || echo -e "${YELLOW}⚠️  Some libraries were not vendored; pages load them from the CDN until the next deploy${NC}"
+python assets.py build
+# Static copies of every page for nginx; pages name the hashed assets just built
+python freeze.py
 
 # Create systemd service
 echo -e "${YELLOW}⚙️ Creating service...${NC}"
@@ -81,7 +87,18 @@ server {
     listen 80;
     server_name cricket.srv1138131.hstgr.cloud 72.61.224.193;
 
+    # Pages exported by freeze.py; anything not exported goes to the app
+    root /var/www/cricket-analytics-website/frozen;
+
     location / {
+        gzip_static on;
+        # Requests with a query string always go to the app
+        error_page 418 = @app;
+        if ($args) { return 418; }
+        try_files $uri/index.html $uri.json @app;
+    }
+
+    location @app {
         proxy_pass http://127.0.0.1:5001;
         proxy_set_header Host $host;
         proxy_set_header X-Real-IP $remote_addr;
@@ -89,10 +106,29 @@ server {
         proxy_set_header X-Forwarded-Proto $scheme;
     }
 
+    # Keeps the freeze manifest and other dotfiles private
+    location ~ /\. {
+        deny all;
+    }
+
+    # Per-route traffic and SQL timings; for a local Prometheus only
+    location = /metrics {
+        allow 127.0.0.1;
+        deny all;
+        proxy_pass http://127.0.0.1:5001;
+        proxy_set_header Host $host;
+    }
+
+    # Content-hashed files from assets.py build never change
+    location /static/dist/ {
+        alias /var/www/cricket-analytics-website/static/dist/;
+        gzip_static on;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+
     location /static {
         alias /var/www/cricket-analytics-website/static;
-        expires 30d;
-        add_header Cache-Control "public, immutable";
+        expires 1h;
     }
 }
 EOF
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Cricket Analytics - HTTP-first Page Fetcher
+Fetches pages with a pooled HTTP client and parses them with BeautifulSoup,
+falling back to headless Chromium only for pages that need JavaScript
+
+Which path worked is remembered per URL in data/fetch_strategy.json, so pages
+known to need the browser skip the HTTP attempt on later runs.
+
+Saved pages can be replayed from a local fixture server:
+    python fetcher.py serve fixtures/ --port 8765
+    SCRAPER_FIXTURE_URL=http://127.0.0.1:8765 python scrape_data.py
+Pages are saved into such a directory with SCRAPER_SAVE_FIXTURES=fixtures/.
+
+With a PageCache, HTTP pages are revalidated with If-None-Match and
+If-Modified-Since instead of downloaded again, and a page whose content was
+already processed is opened with doc.unchanged set so callers can skip it.
+"""
+
+import os
+import json
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+from bs4 import BeautifulSoup
+
+from scraping import (BASE_DIR, DEFAULT_POOL_SIZE, FAST_MODE, PagePool, FastNavigation,
+                      extract_rows, extract_cards, extract_links)
+
+STRATEGY_PATH = os.path.join(BASE_DIR, 'data', 'fetch_strategy.json')
+
+# Rewrite https://host/path to <fixture>/host/path, for replaying saved pages
+FIXTURE_URL = os.environ.get('SCRAPER_FIXTURE_URL')
+SAVE_FIXTURES = os.environ.get('SCRAPER_SAVE_FIXTURES')
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+BROWSER_ARGS = ['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage', '--disable-gpu']
+
+class PageNotFound(Exception):
+    """The server says the page does not exist, so a browser will not find it either"""
+
+def fixture_path(url):
+    """Relative file path a page is saved under, e.g. host/series/x or host/index.html"""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if path.endswith('/'):
+        path += 'index.html'
+    return parts.hostname + path
+
+class HtmlDocument:
+    """A server-rendered page parsed with BeautifulSoup on first use"""
+    source = 'http'
+
+    def __init__(self, url, html, unchanged=False):
+        self.url = url
+        self.html = html
+        self.unchanged = unchanged
+        self._soup = None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html, 'lxml')
+        return self._soup
+
+    def has(self, selector):
+        return self.soup.select_one(selector) is not None
+
+    async def title(self):
+        return self.soup.title.get_text(strip=True) if self.soup.title else ''
+
+    async def rows(self, row_selector='table tbody tr', cell_selector='td'):
+        return [[cell.get_text(' ', strip=True) for cell in row.select(cell_selector)]
+                for row in self.soup.select(row_selector)]
+
+    async def cards(self, selector, fields=None, html_limit=0):
+        cards = []
+        for card in self.soup.select(selector):
+            out = {'text': card.get_text(' ', strip=True)}
+            for name, field_selector in (fields or {}).items():
+                el = card.select_one(field_selector)
+                out[name] = el.get_text(' ', strip=True) if el else None
+            if html_limit > 0:
+                out['html'] = card.decode_contents()[:html_limit]
+            cards.append(out)
+        return cards
+
+    async def links(self, selector='a'):
+        return [{'text': a.get_text(' ', strip=True), 'href': a['href']}
+                for a in self.soup.select(selector) if a.get('href')]
+
+class PageDocument:
+    """A browser-rendered page; same interface as HtmlDocument"""
+    source = 'browser'
+    unchanged = False
+
+    def __init__(self, url, page):
+        self.url = url
+        self.page = page
+
+    async def title(self):
+        return await self.page.title()
+
+    async def rows(self, row_selector='table tbody tr', cell_selector='td'):
+        return await extract_rows(self.page, row_selector, cell_selector)
+
+    async def cards(self, selector, fields=None, html_limit=0):
+        return await extract_cards(self.page, selector, fields, html_limit)
+
+    async def links(self, selector='a'):
+        return await extract_links(self.page, selector)
+
+class Fetcher:
+    """Open pages over HTTP when the server HTML has what we need, else in Chromium
+
+    Use `async with fetcher.open(url, selector) as doc:`. The selector names
+    the element the caller is going to extract; if the plain HTTP response
+    does not contain it, the page is loaded in the browser instead. The
+    browser is only launched the first time a page needs it.
+
+    Given a PageCache, HTTP pages are served from it while fresh and
+    revalidated with a conditional GET after that. doc.unchanged is True when
+    the page's content is the same as when mark_processed() was last called
+    for it; call that once the run's results have been saved.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, fast=FAST_MODE, first_party=(),
+                 strategy_path=STRATEGY_PATH, fixture_url=FIXTURE_URL, save_dir=SAVE_FIXTURES,
+                 timeout=30, cache=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.cache = cache
+        # url -> content hash of each cached page opened in this run
+        self._opened = {}
+        self.fixture_url = fixture_url.rstrip('/') if fixture_url else None
+        self.save_dir = save_dir
+        if self.fixture_url:
+            first_party = list(first_party) + [self.fixture_url]
+        self.nav = FastNavigation(enabled=fast, first_party=first_party)
+        self.strategy_path = strategy_path
+        self.strategies = self._load_strategies()
+        self.counts = {'http': 0, 'browser': 0, 'cached': 0, 'not_modified': 0}
+        self.client = None
+        self._playwright = None
+        self.browser = None
+        self.context = None
+        self.pool = None
+        self._browser_lock = asyncio.Lock()
+        self._browser_error = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _load_strategies(self):
+        try:
+            with open(self.strategy_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _remember(self, url, source):
+        self.strategies[url] = source
+        self.counts[source] += 1
+
+    def resolve(self, url):
+        """The URL actually requested, after fixture rewriting"""
+        if not self.fixture_url:
+            return url
+        return f"{self.fixture_url}/{fixture_path(url)}"
+
+    def _save(self, url, html):
+        if not self.save_dir:
+            return
+        path = os.path.join(self.save_dir, fixture_path(url))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+    async def fetch_html(self, url):
+        """GET url on the pooled client; returns (body, content hash), or None on failure
+
+        The hash is None without a cache. Raises PageNotFound for 404/410 so
+        callers do not retry in the browser.
+        """
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            self.counts['cached'] += 1
+            return self.cache.read(entry), entry['sha']
+
+        if self.client is None:
+            limits = httpx.Limits(max_connections=self.pool_size * 2,
+                                  max_keepalive_connections=self.pool_size * 2)
+            self.client = httpx.AsyncClient(limits=limits, timeout=self.timeout,
+                                            follow_redirects=True,
+                                            headers={'User-Agent': USER_AGENT})
+        headers = self.cache.conditional_headers(entry) if entry else {}
+        try:
+            response = await self.client.get(self.resolve(url), headers=headers)
+        except httpx.HTTPError as e:
+            print(f"   ⚠️  HTTP fetch failed for {url}: {e!r}")
+            return None
+        if response.status_code == 304 and entry:
+            self.counts['not_modified'] += 1
+            self.cache.revalidated(url)
+            return self.cache.read(entry), entry['sha']
+        if response.status_code in (404, 410):
+            raise PageNotFound(f"{url} returned {response.status_code}")
+        if response.status_code >= 400:
+            # Often bot protection; the browser may still get through
+            print(f"   ⚠️  HTTP {response.status_code} for {url}")
+            return None
+        if not self.cache:
+            return response.text, None
+        sha = self.cache.store(url, response.text, response.headers.get('ETag'),
+                               response.headers.get('Last-Modified'))
+        return response.text, sha
+
+    async def _ensure_browser(self):
+        async with self._browser_lock:
+            if self.browser is not None:
+                return
+            # Do not retry a launch that already failed once in this run
+            if self._browser_error is not None:
+                raise self._browser_error
+            from playwright.async_api import async_playwright
+
+            print("🌐 Launching browser...")
+            self._playwright = await async_playwright().start()
+            try:
+                self.browser = await self._playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+            except Exception as e:
+                self._browser_error = e
+                raise
+            self.context = await self.browser.new_context(
+                viewport={'width': 1920, 'height': 1080},
+                user_agent=USER_AGENT
+            )
+            await self.nav.install(self.context)
+            self.pool = PagePool(self.context, self.pool_size)
+
+    @asynccontextmanager
+    async def open(self, url, selector=None, timeout=30000):
+        """Yield a document for url that contains selector; raises if neither path finds it"""
+        if self.strategies.get(url) != 'browser':
+            fetched = await self.fetch_html(url)
+            if fetched is not None:
+                html, sha = fetched
+                unchanged = sha is not None and self.cache.is_processed(url, sha)
+                doc = HtmlDocument(url, html, unchanged)
+                # A page already processed was checked for the selector back then
+                if unchanged or selector is None or doc.has(selector):
+                    self._remember(url, 'http')
+                    self._save(url, html)
+                    if sha is not None:
+                        self._opened[url] = sha
+                    yield doc
+                    return
+                print(f"   ↪️  '{selector}' not in server HTML for {url}, using browser")
+
+        await self._ensure_browser()
+        async with self.pool.page() as page:
+            await self.nav.goto(page, self.resolve(url), selector, timeout)
+            self._remember(url, 'browser')
+            if self.save_dir:
+                self._save(url, await page.content())
+            yield PageDocument(url, page)
+
+    def mark_processed(self):
+        """Record that the pages opened so far have been fully consumed
+
+        Until this is called, a page is not reported as unchanged on later
+        runs, so a run that fails before saving its results is redone.
+        """
+        if self.cache is not None:
+            self.cache.mark_processed(self._opened.items())
+
+    async def screenshot(self, url, path):
+        """Save a browser screenshot of url"""
+        await self._ensure_browser()
+        async with self.pool.page() as page:
+            await self.nav.goto(page, self.resolve(url))
+            await page.screenshot(path=path)
+
+    async def close(self):
+        os.makedirs(os.path.dirname(self.strategy_path), exist_ok=True)
+        with open(self.strategy_path, 'w') as f:
+            json.dump(self.strategies, f, indent=2)
+        print(f"📡 Pages fetched: {self.counts['http']} over HTTP, {self.counts['browser']} in browser")
+        if self.cache is not None:
+            print(f"   🗃️  {self.counts['cached']} served from cache, "
+                  f"{self.counts['not_modified']} not modified since last fetch")
+            self.cache.close()
+
+        if self.client is not None:
+            await self.client.aclose()
+        if self.pool is not None:
+            await self.pool.close()
+        if self.browser is not None:
+            self.nav.save()
+            await self.browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+def serve_fixtures(directory, port=8765):
+    """Serve saved pages at http://127.0.0.1:<port>/<host>/<path>"""
+    from functools import partial
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+    handler = partial(SimpleHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    print(f"📂 Serving {directory} at http://127.0.0.1:{port}")
+    print(f"   Run scrapers with SCRAPER_FIXTURE_URL=http://127.0.0.1:{port}")
+    server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description='Page fetcher utilities')
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help='serve saved pages as a local fixture site')
+    serve.add_argument('directory')
+    serve.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve_fixtures(args.directory, args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Cricket Analytics - Static Export
+Renders every page and API response to files nginx can serve without the app
+
+Each URL is written as <path>/index.html (pages) or <path>.json (APIs), with
+a .gz copy beside it for nginx's gzip_static. A manifest records, per URL, a
+digest of the table rows it was rendered from; later runs re-render only
+URLs whose rows changed, so freezing after an import of one season leaves
+the other seasons' files alone and reads only that season's rows.
+import_data.py and scrape_data.py run it after every import that changed
+data.
+
+Usage:
+    python freeze.py                      # re-render changed pages into FREEZE_DIR
+    python freeze.py --force --jobs 8     # re-render everything with 8 processes
+"""
+
+import sys
+import os
+import gzip
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from flask import url_for
+from sqlalchemy import and_, or_, select
+
+from app import (app, db, assets, PARTITION, Venue, VenueStats, refreshed_stats, refreshed_aggregates,
+                 refreshed_player_index)
+from venues import venue_slug
+
+MANIFEST = '.freeze-manifest.json'
+# Table digests of the last run, so the next one re-reads only what an import wrote
+FINGERPRINTS = '.freeze-fingerprints.json'
+
+# Endpoints answering query strings (search boxes, DataTables paging); not frozen
+DYNAMIC_ENDPOINTS = {
+    'static', 'metrics', 'api_player_search',
+    'api_season_matches', 'api_season_batting', 'api_season_bowling',
+    'api_bbl_matches', 'api_bbl_batting', 'api_bbl_bowling',
+}
+
+# Tables each endpoint renders from. Those with league/season in the URL, or
+# showing the default season, depend only on that season's rows; the others
+# on whole tables. An endpoint not listed here depends on every table, so a
+# new page is always correct before it is added.
+SEASON_DEPENDENCIES = {
+    'index': ('bbl_batting', 'bbl_bowling', 'bbl_match'),
+    'season_matches': ('bbl_match',),
+    'season_batting': ('bbl_batting',),
+    'season_bowling': ('bbl_bowling',),
+    'season_standings': ('standing',),
+    'bbl_matches': ('bbl_match',),
+    'bbl_batting': ('bbl_batting',),
+    'bbl_bowling': ('bbl_bowling',),
+    'bbl_standings': ('standing',),
+    'api_batting_stats': ('bbl_batting',),
+    'api_bowling_stats': ('bbl_bowling',),
+    'api_match_stats': ('bbl_match',),
+    'api_leaderboard': ('bbl_batting', 'bbl_bowling', 'bbl_match'),
+    'api_season_standings': ('standing',),
+    'api_bbl_standings': ('standing',),
+    'season_venues': ('venue_stats', 'venue_performer'),
+    'bbl_venues': ('venue_stats', 'venue_performer'),
+    'api_venues': ('venue_stats',),
+    'api_venue': ('venue_stats', 'venue_performer'),
+}
+TABLE_DEPENDENCIES = {
+    'api_analytics_batting': ('delivery', 'bbl_match', 'venue'),
+    'api_analytics_bowling': ('delivery', 'bbl_match', 'venue'),
+}
+# Bookkeeping tables no page shows
+UNTRACKED_TABLES = {'data_generation'}
+
+def season_values():
+    """URL values for every league and season with stats"""
+    stats = refreshed_stats()
+    pairs = set()
+    for name in ('matches', 'batting', 'bowling'):
+        pairs.update(stats.seasons(name))
+    return [dict(zip(PARTITION, pair)) for pair in sorted(pairs)]
+
+def venue_values():
+    """URL values for every venue page; those URLs show the default season"""
+    names = (db.session.query(Venue.name).join(VenueStats, VenueStats.venue_id == Venue.id)
+             .filter(VenueStats.league == app.config['DEFAULT_LEAGUE'],
+                     VenueStats.season == app.config['DEFAULT_SEASON']))
+    return [{'venue': venue_slug(name)} for (name,) in sorted(names)]
+
+# URL arguments -> function listing their values; a page keyed by a new
+# argument (player, team) is frozen once its generator is added here
+URL_VALUES = {
+    frozenset(PARTITION): season_values,
+    frozenset({'venue'}): venue_values,
+}
+
+def frozen_urls():
+    """[(url, endpoint, url values)] for every page and API response that can be frozen"""
+    urls = []
+    with app.test_request_context():
+        for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+            if rule.endpoint in DYNAMIC_ENDPOINTS or 'GET' not in rule.methods:
+                continue
+            arguments = frozenset(rule.arguments)
+            if not arguments:
+                values_list = [{}]
+            elif arguments in URL_VALUES:
+                values_list = URL_VALUES[arguments]()
+            else:
+                print(f"⚠️  Not freezing {rule.rule}: no values for {', '.join(sorted(arguments))}")
+                continue
+            for values in values_list:
+                urls.append((url_for(rule.endpoint, **values), rule.endpoint, values))
+    return urls
+
+def table_fingerprints(partitions=None, previous=None):
+    """Digest of each table's rows, per league and season where the table has them
+
+    Keys are (table, league, season), with league and season None for
+    unpartitioned tables. Ids are left out, so a table rewritten with the
+    same rows (venue aggregates, a --replace import) keeps its digest.
+
+    Given the (league, season) pairs an import wrote and the digests of the
+    previous run, only those seasons' rows and the unpartitioned tables are
+    read; every other season keeps its previous digest.
+    """
+    incremental = partitions is not None and previous is not None
+    fingerprints = {}
+    for table in db.metadata.sorted_tables:
+        if table.name in UNTRACKED_TABLES:
+            continue
+        columns = [c for c in table.columns if c.name != 'id']
+        partitioned = all(name in table.c for name in PARTITION)
+        order = table.c.id if 'id' in table.c else list(table.primary_key.columns)[0]
+        query = select(*columns).order_by(order)
+        if incremental and partitioned:
+            fingerprints.update({key: digest for key, digest in previous.items()
+                                 if key[0] == table.name and key[1:] not in partitions})
+            if not partitions:
+                continue
+            query = query.where(or_(*(and_(*(table.c[name] == value for name, value in zip(PARTITION, pair)))
+                                      for pair in partitions)))
+        digests = {}
+        for row in db.session.execute(query):
+            key = (table.name,) + (tuple(getattr(row, name) for name in PARTITION)
+                                   if partitioned else (None, None))
+            digest = digests.get(key)
+            if digest is None:
+                digest = digests[key] = hashlib.blake2b(digest_size=16)
+            digest.update(repr(row).encode())
+        fingerprints.update({key: digest.hexdigest() for key, digest in digests.items()})
+    return fingerprints
+
+def dependency_digest(endpoint, values, fingerprints, seasons):
+    """Digest of the rows a URL is rendered from, compared between runs"""
+    if endpoint in SEASON_DEPENDENCIES:
+        league = values.get('league', app.config['DEFAULT_LEAGUE'])
+        season = values.get('season', app.config['DEFAULT_SEASON'])
+        parts = [(table, league, season, fingerprints.get((table, league, season)))
+                 for table in SEASON_DEPENDENCIES[endpoint]]
+    else:
+        tables = set(TABLE_DEPENDENCIES.get(endpoint, {key[0] for key in fingerprints}))
+        parts = sorted((key, value) for key, value in fingerprints.items() if key[0] in tables)
+    # Pages also list every season in their navigation and name the hashed asset files
+    parts.append(seasons)
+    if not endpoint.startswith('api_'):
+        parts.append(assets.version)
+    return hashlib.blake2b(repr((endpoint, values, parts)).encode(), digest_size=16).hexdigest()
+
+def output_path(output, url, mimetype):
+    """File a URL is frozen to: <path>/index.html for pages, <path>.json for JSON"""
+    path = url.strip('/')
+    if mimetype == 'application/json':
+        return os.path.join(output, path + '.json')
+    return os.path.join(output, path, 'index.html')
+
+def write_atomically(path, body):
+    """Write via a temporary file so nginx never serves a half-written file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'wb') as f:
+        f.write(body)
+    os.replace(temp, path)
+
+def start_worker():
+    # Connections must not be shared with the parent process across the fork
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+def render(job):
+    """Render one URL and write it with its .gz copy; returns (url, path, error)"""
+    url, output = job
+    response = app.test_client().get(url)
+    if response.status_code != 200:
+        return url, None, f"HTTP {response.status_code}"
+    body = response.get_data()
+    path = output_path(output, url, response.mimetype)
+    write_atomically(path, body)
+    write_atomically(path + '.gz', gzip.compress(body, compresslevel=9, mtime=0))
+    return url, path, None
+
+def load_manifest(output):
+    try:
+        with open(os.path.join(output, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load_fingerprints(output):
+    try:
+        with open(os.path.join(output, FINGERPRINTS)) as f:
+            return {tuple(key): digest for *key, digest in json.load(f)}
+    except (OSError, ValueError):
+        return None
+
+def freeze(output=None, jobs=None, force=False, partitions=None):
+    """Re-render URLs whose rows changed since the last run; returns (rendered, unchanged, removed)
+
+    Importers pass partitions, the (league, season) pairs they wrote, so
+    only those seasons are fingerprinted again; without it every row is read.
+    """
+    output = output or app.config['FREEZE_DIR']
+    manifest = {} if force else load_manifest(output)
+    previous = None if force else load_fingerprints(output)
+
+    with app.test_request_context():
+        urls = frozen_urls()
+        fingerprints = table_fingerprints(partitions and set(partitions), previous)
+        seasons = season_values()
+        # Load the in-memory engines once here; forked workers inherit them
+        refreshed_stats()
+        refreshed_aggregates()
+        refreshed_player_index()
+        db.session.remove()
+
+    pages = {}
+    stale = []
+    for url, endpoint, values in urls:
+        digest = dependency_digest(endpoint, values, fingerprints, seasons)
+        entry = manifest.get(url)
+        pages[url] = {'digest': digest, 'path': entry and entry['path']}
+        if entry is None or entry['digest'] != digest or not os.path.exists(entry['path']):
+            stale.append(url)
+
+    failed = []
+    results = []
+    if stale:
+        jobs = jobs or min(len(stale), os.cpu_count() or 1)
+        work = [(url, output) for url in stale]
+        # Pages are rendered for real, not replayed from the response cache,
+        # and are not counted as requests in the site's metrics
+        cache_enabled = app.config['RESPONSE_CACHE_ENABLED']
+        metrics_enabled = app.config['METRICS_ENABLED']
+        app.config['RESPONSE_CACHE_ENABLED'] = app.config['METRICS_ENABLED'] = False
+        try:
+            if jobs > 1:
+                with multiprocessing.get_context('fork').Pool(jobs, initializer=start_worker) as pool:
+                    results = pool.map(render, work, chunksize=max(len(work) // (jobs * 4), 1))
+            else:
+                results = [render(job) for job in work]
+        finally:
+            app.config['RESPONSE_CACHE_ENABLED'] = cache_enabled
+            app.config['METRICS_ENABLED'] = metrics_enabled
+        for url, path, error in results:
+            if error:
+                print(f"❌ {url}: {error}")
+                failed.append(url)
+                del pages[url]
+            else:
+                pages[url]['path'] = path
+
+    # Files of URLs that no longer exist (a season removed) would be served forever
+    removed = 0
+    for url, entry in manifest.items():
+        if url not in pages and entry.get('path'):
+            for path in (entry['path'], entry['path'] + '.gz'):
+                if os.path.exists(path):
+                    os.remove(path)
+            removed += 1
+
+    write_atomically(os.path.join(output, MANIFEST), json.dumps(pages, indent=1, sort_keys=True).encode())
+    write_atomically(os.path.join(output, FINGERPRINTS),
+                     json.dumps(sorted(([*key, digest] for key, digest in fingerprints.items()), key=str)).encode())
+    rendered = len(stale) - len(failed)
+    return rendered, len(pages) - rendered, removed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render every page and API response to static files')
+    parser.add_argument('--output', metavar='DIR', help=f"output directory (default {app.config['FREEZE_DIR']})")
+    parser.add_argument('--jobs', type=int, help='render processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true', help='re-render every URL, changed or not')
+    args = parser.parse_args(argv)
+
+    print("="*60)
+    print("🧊 Cricket Analytics - Static Export")
+    print("="*60)
+    started = time.perf_counter()
+    rendered, unchanged, removed = freeze(args.output, args.jobs, args.force)
+    print(f"✅ {rendered} rendered, {unchanged} unchanged, {removed} removed "
+          f"in {time.perf_counter() - started:.2f}s → {args.output or app.config['FREEZE_DIR']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,192 +1,389 @@
 #!/usr/bin/env python3
 """
 Cricket Analytics - Bulk Data Import Script
-Imports all cricket data from hardcoded dataset into SQLite database
+Streams cricket data from CSV/JSONL files into the database in fixed-size chunks
+
+Rows are upserted on each table's natural key, so only new or changed rows
+are written. --replace wipes the tables and bulk inserts instead, which is
+the fastest path for a full historical backfill.
+
+Every file is loaded into one league and season (--league/--season, default
+from config); --replace and --prune never touch rows of other seasons.
+
+Usage:
+    python import_data.py                                  # bundled seed_data/*.csv
+    python import_data.py --matches m.csv --batting b.jsonl --bowling w.csv
+    python import_data.py --batting big.jsonl --prune      # also drop rows not in the file
+    python import_data.py --batting big.jsonl --replace --chunk-size 20000
+    python import_data.py --scraped scraped_data --prune    # scraper JSONL output
+    python import_data.py --deliveries balls.csv --replace  # ball-by-ball history
+    python import_data.py --matches m.csv --league wbbl --season 2023-24
+    python import_data.py --check                           # exit 1 unless the seed data is already stored
 """
 
 import sys
 import os
+import csv
+import json
+import time
+import argparse
+from datetime import date
+from itertools import islice
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from app import app, db, BBLMatch, BBLBatting, BBLBowling
-
-def import_bbl_matches():
-    """Import BBL match data"""
-    print("📊 Importing BBL matches...")
-
-    matches_data = [
-        (1, "Dec 15, 2024", "MCG", "Melbourne Stars", "133/9 (20)", "Perth Scorchers", "135/6 (18.3)", "Scorchers won", "Perth Scorchers", "4 wickets", "Aaron Hardie"),
-        (2, "Dec 15, 2024", "Sydney", "Melbourne Renegades", "155/8 (20)", "Sydney Sixers", "159/5 (18.2)", "Sixers won", "Sydney Sixers", "5 wickets", "Jordan Silk"),
-        (3, "Dec 17, 2024", "Adelaide", "Adelaide Strikers", "140/7 (20)", "Sydney Thunder", "141/5 (18.4)", "Thunder won", "Sydney Thunder", "5 wickets", "Sam Konstas"),
-        (4, "Dec 18, 2024", "MCG", "Melbourne Stars", "180/5 (20)", "Brisbane Heat", "181/7 (19.4)", "Heat won", "Brisbane Heat", "3 wickets", "Marnus Labuschagne"),
-        (5, "Dec 19, 2024", "Hobart", "Hobart Hurricanes", "74/10 (14.3)", "Melbourne Renegades", "75/2 (10.4)", "Renegades won", "Melbourne Renegades", "8 wickets", "Tom Rogers"),
-        (6, "Dec 20, 2024", "Adelaide", "Adelaide Strikers", "189/7 (20)", "Melbourne Stars", "165/9 (20)", "Strikers won", "Adelaide Strikers", "24 runs", "Matthew Short"),
-        (7, "Dec 21, 2024", "Perth", "Perth Scorchers", "146/9 (20)", "Hobart Hurricanes", "147/5 (19.2)", "Hurricanes won", "Hobart Hurricanes", "5 wickets", "Mitchell Owen"),
-        (8, "Dec 22, 2024", "Sydney", "Sydney Thunder", "178/8 (20)", "Sydney Sixers", "150/7 (20)", "Thunder won", "Sydney Thunder", "28 runs", "David Warner"),
-        (9, "Dec 23, 2024", "Adelaide", "Adelaide Strikers", "169/7 (20)", "Brisbane Heat", "171/6 (19.4)", "Heat won", "Brisbane Heat", "4 wickets", "Xavier Bartlett"),
-        (10, "Dec 26, 2024", "Perth", "Perth Scorchers", "139/8 (20)", "Melbourne Renegades", "142/7 (19.3)", "Renegades won", "Melbourne Renegades", "3 wickets", "Jake Fraser-McGurk"),
-        (11, "Dec 27, 2024", "MCG", "Melbourne Stars", "180/4 (20)", "Sydney Sixers", "182/5 (19.3)", "Sixers won", "Sydney Sixers", "5 wickets", "Steven Smith"),
-        (12, "Dec 28, 2024", "Perth", "Perth Scorchers", "187/6 (20)", "Brisbane Heat", "166/8 (20)", "Scorchers won", "Perth Scorchers", "21 runs", "Ashton Turner"),
-        (13, "Dec 29, 2024", "Hobart", "Hobart Hurricanes", "172/6 (20)", "Adelaide Strikers", "145/9 (20)", "Hurricanes won", "Hobart Hurricanes", "27 runs", "Ben McDermott"),
-        (14, "Dec 30, 2024", "Sydney", "Sydney Thunder", "158/7 (20)", "Melbourne Stars", "162/6 (19.2)", "Stars won", "Melbourne Stars", "4 wickets", "Glenn Maxwell"),
-        (15, "Dec 31, 2024", "Brisbane", "Brisbane Heat", "169/8 (20)", "Sydney Sixers", "170/6 (19.4)", "Sixers won", "Sydney Sixers", "4 wickets", "Jordan Silk"),
-        (16, "Jan 1, 2025", "Sydney", "Sydney Thunder", "179/5 (20)", "Melbourne Renegades", "166/8 (20)", "Thunder won", "Sydney Thunder", "13 runs", "Jason Sangha"),
-        (17, "Jan 2, 2025", "Adelaide", "Adelaide Strikers", "161/7 (20)", "Perth Scorchers", "162/5 (18.3)", "Scorchers won", "Perth Scorchers", "5 wickets", "Cooper Connolly"),
-        (18, "Jan 3, 2025", "Hobart", "Hobart Hurricanes", "179/4 (20)", "Sydney Sixers", "162/8 (20)", "Hurricanes won", "Hobart Hurricanes", "17 runs", "Nikhil Chaudhary"),
-        (19, "Jan 4, 2025", "Brisbane", "Brisbane Heat", "190/5 (20)", "Melbourne Stars", "154/9 (20)", "Heat won", "Brisbane Heat", "36 runs", "Colin Munro"),
-        (20, "Jan 4, 2025", "Melbourne", "Melbourne Renegades", "187/7 (20)", "Adelaide Strikers", "147/9 (20)", "Renegades won", "Melbourne Renegades", "40 runs", "Josh Brown"),
-    ]
+from app import (app, db, PARTITION, SEASON_PATTERN, BBLMatch, BBLBatting, BBLBowling, Delivery,
+                 bump_generation, current_generation)
+from snapshot import staged_import
+from scores import match_numbers
+from venues import refresh_venues
+from freeze import freeze
+import standings
 
-    count = 0
-    for match_data in matches_data:
-        match = BBLMatch(
-            match_no=match_data[0],
-            date=match_data[1],
-            venue=match_data[2],
-            team1=match_data[3],
-            score1=match_data[4],
-            team2=match_data[5],
-            score2=match_data[6],
-            result=match_data[7],
-            winner=match_data[8],
-            margin=match_data[9],
-            player_of_match=match_data[10]
-        )
-        db.session.add(match)
-        count += 1
-
-    db.session.commit()
-    print(f"✅ Imported {count} BBL matches")
-
-def import_bbl_batting():
-    """Import BBL batting statistics"""
-    print("📊 Importing BBL batting stats...")
-
-    batting_data = [
-        (1, "Mitchell Owen", "Hobart Hurricanes", 11, 452, 41.09, 203.60, "108", 2, 0, 35, 36),
-        (2, "David Warner", "Sydney Thunder", 11, 357, 32.45, 140.55, "86", 0, 3, 44, 10),
-        (3, "Glenn Maxwell", "Melbourne Stars", 11, 325, 29.55, 162.81, "90*", 0, 2, 27, 18),
-        (4, "Cooper Connolly", "Perth Scorchers", 10, 294, 32.67, 146.27, "66", 0, 3, 28, 12),
-        (5, "Josh Brown", "Melbourne Renegades", 11, 291, 26.45, 158.15, "73", 0, 2, 30, 16),
-        (6, "Ben McDermott", "Hobart Hurricanes", 11, 287, 26.09, 139.32, "68", 0, 2, 32, 8),
-        (7, "Jason Sangha", "Sydney Thunder", 11, 285, 25.91, 134.91, "67", 0, 2, 28, 7),
-        (8, "Jake Fraser-McGurk", "Melbourne Renegades", 11, 277, 25.18, 172.67, "79", 0, 2, 20, 19),
-        (9, "Jordan Silk", "Sydney Sixers", 11, 275, 30.56, 142.49, "70", 0, 2, 25, 9),
-        (10, "Matthew Short", "Adelaide Strikers", 10, 268, 26.80, 151.41, "69", 0, 2, 31, 11),
-        (11, "Marnus Labuschagne", "Brisbane Heat", 8, 263, 32.88, 131.66, "77", 0, 2, 28, 7),
-        (12, "Tim David", "Hobart Hurricanes", 10, 256, 42.67, 171.81, "62*", 0, 2, 13, 20),
-        (13, "Steven Smith", "Sydney Sixers", 8, 238, 29.75, 128.65, "66", 0, 1, 29, 4),
-        (14, "Ashton Turner", "Perth Scorchers", 10, 236, 33.71, 137.21, "55", 0, 1, 18, 11),
-        (15, "Marcus Stoinis", "Melbourne Stars", 9, 228, 28.50, 144.30, "53", 0, 1, 16, 14),
-        (16, "Sam Konstas", "Sydney Thunder", 9, 224, 24.89, 168.42, "73", 0, 2, 24, 11),
-        (17, "Colin Munro", "Brisbane Heat", 10, 221, 22.10, 161.31, "62", 0, 1, 21, 13),
-        (18, "Moises Henriques", "Sydney Sixers", 11, 219, 24.33, 131.73, "48", 0, 0, 20, 6),
-        (19, "Alex Ross", "Adelaide Strikers", 10, 213, 21.30, 124.42, "51", 0, 1, 21, 5),
-        (20, "Nick Hobson", "Perth Scorchers", 10, 208, 26.00, 145.10, "52", 0, 1, 18, 10),
-    ]
+SEED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seed_data')
 
-    count = 0
-    for player_data in batting_data:
-        player = BBLBatting(
-            rank=player_data[0],
-            player_name=player_data[1],
-            team=player_data[2],
-            matches=player_data[3],
-            runs=player_data[4],
-            average=player_data[5],
-            strike_rate=player_data[6],
-            high_score=player_data[7],
-            hundreds=player_data[8],
-            fifties=player_data[9],
-            fours=player_data[10],
-            sixes=player_data[11]
-        )
-        db.session.add(player)
-        count += 1
-
-    db.session.commit()
-    print(f"✅ Imported {count} BBL batting records")
-
-def import_bbl_bowling():
-    """Import BBL bowling statistics"""
-    print("📊 Importing BBL bowling stats...")
-
-    bowling_data = [
-        (1, "Jason Behrendorff", "Perth Scorchers", 10, 17, "3/21", 17.82, 7.05, 13.41),
-        (2, "Tom Rogers", "Melbourne Renegades", 10, 16, "4/23", 17.38, 7.51, 13.88),
-        (3, "Lance Morris", "Perth Scorchers", 8, 15, "3/22", 15.67, 8.10, 11.60),
-        (4, "Lloyd Pope", "Sydney Sixers", 10, 15, "3/25", 20.87, 8.49, 14.73),
-        (5, "Riley Meredith", "Hobart Hurricanes", 9, 13, "3/27", 19.54, 7.73, 15.15),
-        (6, "Spencer Johnson", "Adelaide Strikers", 7, 13, "4/20", 13.08, 6.54, 11.08),
-        (7, "Ben Dwarshuis", "Sydney Sixers", 11, 14, "4/32", 22.57, 7.76, 17.43),
-        (8, "Nathan Ellis", "Hobart Hurricanes", 11, 14, "3/23", 23.71, 7.93, 17.93),
-        (9, "Xavier Bartlett", "Brisbane Heat", 9, 13, "3/22", 19.69, 7.53, 15.69),
-        (10, "Nathan McAndrew", "Sydney Thunder", 10, 13, "5/26", 21.69, 7.68, 16.92),
-        (11, "Chris Green", "Sydney Thunder", 11, 12, "3/18", 23.25, 7.15, 19.50),
-        (12, "Wes Agar", "Adelaide Strikers", 9, 11, "3/28", 24.09, 8.00, 18.00),
-        (13, "Kane Richardson", "Melbourne Renegades", 11, 11, "3/26", 29.09, 8.03, 21.73),
-        (14, "Adam Zampa", "Melbourne Stars", 9, 11, "3/21", 24.18, 7.85, 18.55),
-        (15, "Joel Paris", "Perth Scorchers", 9, 10, "3/19", 22.70, 7.32, 18.60),
-        (16, "Ben Cutting", "Sydney Sixers", 8, 9, "3/24", 21.56, 7.76, 16.67),
-        (17, "Hayden Kerr", "Sydney Sixers", 11, 9, "3/27", 32.22, 7.84, 24.67),
-        (18, "Doug Warren", "Melbourne Stars", 8, 8, "3/31", 24.00, 7.38, 19.50),
-        (19, "Matthew Kuhnemann", "Brisbane Heat", 8, 8, "2/21", 28.75, 7.93, 21.75),
-        (20, "Mark Steketee", "Brisbane Heat", 7, 8, "2/18", 21.75, 7.25, 18.00),
-    ]
+DEFAULT_CHUNK_SIZE = 5000
+
+# table key -> (model, bundled seed file or None)
+TABLES = {
+    'matches': (BBLMatch, 'bbl_matches.csv'),
+    'batting': (BBLBatting, 'bbl_batting.csv'),
+    'bowling': (BBLBowling, 'bbl_bowling.csv'),
+    'deliveries': (Delivery, None),
+}
+
+# model -> function computing its numeric columns from the raw text columns
+DERIVED_COLUMNS = {
+    BBLMatch: match_numbers,
+}
+
+def read_rows(path):
+    """Yield one dict per record from a .csv or .jsonl file without loading it all"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+class RowFile:
+    """The records of a .csv or .jsonl file; every iteration reads the file again"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        return read_rows(self.path)
 
+def column_coercers(model):
+    """Map each insertable column of model to a function turning raw values into its type"""
+    def make(python_type):
+        def coerce(value):
+            if value is None or value == '':
+                return None
+            if isinstance(value, python_type):
+                return value
+            if python_type is int and isinstance(value, str):
+                return int(float(value))
+            if python_type is date:
+                return date.fromisoformat(value)
+            return python_type(value)
+        return coerce
+
+    coercers = {}
+    for column in model.__table__.columns:
+        if column.primary_key or column.name in getattr(model, 'maintained_columns', ()):
+            continue
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            python_type = str
+        coercers[column.name] = make(python_type)
+    return coercers
+
+def typed_rows(model, rows, partition):
+    """Keep only the model's columns and convert them to the column types
+
+    Derived columns are always recomputed from the raw text, so a file never
+    needs to carry them and cannot disagree with its own scores. Every row is
+    placed in partition, a {'league': ..., 'season': ...} dict.
+    """
+    coercers = column_coercers(model)
+    derive = DERIVED_COLUMNS.get(model)
+    for row in rows:
+        if derive is not None:
+            row = {**row, **derive(row)}
+        row = {**row, **partition}
+        yield {name: coerce(row.get(name)) for name, coerce in coercers.items()}
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def bulk_insert(model, rows, partition, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Insert rows with one executemany per chunk in the current transaction
+
+    Only one chunk is held in memory at a time, so files of any size can be
+    streamed through. Returns (row_count, seconds).
+    """
+    insert = model.__table__.insert()
     count = 0
-    for player_data in bowling_data:
-        player = BBLBowling(
-            rank=player_data[0],
-            player_name=player_data[1],
-            team=player_data[2],
-            matches=player_data[3],
-            wickets=player_data[4],
-            best_figures=player_data[5],
-            average=player_data[6],
-            economy=player_data[7],
-            strike_rate=player_data[8]
-        )
-        db.session.add(player)
-        count += 1
-
-    db.session.commit()
-    print(f"✅ Imported {count} BBL bowling records")
-
-def main():
+    started = time.perf_counter()
+    for chunk in chunked(typed_rows(model, rows, partition), chunk_size):
+        db.session.execute(insert, chunk)
+        count += len(chunk)
+    return count, time.perf_counter() - started
+
+def dialect_insert(table):
+    """INSERT construct with ON CONFLICT support for the configured database"""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+def count_existing(model, keys):
+    """How many of the given natural keys are already stored"""
+    if not keys:
+        return 0
+    key_columns = [getattr(model, name) for name in model.natural_key]
+    if len(key_columns) == 1:
+        condition = key_columns[0].in_([k[0] for k in keys])
+    else:
+        condition = db.tuple_(*key_columns).in_(list(keys))
+    return db.session.query(db.func.count(model.id)).filter(condition).scalar()
+
+def last_rows(model, rows, partition):
+    """{natural key: position of its last row in rows}, reading only the key columns"""
+    coercers = column_coercers(model)
+    last = {}
+    for position, row in enumerate(rows):
+        key = tuple(coercers[name](partition[name] if name in partition else row.get(name))
+                    for name in model.natural_key)
+        last[key] = position
+    return last
+
+def upsert_rows(model, rows, partition, chunk_size=DEFAULT_CHUNK_SIZE, prune=False):
+    """Insert new rows and update changed ones, matched on model.natural_key
+
+    Uses INSERT ... ON CONFLICT DO UPDATE with a WHERE clause that skips rows
+    whose stored values already match, so unchanged rows cause no writes.
+    model.maintained_columns are left as stored.
+    rows is read twice (a RowFile or a list): first for the keys, so when a
+    key repeats only its last row is written, and every key is counted once.
+    With prune=True, stored rows of the partition whose key did not appear in
+    rows are deleted.
+    Returns a dict of inserted/updated/unchanged/deleted/repeated counts.
+    """
+    last = last_rows(model, rows, partition)
+    table = model.__table__
+    keys = model.natural_key
+    skipped = set(keys) | set(getattr(model, 'maintained_columns', ()))
+    values = [c for c in table.columns if not c.primary_key and c.name not in skipped]
+
+    insert = dialect_insert(table)
+    statement = insert.on_conflict_do_update(
+        index_elements=[table.c[name] for name in keys],
+        set_={c.name: insert.excluded[c.name] for c in values},
+        where=db.or_(*[c.is_distinct_from(insert.excluded[c.name]) for c in values])
+    )
+
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'repeated': 0}
+    # Earlier rows of a repeated key are dropped, so each key is written and counted once
+    latest = (row for position, row in enumerate(typed_rows(model, rows, partition))
+              if last[tuple(row[name] for name in keys)] == position)
+    for chunk in chunked(latest, chunk_size):
+        chunk_keys = {tuple(row[name] for name in keys) for row in chunk}
+        inserted = len(chunk_keys) - count_existing(model, chunk_keys)
+        # rowcount covers inserts plus updates that passed the WHERE clause
+        written = db.session.execute(statement, chunk).rowcount
+        updated = max(written - inserted, 0)
+        counts['inserted'] += inserted
+        counts['updated'] += updated
+        counts['unchanged'] += len(chunk) - inserted - updated
+    # The final row is always the last of its key, so it gives the number of rows read
+    counts['repeated'] = (max(last.values()) + 1 if last else 0) - len(last)
+
+    if prune:
+        key_columns = [getattr(model, name) for name in keys]
+        stale = [row[0] for row in db.session.query(model.id, *key_columns).filter_by(**partition)
+                 if tuple(row[1:]) not in last]
+        for ids in chunked(stale, chunk_size):
+            db.session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        counts['deleted'] = len(stale)
+
+    return counts
+
+def high_water_marks():
+    """Highest stored delivery and match ids, taken before an import"""
+    return {model: db.session.query(db.func.coalesce(db.func.max(model.id), 0)).scalar()
+            for model in (Delivery, BBLMatch)}
+
+def rewrites_deliveries(edited, high_water):
+    """Whether an import changed deliveries that workers may already hold
+
+    Workers append new deliveries to their in-memory aggregates. They must
+    reload instead when a delivery or match was edited or removed, or when a
+    new match row names the venue of deliveries stored before it. edited
+    maps table keys to updated plus deleted row counts.
+    """
+    if edited.get('deliveries') or edited.get('matches'):
+        return True
+    d, m = Delivery, BBLMatch
+    return db.session.query(db.exists().where(
+        m.id > high_water[m], d.id <= high_water[d],
+        d.league == m.league, d.season == m.season, d.match_no == m.match_no
+    )).scalar()
+
+def format_counts(counts):
+    summary = ', '.join(f"{counts[k]:,} {k}" for k in ('inserted', 'updated', 'unchanged', 'deleted'))
+    if counts.get('repeated'):
+        summary += f" ({counts['repeated']:,} repeated keys, last row kept)"
+    return summary
+
+def import_table(key, path, partition, chunk_size=DEFAULT_CHUNK_SIZE, replace=False, prune=False):
+    """Load one table from path into one league and season
+
+    Returns (rows read, rows written, stored rows edited or deleted).
+    """
+    model, _ = TABLES[key]
+    print(f"📊 Importing {model.__tablename__} from {path}...")
+
+    started = time.perf_counter()
+    if replace:
+        edited = model.query.filter_by(**partition).delete()
+        count, _ = bulk_insert(model, read_rows(path), partition, chunk_size)
+        written = count + edited
+        summary = f"{edited:,} deleted, {count:,} inserted"
+    else:
+        counts = upsert_rows(model, RowFile(path), partition, chunk_size, prune=prune)
+        count = counts['inserted'] + counts['updated'] + counts['unchanged']
+        edited = counts['updated'] + counts['deleted']
+        written = counts['inserted'] + edited
+        summary = format_counts(counts)
+    seconds = time.perf_counter() - started
+
+    rate = count / seconds if seconds > 0 else float('inf')
+    print(f"✅ {key}: {summary} in {seconds:.2f}s ({rate:,.0f} rows/sec)")
+    return count, written, edited
+
+def season_arg(value):
+    """--season value, refused unless the site's URLs can reach it (2024-25, 2024)"""
+    if not SEASON_PATTERN.match(value):
+        raise argparse.ArgumentTypeError(f"{value!r} is not a season like 2024-25 or 2024")
+    return value
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk import cricket data from CSV/JSONL files')
+    for key, (model, _) in TABLES.items():
+        parser.add_argument(f'--{key}', metavar='FILE',
+                            help=f'CSV or JSONL file for {model.__tablename__}')
+    parser.add_argument('--scraped', metavar='DIR',
+                        help='import <key>.jsonl files written by scrape_data.py in DIR')
+    parser.add_argument('--league', default=app.config['DEFAULT_LEAGUE'],
+                        choices=sorted(app.config['LEAGUES']),
+                        help=f"league the files belong to (default {app.config['DEFAULT_LEAGUE']})")
+    parser.add_argument('--season', default=app.config['DEFAULT_SEASON'], type=season_arg,
+                        help=f"season the files belong to, e.g. 2023-24 (default {app.config['DEFAULT_SEASON']})")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'rows per executemany batch (default {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--replace', action='store_true',
+                        help="wipe the season's rows of each imported table and bulk insert instead of upserting")
+    parser.add_argument('--prune', action='store_true',
+                        help="when upserting, delete the season's stored rows missing from the file")
+    parser.add_argument('--check', action='store_true',
+                        help='write nothing; exit 1 if importing the files would change any row')
+    parser.add_argument('--no-freeze', action='store_true',
+                        help='skip re-rendering the static copies of changed pages')
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main import function"""
+    args = parse_args(argv)
+    partition = dict(zip(PARTITION, (args.league, args.season)))
+
+    # With no files given, load the bundled seed data into every table
+    sources = {key: getattr(args, key) for key in TABLES if getattr(args, key)}
+    if args.scraped:
+        for key in ('matches', 'batting', 'bowling'):
+            path = os.path.join(args.scraped, f'{key}.jsonl')
+            if key not in sources and os.path.exists(path):
+                sources[key] = path
+        if not sources:
+            sys.exit(f"No matches/batting/bowling .jsonl files in {args.scraped}")
+    if not sources:
+        sources = {key: os.path.join(SEED_DIR, seed) for key, (_, seed) in TABLES.items() if seed}
+
     print("="*60)
     print("🏏 Cricket Analytics - Bulk Data Import")
+    print(f"   {app.config['LEAGUES'][args.league]} {args.season}")
     print("="*60)
     print()
 
     with app.app_context():
-        # Clear existing data
-        print("🗑️  Clearing existing data...")
-        BBLMatch.query.delete()
-        BBLBatting.query.delete()
-        BBLBowling.query.delete()
-        db.session.commit()
-        print("✅ Cleared old data")
-        print()
+        started = time.perf_counter()
+        total = 0
+        written = 0
+        # Load into a shadow copy; readers keep the old data until it is published
+        with staged_import() as stage:
+            high_water = high_water_marks()
+            edited = {}
+            for key, path in sources.items():
+                read, changed, edited[key] = import_table(key, path, partition, args.chunk_size,
+                                                          replace=args.replace, prune=args.prune)
+                total += read
+                written += changed
+
+            if args.check:
+                # Nothing is published: the shadow (or transaction) is thrown away
+                db.session.rollback()
+                stage.changed = False
+                print()
+                if written:
+                    sys.exit(f"❌ {written:,} rows would change; the database does not match the files")
+                print(f"✅ Database already matches the files ({total:,} rows)")
+                return
 
-        # Import all data
-        import_bbl_matches()
-        import_bbl_batting()
-        import_bbl_bowling()
+            if written:
+                refresh_venues(db.session)
+                if db.engine.dialect.name != 'sqlite':
+                    # Triggers keep the points table current only on SQLite
+                    standings.rebuild(db.session)
+                print("🏟️  Venue aggregates refreshed")
+
+            # Invalidate cached pages in every worker, unless nothing changed
+            if written:
+                generation = bump_generation(rewrite=rewrites_deliveries(edited, high_water))
+            else:
+                generation = current_generation()[0]
+            stage.changed = bool(written)
+        seconds = time.perf_counter() - started
 
         print()
         print("="*60)
         print("✅ BULK IMPORT COMPLETE!")
         print("="*60)
         print()
-        print("📊 Imported:")
-        print(f"   • {BBLMatch.query.count()} matches")
-        print(f"   • {BBLBatting.query.count()} batting records")
-        print(f"   • {BBLBowling.query.count()} bowling records")
+        print(f"📊 Imported into {args.league} {args.season}:")
+        print(f"   • {BBLMatch.query.filter_by(**partition).count()} matches")
+        print(f"   • {BBLBatting.query.filter_by(**partition).count()} batting records")
+        print(f"   • {BBLBowling.query.filter_by(**partition).count()} bowling records")
+        print(f"   • {Delivery.query.filter_by(**partition).count():,} deliveries")
+        print(f"   • {total:,} rows in {seconds:.2f}s ({total / max(seconds, 1e-9):,.0f} rows/sec)")
+        print(f"   • data generation {generation}")
         print()
+
+        if written and app.config['FREEZE_ON_IMPORT'] and not args.no_freeze:
+            rendered, unchanged, removed = freeze(partitions={(args.league, args.season)})
+            print(f"🧊 Static pages: {rendered} re-rendered, {unchanged} unchanged, {removed} removed")
+            print()
         print("🌐 Refresh your website to see the data!")
         print("   → https://whatsapp.ankitrajput.cloud")
 
@@ -0,0 +1,296 @@
+"""
+Cricket Analytics - Metrics
+Request, SQL, template and cache instrumentation, exported in Prometheus format
+"""
+
+import os
+import re
+import json
+import time
+import heapq
+import hmac
+import atexit
+import sqlite3
+import threading
+
+from flask import Response, abort, g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'cricket_http_requests_total': (
+        'counter', 'Requests handled, by endpoint, method and status', None),
+    'cricket_http_request_duration_seconds': (
+        'histogram', 'Time from the start of a request to its response, by endpoint', LATENCY_BUCKETS),
+    'cricket_sql_queries_per_request': (
+        'histogram', 'SQL statements executed per request, by endpoint', QUERY_COUNT_BUCKETS),
+    'cricket_sql_duration_seconds': (
+        'histogram', 'Time spent executing SQL per request, by endpoint', LATENCY_BUCKETS),
+    'cricket_template_render_seconds': (
+        'histogram', 'Jinja render time, by template', LATENCY_BUCKETS),
+    'cricket_cache_requests_total': (
+        'counter', 'Cache lookups made by requests, by cache and result (hit or miss)', None),
+    'cricket_slow_requests_total': (
+        'counter', 'Requests slower than SLOW_REQUEST_SECONDS, by endpoint', None),
+}
+
+# Statements shown for a slow request, slowest first
+SLOW_LOG_STATEMENTS = 5
+SLOW_LOG_STATEMENT_CHARS = 500
+
+class MetricsStore:
+    """Counters summed across every worker in one SQLite file
+
+    Each worker adds to in-memory totals, which costs a dict update, and a
+    timer started by the first unflushed sample adds them to the shared rows
+    in one transaction flush_seconds later, so an idle worker's last
+    requests still show up.
+
+    A histogram is kept as per-bucket counts plus _sum and _count, so the
+    rows of all workers add up to the same histogram one process would have
+    recorded; exposition() makes the buckets cumulative.
+    """
+
+    def __init__(self, path, flush_seconds=5.0, timeout=5.0):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.timer = None
+        self.pid = os.getpid()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS samples ('
+            'name TEXT NOT NULL, '
+            'labels TEXT NOT NULL, '
+            'value REAL NOT NULL, '
+            'PRIMARY KEY (name, labels))'
+        )
+        return conn
+
+    def inc(self, name, labels, value=1):
+        self.add({(name, json.dumps(sorted(labels.items()))): value})
+
+    def add(self, samples):
+        with self.lock:
+            if self.pid != os.getpid():
+                # Forked: the parent's totals and timer are the parent's to flush
+                self.pending, self.timer, self.pid = {}, None, os.getpid()
+            for key, value in samples.items():
+                self.pending[key] = self.pending.get(key, 0) + value
+            if self.timer is None:
+                self.timer = threading.Timer(self.flush_seconds, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        le = next((bound for bound in buckets if value <= bound), '+Inf')
+        self.inc(name + '_bucket', dict(labels, le=str(le)))
+        self.inc(name + '_sum', labels, value)
+        self.inc(name + '_count', labels)
+
+    def flush(self):
+        """Add this worker's totals to the shared file; kept for the next flush if it fails"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not pending:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.executemany(
+                        'INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) '
+                        'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value',
+                        [(name, labels, value) for (name, labels), value in pending.items()]
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            self.add(pending)
+
+    def samples(self):
+        """{(name, labels json): value} of every worker, this one's pending totals included"""
+        self.flush()
+        try:
+            conn = self._connect()
+            try:
+                return {(name, labels): value for name, labels, value
+                        in conn.execute('SELECT name, labels, value FROM samples')}
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return {}
+
+    def exposition(self):
+        """Every metric in the Prometheus text format"""
+        families = {}
+        for (name, labels), value in self.samples().items():
+            family = re.sub(r'_(bucket|sum|count)$', '', name) if name not in METRICS else name
+            families.setdefault(family, []).append((name, dict(json.loads(labels)), value))
+
+        lines = []
+        for family, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f'# HELP {family} {help_text}')
+            lines.append(f'# TYPE {family} {kind}')
+            samples = families.get(family, [])
+            if kind != 'histogram':
+                for name, labels, value in sorted(samples, key=lambda s: sorted(s[1].items())):
+                    lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+                continue
+            series = {}
+            for name, labels, value in samples:
+                le = labels.pop('le', None)
+                entry = series.setdefault(tuple(sorted(labels.items())), {'buckets': {}, 'sum': 0, 'count': 0})
+                if name.endswith('_bucket'):
+                    entry['buckets'][le] = value
+                else:
+                    entry[name.rsplit('_', 1)[1]] = value
+            for labels, entry in sorted(series.items()):
+                labels = dict(labels)
+                total = 0
+                for bound in [str(b) for b in buckets] + ['+Inf']:
+                    total += entry['buckets'].get(bound, 0)
+                    lines.append(f'{family}_bucket{format_labels(dict(labels, le=bound))} {format_value(total)}')
+                lines.append(f'{family}_sum{format_labels(labels)} {format_value(entry["sum"])}')
+                lines.append(f'{family}_count{format_labels(labels)} {format_value(entry["count"])}')
+        return '\n'.join(lines) + '\n'
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + '}'
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class RequestMetrics:
+    """What one request has spent so far"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.slowest = []       # heap of (seconds, sequence, statement)
+        self.templates = []     # start times of templates being rendered
+
+class Metrics:
+    """Hooks recording into a MetricsStore, and the /metrics view reading it
+
+    Every request is timed and counted by endpoint. SQL statements are
+    counted and timed through the engine's cursor events, templates through
+    Flask's render signals, and cache lookups by the code making them; all
+    of it only while a request is being handled, so imports and freeze.py
+    record nothing. A request slower than SLOW_REQUEST_SECONDS is logged
+    with its slowest statements.
+    """
+
+    def __init__(self, path, flush_seconds=5.0):
+        self.store = MetricsStore(path, flush_seconds)
+
+    def init_app(self, app, engine):
+        self.app = app
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        before_render_template.connect(self.start_template, app)
+        template_rendered.connect(self.finish_template, app)
+        event.listen(engine, 'before_cursor_execute', self.start_query)
+        event.listen(engine, 'after_cursor_execute', self.finish_query)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+        atexit.register(self.store.flush)
+
+    @staticmethod
+    def current():
+        return g.get('_metrics') if has_request_context() else None
+
+    def start_request(self):
+        if self.app.config['METRICS_ENABLED']:
+            g._metrics = RequestMetrics()
+
+    def finish_request(self, response):
+        state = g.pop('_metrics', None)
+        if state is None:
+            return response
+        seconds = time.perf_counter() - state.started
+        endpoint = request.endpoint or 'unmatched'
+        labels = {'endpoint': endpoint}
+        self.store.inc('cricket_http_requests_total',
+                       dict(labels, method=request.method, status=str(response.status_code)))
+        self.store.observe('cricket_http_request_duration_seconds', labels, seconds)
+        self.store.observe('cricket_sql_queries_per_request', labels, state.queries)
+        self.store.observe('cricket_sql_duration_seconds', labels, state.sql_seconds)
+        if seconds >= self.app.config['SLOW_REQUEST_SECONDS']:
+            self.store.inc('cricket_slow_requests_total', labels)
+            self.log_slow_request(state, seconds, response)
+        return response
+
+    def log_slow_request(self, state, seconds, response):
+        lines = [f"Slow request: {request.method} {request.full_path.rstrip('?')} {response.status_code} "
+                 f"took {seconds * 1000:.1f}ms ({state.queries} SQL statements, "
+                 f"{state.sql_seconds * 1000:.1f}ms in SQL)"]
+        for query_seconds, _, statement in sorted(state.slowest, reverse=True):
+            statement = ' '.join(statement.split())
+            if len(statement) > SLOW_LOG_STATEMENT_CHARS:
+                statement = statement[:SLOW_LOG_STATEMENT_CHARS] + '...'
+            lines.append(f"    {query_seconds * 1000:8.1f}ms  {statement}")
+        self.app.logger.warning('\n'.join(lines))
+
+    def start_query(self, conn, cursor, statement, parameters, context, executemany):
+        if self.current() is not None:
+            conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    def finish_query(self, conn, cursor, statement, parameters, context, executemany):
+        state = self.current()
+        starts = conn.info.get('metrics_query_start')
+        if state is None or not starts:
+            return
+        seconds = time.perf_counter() - starts.pop()
+        state.queries += 1
+        state.sql_seconds += seconds
+        entry = (seconds, state.queries, statement)
+        if len(state.slowest) < SLOW_LOG_STATEMENTS:
+            heapq.heappush(state.slowest, entry)
+        else:
+            heapq.heappushpop(state.slowest, entry)
+
+    def start_template(self, sender, template, context, **extra):
+        state = self.current()
+        if state is not None:
+            state.templates.append(time.perf_counter())
+
+    def finish_template(self, sender, template, context, **extra):
+        state = self.current()
+        if state is not None and state.templates:
+            seconds = time.perf_counter() - state.templates.pop()
+            self.store.observe('cricket_template_render_seconds', {'template': template.name}, seconds)
+
+    def cache_lookup(self, cache, hit):
+        """Count a lookup in one of the caches (response, stats_snapshot, ...)"""
+        if self.current() is not None:
+            self.store.inc('cricket_cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+    def view(self):
+        if not self.app.config['METRICS_ENABLED']:
+            abort(404)
+        # With METRICS_TOKEN set, scrapers must send it as a bearer token
+        token = self.app.config['METRICS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(403)
+        return Response(self.store.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Cricket Analytics - Schema Migrations
+Brings an existing database up to date with the models in app.py
+
+Usage:
+    python migrations.py upgrade   # create tables and apply pending migrations
+    python migrations.py status    # list applied and pending migrations
+    python migrations.py check     # fail if a route query needs a full-table sort
+"""
+
+import sys
+import os
+from contextlib import nullcontext
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import bindparam, event, inspect, select, text
+
+from app import (app, db, PARTITION, BBLMatch, BBLBatting, BBLBowling, Delivery, Standing,
+                 Venue, VenueStats, VenuePerformer, DataGeneration)
+from scores import match_numbers
+from snapshot import import_lock, sqlite_path
+import standings
+from venues import refresh_venues
+
+MIGRATIONS = []
+
+def migration(version, description):
+    """Register a migration step; steps run once each, in version order"""
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return register
+
+def create_missing_indexes(conn, *models):
+    """Create any index declared on the models that the database lacks
+
+    Indexes on columns the table does not have yet are skipped; the
+    migration that adds those columns creates them.
+    """
+    for model in models:
+        existing = {c['name'] for c in inspect(conn).get_columns(model.__tablename__)}
+        for index in model.__table__.indexes:
+            if all(column.name in existing for column in index.columns):
+                index.create(conn, checkfirst=True)
+
+def add_missing_column(conn, model, column_name):
+    """ALTER TABLE ADD COLUMN unless create_all already made the column"""
+    table = model.__table__
+    existing = {c['name'] for c in inspect(conn).get_columns(table.name)}
+    if column_name in existing:
+        return
+    column = table.c[column_name]
+    ddl = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column_name} {ddl}'))
+
+PARTITIONED = (BBLMatch, BBLBatting, BBLBowling, Delivery)
+
+def add_partition_columns(conn):
+    """Add league and season to every data table, filling them with the default season
+
+    Safe to repeat. Steps older than migration 7 call it first because the
+    trigger and venue SQL they install now reads these columns.
+    """
+    defaults = {'league': app.config['DEFAULT_LEAGUE'], 'season': app.config['DEFAULT_SEASON']}
+    for model in PARTITIONED:
+        for name in PARTITION:
+            add_missing_column(conn, model, name)
+            conn.execute(text(f'UPDATE {model.__tablename__} SET {name} = :value WHERE {name} IS NULL'),
+                         {'value': defaults[name]})
+
+def recreate_venue_tables(conn):
+    """Drop and recreate the per-venue aggregate tables with the models' columns
+
+    They hold nothing refresh_venues() cannot recompute. Steps older than
+    migration 9 call it before refreshing, because that SQL now writes the
+    league and season columns.
+    """
+    for model in (VenuePerformer, VenueStats):
+        model.__table__.drop(conn, checkfirst=True)
+    for model in (VenueStats, VenuePerformer):
+        model.__table__.create(conn)
+
+# Migrations
+
+@migration(1, 'Leaderboard sort indexes and player/team lookup indexes')
+def add_leaderboard_indexes(conn):
+    create_missing_indexes(conn, BBLMatch, BBLBatting, BBLBowling)
+
+@migration(2, 'Unique natural keys for incremental upserts')
+def add_natural_keys(conn):
+    # Older imports could leave duplicates; keep the newest row of each key
+    for model in (BBLMatch, BBLBatting, BBLBowling):
+        table = model.__tablename__
+        # Keys as of this step; the league and season parts arrive in migration 7
+        existing = {c['name'] for c in inspect(conn).get_columns(table)}
+        keys = ', '.join(name for name in model.natural_key if name in existing)
+        conn.execute(text(
+            f'DELETE FROM {table} WHERE id NOT IN '
+            f'(SELECT MAX(id) FROM {table} GROUP BY {keys})'
+        ))
+    create_missing_indexes(conn, BBLMatch, BBLBatting, BBLBowling)
+
+@migration(3, 'Ball-by-ball deliveries table')
+def add_deliveries(conn):
+    # create_all() makes the table; this covers databases where it already existed
+    create_missing_indexes(conn, Delivery)
+
+@migration(4, 'Numeric score, margin and date columns on matches')
+def add_match_numbers(conn):
+    table = BBLMatch.__table__
+    parsed = list(match_numbers({}))
+    for name in parsed:
+        add_missing_column(conn, BBLMatch, name)
+
+    # Backfill from the text columns with the same parser the importers use
+    rows = conn.execute(select(table.c.id, table.c.date, table.c.score1,
+                               table.c.score2, table.c.margin)).mappings().all()
+    if rows:
+        statement = (table.update()
+                     .where(table.c.id == bindparam('row_id'))
+                     .values({name: bindparam(name) for name in parsed}))
+        conn.execute(statement, [{'row_id': row['id'], **match_numbers(row)} for row in rows])
+    create_missing_indexes(conn, BBLMatch)
+
+@migration(5, 'Points table maintained by triggers on bbl_match')
+def add_standings(conn):
+    add_partition_columns(conn)
+    create_missing_indexes(conn, Standing)
+    standings.install_triggers(conn)
+    standings.rebuild(conn)
+
+@migration(6, 'Venue IDs and per-venue aggregate tables')
+def add_venues(conn):
+    add_partition_columns(conn)
+    add_missing_column(conn, BBLMatch, 'venue_id')
+    create_missing_indexes(conn, BBLMatch, Venue)
+    recreate_venue_tables(conn)
+    refresh_venues(conn)
+
+@migration(7, 'League and season partition on every table')
+def add_partitions(conn):
+    add_partition_columns(conn)
+    # Natural keys gain the partition; single-column sort indexes become per-season ones
+    for index in ('uq_bbl_match_natural_key', 'uq_bbl_batting_natural_key',
+                  'uq_bbl_bowling_natural_key', 'uq_delivery_natural_key',
+                  'ix_bbl_match_match_no', 'ix_bbl_match_match_date',
+                  'ix_bbl_match_margin_runs', 'ix_bbl_match_margin_wickets',
+                  'ix_bbl_batting_rank', 'ix_bbl_batting_runs',
+                  'ix_bbl_bowling_rank', 'ix_bbl_bowling_wickets'):
+        conn.execute(text(f'DROP INDEX IF EXISTS {index}'))
+    create_missing_indexes(conn, *PARTITIONED)
+
+    # One points table per season: recreate the table with its new key and refill it
+    Standing.__table__.drop(conn, checkfirst=True)
+    Standing.__table__.create(conn)
+    standings.install_triggers(conn)
+    standings.rebuild(conn)
+    recreate_venue_tables(conn)
+    refresh_venues(conn)
+
+@migration(8, 'Generation of the last import that rewrote deliveries or matches')
+def add_rewritten_generation(conn):
+    add_missing_column(conn, DataGeneration, 'rewritten_generation')
+
+@migration(9, 'Venue aggregates per league and season')
+def partition_venue_aggregates(conn):
+    recreate_venue_tables(conn)
+    refresh_venues(conn)
+
+# Runner
+
+def ensure_version_table(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, '
+        'description VARCHAR(200), '
+        'applied_at VARCHAR(30))'
+    ))
+
+def applied_versions(conn):
+    ensure_version_table(conn)
+    return {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+
+def upgrade():
+    """Create missing tables, then apply every pending migration
+
+    Holds the import lock, so a running import cannot publish a snapshot
+    taken before the migration over it.
+    """
+    path = sqlite_path(db.engine)
+    if path:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with import_lock(path) if path else nullcontext():
+        return apply_migrations()
+
+def apply_migrations():
+    db.create_all()
+
+    with db.engine.begin() as conn:
+        done = applied_versions(conn)
+
+    applied = 0
+    for version, description, func in MIGRATIONS:
+        if version in done:
+            continue
+        # One transaction per step so a failure leaves earlier steps applied
+        with db.engine.begin() as conn:
+            func(conn)
+            conn.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) '
+                     'VALUES (:v, :d, :t)'),
+                {'v': version, 'd': description, 't': datetime.utcnow().isoformat(timespec='seconds')}
+            )
+        print(f"✅ Applied migration {version}: {description}")
+        applied += 1
+
+    if not applied:
+        print("✅ Database schema is up to date")
+    return applied
+
+def status():
+    with db.engine.begin() as conn:
+        done = applied_versions(conn)
+    for version, description, _ in MIGRATIONS:
+        mark = '✅' if version in done else '⏳'
+        print(f"{mark} {version:3d}  {description}")
+
+# Query plan check
+
+# Every URL whose SQL must be answerable from an index without a sort step.
+# Pages and APIs served from the in-memory engines (StatsSnapshot, delivery
+# aggregates, player index) run no SQL per request and are not listed.
+CHECK_ROUTES = [
+    '/bbl/standings',
+    '/bbl/2024-25/standings',
+    '/bbl/venues',
+    '/bbl/2024-25/venues',
+    '/api/bbl/standings',
+    '/api/bbl/2024-25/standings',
+    '/api/venues',
+    '/api/venues/mcg',
+]
+
+# Read by every cached route to key its response; a primary key lookup
+BOOKKEEPING_TABLES = ('data_generation',)
+
+def capture_route_queries(routes):
+    """Request each route and record the SELECT statements it runs
+
+    Raises RuntimeError for a route that runs none, so the check can never
+    pass without having looked at anything.
+    """
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if (statement.lstrip().upper().startswith('SELECT')
+                and not any(f'FROM {table}' in statement for table in BOOKKEEPING_TABLES)):
+            captured.append((route, statement, parameters))
+
+    # Cached responses would hide the SQL, so render every route for real
+    cache_enabled = app.config['RESPONSE_CACHE_ENABLED']
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        client = app.test_client()
+        for route in routes:
+            before = len(captured)
+            response = client.get(route)
+            if response.status_code >= 500:
+                raise RuntimeError(f"{route} returned {response.status_code}")
+            if len(captured) == before:
+                raise RuntimeError(f"{route} ran no SQL; remove it from CHECK_ROUTES")
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+        app.config['RESPONSE_CACHE_ENABLED'] = cache_enabled
+    return captured
+
+def check_query_plans(routes=CHECK_ROUTES):
+    """Return (route, statement, plan) for queries that sort the whole table"""
+    if db.engine.url.get_backend_name() != 'sqlite':
+        print("⚠️  Query plan check only supports SQLite; skipping")
+        return []
+
+    failures = []
+    for route, statement, parameters in capture_route_queries(routes):
+        with db.engine.connect() as conn:
+            cursor = conn.connection.cursor()
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            plan = [row[-1] for row in cursor.fetchall()]
+        if any('USE TEMP B-TREE FOR' in step and 'ORDER BY' in step for step in plan):
+            failures.append((route, statement, plan))
+    return failures
+
+def check():
+    failures = check_query_plans()
+    if not failures:
+        print(f"✅ No route query falls back to a full-table sort ({len(CHECK_ROUTES)} routes checked)")
+        return True
+
+    for route, statement, plan in failures:
+        print(f"❌ {route}")
+        print(f"   {' '.join(statement.split())}")
+        for step in plan:
+            print(f"     → {step}")
+    print(f"\n❌ {len(failures)} route queries sort without an index")
+    return False
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'upgrade'
+    with app.app_context():
+        if command == 'upgrade':
+            upgrade()
+        elif command == 'status':
+            status()
+        elif command == 'check':
+            upgrade()
+            if not check():
+                sys.exit(1)
+        else:
+            print(__doc__)
+            sys.exit(2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Cricket Analytics - Scraper Page Cache
+Content-addressed on-disk cache of fetched HTML with conditional revalidation
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+
+from scraping import BASE_DIR
+
+PAGE_CACHE_DIR = os.environ.get('SCRAPER_CACHE_DIR') or os.path.join(BASE_DIR, 'data', 'page_cache')
+# Pages younger than this are reused without any request at all
+DEFAULT_TTL = int(os.environ.get('SCRAPER_CACHE_TTL', 15 * 60))
+DEFAULT_MAX_BYTES = int(os.environ.get('SCRAPER_CACHE_MAX_MB', 200)) * 1024 * 1024
+
+class PageCache:
+    """Fetched pages stored once per distinct body, indexed by URL
+
+    Bodies live in objects/<sha256>, so identical pages are stored once. The
+    SQLite index keeps each URL's body hash, ETag and Last-Modified for
+    conditional requests, when it was fetched and last used, and the hash
+    that was last processed downstream (parsed and written to the database).
+    A page is "unchanged" when its current hash equals that processed hash,
+    so a run that crashed before saving does not skip the page next time.
+
+    A body no URL points to any more is deleted when its page is stored
+    again, and when the stored bodies exceed max_bytes, the least recently
+    used ones are evicted along with their index rows.
+    """
+
+    def __init__(self, directory=PAGE_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.objects = os.path.join(directory, 'objects')
+        os.makedirs(self.objects, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, 'index.db'), isolation_level=None)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            'url TEXT PRIMARY KEY, '
+            'sha TEXT NOT NULL, '
+            'size INTEGER NOT NULL, '
+            'etag TEXT, '
+            'last_modified TEXT, '
+            'fetched_at REAL NOT NULL, '
+            'last_used REAL NOT NULL, '
+            'processed_sha TEXT)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS ix_pages_last_used ON pages (last_used)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS ix_pages_sha ON pages (sha)')
+        # Bytes of stored bodies, kept up to date by store() so evict() scans only when over
+        self.total = self.conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM pages GROUP BY sha)'
+        ).fetchone()[0]
+
+    def _object_path(self, sha):
+        return os.path.join(self.objects, sha)
+
+    def lookup(self, url):
+        """Index entry for url as a dict, or None if the page is not cached"""
+        cursor = self.conn.execute('SELECT * FROM pages WHERE url = ?', (url,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        entry = dict(zip([c[0] for c in cursor.description], row))
+        if not os.path.exists(self._object_path(entry['sha'])):
+            self.conn.execute('DELETE FROM pages WHERE url = ?', (url,))
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read(self, entry):
+        """Body of a cached page; marks it as recently used"""
+        self.conn.execute('UPDATE pages SET last_used = ? WHERE url = ?', (time.time(), entry['url']))
+        with open(self._object_path(entry['sha']), encoding='utf-8') as f:
+            return f.read()
+
+    def revalidated(self, url):
+        """The server answered 304: the cached body is current again"""
+        now = time.time()
+        self.conn.execute('UPDATE pages SET fetched_at = ?, last_used = ? WHERE url = ?', (now, now, url))
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """Save a freshly downloaded body and return its content hash"""
+        data = body.encode('utf-8')
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._object_path(sha)
+        previous = self.conn.execute('SELECT sha, size FROM pages WHERE url = ?', (url,)).fetchone()
+        if not os.path.exists(path):
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self.total += len(data)
+
+        now = time.time()
+        self.conn.execute(
+            'INSERT INTO pages (url, sha, size, etag, last_modified, fetched_at, last_used) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (url) DO UPDATE SET sha = excluded.sha, size = excluded.size, '
+            'etag = excluded.etag, last_modified = excluded.last_modified, '
+            'fetched_at = excluded.fetched_at, last_used = excluded.last_used',
+            (url, sha, len(data), etag, last_modified, now, now)
+        )
+        # The page's old body is garbage once no other URL shares it
+        if previous is not None and previous[0] != sha:
+            if self.conn.execute('SELECT 1 FROM pages WHERE sha = ?', (previous[0],)).fetchone() is None:
+                self._remove_object(previous[0])
+                self.total -= previous[1]
+        if self.total > self.max_bytes:
+            self.evict()
+        return sha
+
+    def is_processed(self, url, sha):
+        row = self.conn.execute('SELECT processed_sha FROM pages WHERE url = ?', (url,)).fetchone()
+        return row is not None and row[0] == sha
+
+    def mark_processed(self, pages):
+        """Record (url, sha) pairs whose content has been consumed downstream"""
+        self.conn.executemany('UPDATE pages SET processed_sha = ? WHERE url = ?',
+                              [(sha, url) for url, sha in pages])
+
+    def evict(self):
+        """Drop least recently used bodies until the cache fits in max_bytes"""
+        objects = self.conn.execute(
+            'SELECT sha, MAX(size), MAX(last_used) FROM pages GROUP BY sha ORDER BY 3'
+        ).fetchall()
+        total = sum(size for _, size, _ in objects)
+        for sha, size, _ in objects:
+            if total <= self.max_bytes:
+                break
+            self.conn.execute('DELETE FROM pages WHERE sha = ?', (sha,))
+            self._remove_object(sha)
+            total -= size
+        self.total = total
+
+    def _remove_object(self, sha):
+        try:
+            os.remove(self._object_path(sha))
+        except OSError:
+            pass
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,70 @@
+"""
+Cricket Analytics - Score Parsing
+Turns scorecard text like "133/9 (20)", "4 wickets" and "Dec 15, 2024" into numbers
+"""
+
+import re
+from datetime import date, datetime
+
+# "133/9 (20)", "135/6 (18.3 ov)", "98 (17.2)" when all out
+SCORE_RE = re.compile(r'^\s*(\d+)(?:\s*/\s*(\d+))?\s*(?:\(\s*(\d+)(?:\.(\d))?\s*(?:ov|overs)?\s*\))?')
+# "24 runs", "4 wickets", "1 wkt"
+MARGIN_RE = re.compile(r'(\d+)\s*(run|wicket|wkt)', re.IGNORECASE)
+
+DATE_FORMATS = ('%Y-%m-%d', '%b %d, %Y', '%B %d, %Y', '%d %b %Y', '%d %B %Y', '%d/%m/%Y')
+
+def parse_score(text):
+    """(runs, wickets, legal balls) from a score; None for anything unparsed
+
+    A score without a wicket count means the side was bowled out. Australian
+    "wickets/runs" notation ("9/133") is recognised by its impossible wicket count.
+    """
+    match = SCORE_RE.match(text or '')
+    if not match:
+        return None, None, None
+    runs, wickets, overs, balls = match.groups()
+    runs = int(runs)
+    wickets = int(wickets) if wickets is not None else 10
+    if wickets > 10 and runs <= 10:
+        runs, wickets = wickets, runs
+    legal_balls = int(overs) * 6 + int(balls or 0) if overs is not None else None
+    return runs, wickets, legal_balls
+
+def parse_margin(text):
+    """(margin_runs, margin_wickets); at most one is set, neither for ties or no result"""
+    match = MARGIN_RE.search(text or '')
+    if not match:
+        return None, None
+    value = int(match.group(1))
+    if match.group(2).lower() == 'run':
+        return value, None
+    return None, value
+
+def parse_date(text):
+    """Calendar date of a match, or None for "TBD" and unknown formats"""
+    if isinstance(text, date):
+        return text
+    text = (text or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def match_numbers(row):
+    """Numeric columns of a BBLMatch row, parsed from its text columns"""
+    runs1, wickets1, balls1 = parse_score(row.get('score1'))
+    runs2, wickets2, balls2 = parse_score(row.get('score2'))
+    margin_runs, margin_wickets = parse_margin(row.get('margin'))
+    return {
+        'match_date': parse_date(row.get('date')),
+        'runs1': runs1,
+        'wickets1': wickets1,
+        'balls1': balls1,
+        'runs2': runs2,
+        'wickets2': wickets2,
+        'balls2': balls2,
+        'margin_runs': margin_runs,
+        'margin_wickets': margin_wickets,
+    }
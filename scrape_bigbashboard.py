@@ -2,78 +2,122 @@
 """
 Cricket Analytics - BigBashboard.com Complete Scraper
 Scrapes BBL, Super Smash, and International T20 data
+
+With --crawl, the links found on the homepage are followed by a bounded
+concurrent crawl, and every match, player and stats page it reaches is
+extracted:
+    python scrape_bigbashboard.py --crawl --workers 4 --max-depth 3 --max-pages 500
+
+Stats pages are found by probing candidate URLs concurrently. The URL that
+worked is saved per league and section in data/endpoint_map.json and tried
+first on later runs; the candidates are only probed again if it stops working.
+
+Records are streamed to scraped_bigbashboard/<section>.jsonl as they are
+extracted. --resume continues an interrupted run from its checkpoint,
+skipping finished sections and pages and picking up the crawl frontier.
 """
 
 import sys
 import os
 import asyncio
+import argparse
+import re
 import json
 from datetime import datetime
+from urllib.parse import urlsplit
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-try:
-    from playwright.async_api import async_playwright
-except ImportError:
-    print("❌ Playwright not installed!")
-    print("Run: pip install playwright && playwright install chromium")
-    sys.exit(1)
-
 from app import app, db, BBLMatch, BBLBatting, BBLBowling
+from scraping import BASE_DIR, FAST_MODE, DEFAULT_POOL_SIZE, Crawler, ScrapeOutput, first_match
+from fetcher import Fetcher
+from page_cache import PageCache
 
 BASE_URL = 'http://bigbashboard.com'
+DEFAULT_LEAGUE = 'bbl'
+ENDPOINT_MAP_PATH = os.path.join(BASE_DIR, 'data', 'endpoint_map.json')
+OUTPUT_DIR = 'scraped_bigbashboard'
+
+# Generic selectors - adjust based on site structure
+MATCH_CARD_SELECTOR = '.match-card, .match-item, [class*="match"]'
+STATS_ROW_SELECTOR = 'table tbody tr'
+
+# Page kinds recognised from the URL path; anything else with a table is 'stats'
+PAGE_PATTERNS = [
+    ('stats', re.compile(r'/(stats|statistics)(/|$)|/(batting|bowling)$')),
+    ('match', re.compile(r'/(match|matches|scorecard)/[^/]+')),
+    ('player', re.compile(r'/(player|players|profile)/[^/]+')),
+]
+
+async def classify_page(url, doc):
+    """'match', 'player' or 'stats', or None for pages that are only followed"""
+    path = urlsplit(url).path.lower()
+    for kind, pattern in PAGE_PATTERNS:
+        if pattern.search(path):
+            return kind
+    if await doc.rows(STATS_ROW_SELECTOR):
+        return 'stats'
+    return None
+
+def stats_candidates(section, league=DEFAULT_LEAGUE):
+    """URLs a league's batting/bowling table might live at"""
+    return [
+        f"{BASE_URL}/stats/{section}",
+        f"{BASE_URL}/statistics/{section}",
+        f"{BASE_URL}/players/{section}",
+        f"{BASE_URL}/{league}/{section}"
+    ]
+
+def stats_section(url):
+    path = urlsplit(url).path.lower()
+    for section in ('batting', 'bowling'):
+        if section in path:
+            return section
+    return None
 
 class BigBashboardScraper:
-    def __init__(self):
-        self.browser = None
-        self.context = None
-        self.page = None
-        self.data = {
-            'matches': [],
-            'batting': [],
-            'bowling': [],
-            'teams': []
+    def __init__(self, fast=FAST_MODE, use_cache=True, workers=DEFAULT_POOL_SIZE,
+                 league=DEFAULT_LEAGUE, endpoint_map_path=ENDPOINT_MAP_PATH,
+                 output_dir=OUTPUT_DIR, resume=False):
+        # Pages come over HTTP; Chromium is launched only if one needs JavaScript.
+        # Cached pages are revalidated instead of downloaded again.
+        self.fetcher = Fetcher(pool_size=workers, fast=fast, first_party=[BASE_URL],
+                               cache=PageCache() if use_cache else None)
+        self.workers = workers
+        self.league = league
+        self.endpoint_map_path = endpoint_map_path
+        self.endpoints = self._load_endpoints()
+        # Records go straight to JSONL; nothing is accumulated here
+        self.output = ScrapeOutput(output_dir, resume=resume)
+        # page kind -> (output section, extractor)
+        self.extractors = {
+            'match': ('match_pages', self.extract_match_page),
+            'player': ('player_pages', self.extract_player_page),
+            'stats': ('stats_pages', self.extract_stats_page),
         }
 
-    async def init_browser(self):
-        """Initialize Playwright browser"""
-        print("🌐 Launching browser...")
-        playwright = await async_playwright().start()
-        self.browser = await playwright.chromium.launch(
-            headless=True,
-            args=[
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-gpu'
-            ]
-        )
-        self.context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
-        self.page = await self.context.new_page()
-        print("✅ Browser ready!")
+    def section_done(self, section):
+        if self.output.is_done(f'section:{section}'):
+            print(f"⏭️  {section} already scraped in the interrupted run")
+            return True
+        return False
+
+    def write_section(self, section, records):
+        """Stream a section's records; an empty section is left for --resume to retry"""
+        if records:
+            self.output.complete(f'section:{section}', {section: records})
 
     async def scrape_homepage(self):
         """Scrape main page to find all sections"""
         print(f"\n📊 Accessing {BASE_URL}...")
         try:
-            await self.page.goto(BASE_URL, wait_until='networkidle', timeout=30000)
-            await self.page.wait_for_timeout(2000)
-
-            title = await self.page.title()
-            print(f"✅ Page loaded: {title}")
+            async with self.fetcher.open(BASE_URL, 'a') as doc:
+                title = await doc.title()
+                print(f"✅ Page loaded: {title}")
 
-            # Get all links
-            links = await self.page.query_selector_all('a')
-            urls = []
-            for link in links:
-                href = await link.get_attribute('href')
-                text = await link.inner_text()
-                if href:
-                    urls.append({'text': text.strip(), 'href': href})
+                # Get all links
+                urls = await doc.links()
 
             print(f"✅ Found {len(urls)} navigation links")
             return urls
@@ -85,160 +129,198 @@ class BigBashboardScraper:
     async def scrape_matches(self):
         """Scrape match data"""
         print("\n🏏 Scraping match data...")
+        if self.section_done('matches'):
+            return 0
 
         try:
             # Look for matches/fixtures page
-            await self.page.goto(f"{BASE_URL}/matches", wait_until='networkidle', timeout=30000)
-            await self.page.wait_for_timeout(2000)
-
-            # Generic selectors - adjust based on site structure
-            match_elements = await self.page.query_selector_all('.match-card, .match-item, [class*="match"]')
-
-            matches = []
-            for idx, elem in enumerate(match_elements[:40]):
-                try:
-                    # Extract all text from match element
-                    text = await elem.inner_text()
-                    html = await elem.inner_html()
-
-                    # Store raw data for processing
-                    match = {
-                        'match_no': idx + 1,
-                        'raw_text': text,
-                        'raw_html': html[:500]  # Truncate
-                    }
-                    matches.append(match)
-
-                except Exception as e:
-                    continue
+            async with self.fetcher.open(f"{BASE_URL}/matches", MATCH_CARD_SELECTOR) as doc:
+                cards = await doc.cards(MATCH_CARD_SELECTOR, html_limit=500)
+
+            # Store raw data for processing
+            matches = [{
+                'match_no': idx + 1,
+                'raw_text': card['text'],
+                'raw_html': card['html']
+            } for idx, card in enumerate(cards)]
 
             print(f"✅ Scraped {len(matches)} match elements")
-            self.data['matches'] = matches
-            return matches
+            self.write_section('matches', matches)
+            return len(matches)
 
         except Exception as e:
             print(f"❌ Error scraping matches: {e}")
+            return 0
+
+    def _load_endpoints(self):
+        try:
+            with open(self.endpoint_map_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_endpoints(self):
+        os.makedirs(os.path.dirname(self.endpoint_map_path), exist_ok=True)
+        with open(self.endpoint_map_path, 'w') as f:
+            json.dump(self.endpoints, f, indent=2)
+
+    async def probe_stats_table(self, url):
+        """Rows of the stats table at url; empty if the page has none"""
+        try:
+            async with self.fetcher.open(url, STATS_ROW_SELECTOR, timeout=15000) as doc:
+                return await doc.rows(STATS_ROW_SELECTOR, 'td, th')
+        except Exception:
             return []
 
+    async def scrape_stats_table(self, section):
+        """Return the rows of the league's stats table for section ('batting'/'bowling')
+
+        The URL saved for it last time is tried first. If there is none or it
+        no longer has a table, every candidate is probed at once and the first
+        with a table is used and saved.
+        """
+        known = self.endpoints.get(self.league, {}).get(section)
+        if known:
+            rows = await self.probe_stats_table(known)
+            if rows:
+                print(f"✅ Stats at saved URL: {known}")
+                return rows
+            print(f"↪️  Saved URL {known} has no stats table any more, probing candidates")
+
+        candidates = [url for url in stats_candidates(section, self.league) if url != known]
+        url, rows = await first_match(self.probe_stats_table, candidates)
+        league_map = self.endpoints.setdefault(self.league, {})
+        if url is None:
+            league_map.pop(section, None)
+            self._save_endpoints()
+            return []
+
+        print(f"✅ Found stats at: {url}")
+        league_map[section] = url
+        self._save_endpoints()
+        return rows
+
     async def scrape_batting_stats(self):
         """Scrape batting statistics"""
         print("\n📊 Scraping batting stats...")
+        if self.section_done('batting'):
+            return 0
 
         try:
-            # Try common stats URLs
-            possible_urls = [
-                f"{BASE_URL}/stats/batting",
-                f"{BASE_URL}/statistics/batting",
-                f"{BASE_URL}/players/batting",
-                f"{BASE_URL}/bbl/batting"
-            ]
-
-            for url in possible_urls:
-                try:
-                    await self.page.goto(url, wait_until='networkidle', timeout=15000)
-
-                    # Check if stats table exists
-                    table = await self.page.query_selector('table')
-                    if table:
-                        print(f"✅ Found stats at: {url}")
-                        break
-                except:
-                    continue
-
-            # Extract table data
-            rows = await self.page.query_selector_all('table tbody tr')
-
-            players = []
-            for idx, row in enumerate(rows[:20]):
-                try:
-                    cells = await row.query_selector_all('td, th')
-                    if len(cells) >= 5:
-                        player = {
-                            'rank': idx + 1,
-                            'data': [await cell.inner_text() for cell in cells]
-                        }
-                        players.append(player)
-                except:
-                    continue
+            # Saved URL first, else all common stats URLs at once
+            rows = await self.scrape_stats_table('batting')
+
+            players = [{'rank': idx + 1, 'data': cells}
+                       for idx, cells in enumerate(rows) if len(cells) >= 5]
 
             print(f"✅ Scraped {len(players)} batting records")
-            self.data['batting'] = players
-            return players
+            self.write_section('batting', players)
+            return len(players)
 
         except Exception as e:
             print(f"❌ Error scraping batting: {e}")
-            return []
+            return 0
 
     async def scrape_bowling_stats(self):
         """Scrape bowling statistics"""
         print("\n🎳 Scraping bowling stats...")
+        if self.section_done('bowling'):
+            return 0
 
         try:
-            possible_urls = [
-                f"{BASE_URL}/stats/bowling",
-                f"{BASE_URL}/statistics/bowling",
-                f"{BASE_URL}/players/bowling",
-                f"{BASE_URL}/bbl/bowling"
-            ]
-
-            for url in possible_urls:
-                try:
-                    await self.page.goto(url, wait_until='networkidle', timeout=15000)
-                    table = await self.page.query_selector('table')
-                    if table:
-                        print(f"✅ Found stats at: {url}")
-                        break
-                except:
-                    continue
-
-            rows = await self.page.query_selector_all('table tbody tr')
-
-            players = []
-            for idx, row in enumerate(rows[:20]):
-                try:
-                    cells = await row.query_selector_all('td, th')
-                    if len(cells) >= 5:
-                        player = {
-                            'rank': idx + 1,
-                            'data': [await cell.inner_text() for cell in cells]
-                        }
-                        players.append(player)
-                except:
-                    continue
+            rows = await self.scrape_stats_table('bowling')
+
+            players = [{'rank': idx + 1, 'data': cells}
+                       for idx, cells in enumerate(rows) if len(cells) >= 5]
 
             print(f"✅ Scraped {len(players)} bowling records")
-            self.data['bowling'] = players
-            return players
+            self.write_section('bowling', players)
+            return len(players)
 
         except Exception as e:
             print(f"❌ Error scraping bowling: {e}")
-            return []
+            return 0
+
+    async def extract_match_page(self, url, doc):
+        """A match page's scorecard rows"""
+        return {
+            'url': url,
+            'title': await doc.title(),
+            'scorecard': await doc.rows(STATS_ROW_SELECTOR, 'td, th')
+        }
+
+    async def extract_player_page(self, url, doc):
+        """A player page's career table rows"""
+        return {
+            'url': url,
+            'name': await doc.title(),
+            'stats': await doc.rows(STATS_ROW_SELECTOR, 'td, th')
+        }
+
+    async def extract_stats_page(self, url, doc):
+        rows = await doc.rows(STATS_ROW_SELECTOR, 'td, th')
+        return {
+            'url': url,
+            'section': stats_section(url),
+            'rows': [cells for cells in rows if len(cells) >= 5]
+        }
+
+    async def crawl_page(self, url, depth):
+        """Open one crawled page, stream what its extractor finds and return its links"""
+        records = {}
+        async with self.fetcher.open(url, timeout=15000) as doc:
+            kind = await classify_page(url, doc)
+            if kind:
+                section, extract = self.extractors[kind]
+                records[section] = [await extract(url, doc)]
+                print(f"   🔗 [{depth}] {kind}: {url}")
+            links = await doc.links()
+        self.output.complete(url, records)
+        return [link['href'] for link in links]
+
+    async def crawl(self, links, max_depth=2, max_pages=200, rate=2.0, time_budget=None):
+        """Follow the homepage links with `self.workers` pages at once"""
+        print(f"\n🕸️  Crawling from {len(links)} homepage links "
+              f"({self.workers} workers, depth {max_depth}, up to {max_pages} pages)...")
+        crawler = Crawler(self.crawl_page, workers=self.workers, max_depth=max_depth,
+                          max_pages=max_pages, rate=rate, allowed_domains=[BASE_URL],
+                          time_budget=time_budget, on_queue=self.output.queue)
+        crawler.mark_seen(BASE_URL)
+        # Pages finished by an interrupted run are not visited again
+        for key in self.output.done:
+            crawler.mark_seen(key)
+        stats = await crawler.run([link['href'] for link in links], depth=1, base=BASE_URL,
+                                  pending=self.output.pending())
+        print(f"✅ Crawled {stats['visited']} pages ({stats['failed']} failed, "
+              f"{stats['over_budget']} links over the page budget)")
+        return stats
 
     async def take_screenshot(self, name='screenshot'):
-        """Take screenshot for debugging"""
+        """Take screenshot for debugging (launches the browser if needed)"""
         try:
-            await self.page.screenshot(path=f'{name}.png')
+            await self.fetcher.screenshot(BASE_URL, f'{name}.png')
             print(f"📸 Screenshot saved: {name}.png")
-        except:
+        except Exception:
             pass
 
     async def close(self):
-        """Close browser"""
-        if self.browser:
-            await self.browser.close()
+        """Close HTTP client, browser and output files"""
+        await self.fetcher.close()
+        self.output.close()
 
-async def main():
+async def main(fast=FAST_MODE, screenshot=False, use_cache=True, crawl=None,
+               workers=DEFAULT_POOL_SIZE, league=DEFAULT_LEAGUE, output_dir=OUTPUT_DIR,
+               resume=False):
     """Main scraping orchestrator"""
     print("="*70)
     print("🕷️  BigBashboard.com - Complete Data Scraper")
     print("="*70)
     print()
 
-    scraper = BigBashboardScraper()
+    scraper = BigBashboardScraper(fast=fast, use_cache=use_cache, workers=workers, league=league,
+                                  output_dir=output_dir, resume=resume)
 
     try:
-        await scraper.init_browser()
-
         # Scrape homepage to understand structure
         print("🔍 Analyzing website structure...")
         links = await scraper.scrape_homepage()
@@ -248,17 +330,24 @@ async def main():
             json.dump(links, f, indent=2)
         print("💾 Site structure saved to site_structure.json")
 
-        # Take screenshot
-        await scraper.take_screenshot('homepage')
+        # Screenshots need Chromium, so only take one when asked
+        if screenshot:
+            await scraper.take_screenshot('homepage')
 
         # Try to scrape each section
         await scraper.scrape_matches()
         await scraper.scrape_batting_stats()
         await scraper.scrape_bowling_stats()
 
-        # Save all scraped data
-        with open('scraped_data.json', 'w') as f:
-            json.dump(scraper.data, f, indent=2)
+        # Follow the site's own links to the pages the guesses above cannot reach
+        if crawl is not None:
+            await scraper.crawl(links, **crawl)
+
+        scraper.fetcher.mark_processed()
+        # A crawl stopped by its time budget leaves a frontier for --resume
+        if not scraper.output.pending():
+            scraper.output.finish()
+        counts = scraper.output.counts
 
         print()
         print("="*70)
@@ -266,17 +355,22 @@ async def main():
         print("="*70)
         print()
         print("📊 Data collected:")
-        print(f"   • {len(scraper.data['matches'])} matches")
-        print(f"   • {len(scraper.data['batting'])} batting records")
-        print(f"   • {len(scraper.data['bowling'])} bowling records")
+        print(f"   • {counts.get('matches', 0)} matches")
+        print(f"   • {counts.get('batting', 0)} batting records")
+        print(f"   • {counts.get('bowling', 0)} bowling records")
+        if crawl is not None:
+            print(f"   • {counts.get('match_pages', 0)} match pages")
+            print(f"   • {counts.get('player_pages', 0)} player pages")
+            print(f"   • {counts.get('stats_pages', 0)} stats tables")
         print()
         print("💾 Files created:")
-        print("   • scraped_data.json - All scraped data")
+        print(f"   • {output_dir}/*.jsonl - All scraped data, one file per section")
         print("   • site_structure.json - Website navigation map")
-        print("   • homepage.png - Screenshot")
+        if screenshot:
+            print("   • homepage.png - Screenshot")
         print()
         print("📝 Next step:")
-        print("   Review scraped_data.json and customize selectors if needed")
+        print(f"   Review {output_dir}/ and customize selectors if needed")
         print("   Then run data import to populate database")
 
     except Exception as e:
@@ -299,5 +393,39 @@ if __name__ == "__main__":
         subprocess.run([sys.executable, "-m", "pip", "install", "playwright"])
         subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"])
 
+    parser = argparse.ArgumentParser(description='Scrape BigBashboard.com')
+    parser.add_argument('--no-fast', dest='fast', action='store_false', default=FAST_MODE,
+                        help='load every resource and wait for network idle (records the baseline)')
+    parser.add_argument('--screenshot', action='store_true',
+                        help='save homepage.png (launches Chromium)')
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                        help='download every page even if a cached copy is still fresh')
+    parser.add_argument('--crawl', action='store_true',
+                        help='follow homepage links and extract match, player and stats pages')
+    parser.add_argument('--workers', type=int, default=DEFAULT_POOL_SIZE,
+                        help=f'pages crawled or probed concurrently (default {DEFAULT_POOL_SIZE})')
+    parser.add_argument('--league', default=DEFAULT_LEAGUE,
+                        help=f'league whose stats tables are scraped (default {DEFAULT_LEAGUE})')
+    parser.add_argument('--max-depth', type=int, default=2,
+                        help='link hops from the homepage to follow (default 2)')
+    parser.add_argument('--max-pages', type=int, default=200,
+                        help='most pages one crawl will open (default 200)')
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help='requests per second per host, 0 for no limit (default 2)')
+    parser.add_argument('--time-budget', type=float, default=None,
+                        help='stop crawling after this many seconds')
+    parser.add_argument('--output', default=OUTPUT_DIR,
+                        help=f'directory for the JSONL output and checkpoint (default {OUTPUT_DIR})')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue an interrupted run from its checkpoint')
+    args = parser.parse_args()
+
+    crawl = None
+    if args.crawl:
+        crawl = {'max_depth': args.max_depth, 'max_pages': args.max_pages,
+                 'rate': args.rate, 'time_budget': args.time_budget}
+
     # Run scraper
-    asyncio.run(main())
+    asyncio.run(main(fast=args.fast, screenshot=args.screenshot, use_cache=args.use_cache,
+                     crawl=crawl, workers=args.workers, league=args.league,
+                     output_dir=args.output, resume=args.resume))
@@ -2,18 +2,35 @@
 """
 Cricket Analytics - Web Scraper using Playwright
 Scrapes data from T20 dashboard websites
+
+Fetched pages are kept in data/page_cache/. A section whose page has not
+changed since the last successful run is not parsed again, and when no page
+changed the database is left alone entirely. --no-cache fetches everything.
+
+Records are streamed to scraped_data/<section>.jsonl as each section finishes
+and imported from there. If a run dies part way, --resume skips the sections
+it already wrote.
 """
 
 import sys
 import os
 import asyncio
-from playwright.async_api import async_playwright
-import json
+import argparse
+import functools
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from app import app, db, BBLMatch, BBLBatting, BBLBowling
+from app import app, db, BBLMatch, BBLBatting, BBLBowling, bump_generation
+from import_data import RowFile, upsert_rows, format_counts, high_water_marks, rewrites_deliveries
+from snapshot import staged_import
+from venues import refresh_venues
+from freeze import freeze
+import standings
+from scraping import (DEFAULT_POOL_SIZE, FAST_MODE, ScrapeOutput, gather_isolated,
+                      parse_int, parse_float)
+from fetcher import Fetcher
+from page_cache import PageCache
 
 # Target URLs - Update these with actual T20 dashboard URLs
 URLS = {
@@ -22,42 +39,113 @@ URLS = {
     'bowling': 'https://www.espncricinfo.com/records/tournament/bowling-most-wickets-career/big-bash-league-2024-25-15517'
 }
 
-async def scrape_matches(page):
-    """Scrape match data from T20 dashboard"""
+OUTPUT_DIR = 'scraped_data'
+
+def match_row(match):
+    return {
+        'match_no': match.get('match_no'),
+        'date': match.get('date', 'TBD'),
+        'venue': match.get('venue', 'Unknown'),
+        'team1': match.get('team1', 'Team 1'),
+        'score1': match.get('score1', 'TBD'),
+        'team2': match.get('team2', 'Team 2'),
+        'score2': match.get('score2', 'TBD'),
+        'result': match.get('result', 'TBD'),
+        'winner': match.get('winner', 'TBD'),
+        'margin': match.get('margin', 'TBD'),
+        'player_of_match': match.get('player_of_match', 'TBD')
+    }
+
+def batting_row(player):
+    return {
+        'rank': player.get('rank'),
+        'player_name': player.get('player_name'),
+        'team': player.get('team', 'Unknown'),
+        'matches': player.get('matches', 0),
+        'runs': player.get('runs', 0),
+        'average': player.get('average', 0.0),
+        'strike_rate': player.get('strike_rate', 0.0),
+        'high_score': player.get('high_score', '0'),
+        'hundreds': player.get('hundreds', 0),
+        'fifties': player.get('fifties', 0),
+        'fours': player.get('fours', 0),
+        'sixes': player.get('sixes', 0)
+    }
+
+def bowling_row(player):
+    return {
+        'rank': player.get('rank'),
+        'player_name': player.get('player_name'),
+        'team': player.get('team', 'Unknown'),
+        'matches': player.get('matches', 0),
+        'wickets': player.get('wickets', 0),
+        'best_figures': player.get('best_figures', '0/0'),
+        'average': player.get('average', 0.0),
+        'economy': player.get('economy', 0.0),
+        'strike_rate': player.get('strike_rate', 0.0)
+    }
+
+# section -> (model, label)
+SECTIONS = {
+    'matches': (BBLMatch, 'matches'),
+    'batting': (BBLBatting, 'batting records'),
+    'bowling': (BBLBowling, 'bowling records'),
+}
+
+def streamed(section, to_row):
+    """Make scrape(fetcher) write its records to the output as table rows
+
+    The wrapped scraper takes (fetcher, output) and returns how many rows it
+    wrote. A section already written by an interrupted run is skipped; an
+    unchanged page (None) is marked done without writing anything, and an
+    empty result is left undone so --resume tries it again.
+    """
+    def decorator(scrape):
+        @functools.wraps(scrape)
+        async def wrapper(fetcher, output):
+            key = f'section:{section}'
+            if output.is_done(key):
+                print(f"⏭️  {section} already scraped in the interrupted run")
+                return 0
+            records = await scrape(fetcher)
+            if records is None:
+                output.complete(key, {})
+                return 0
+            if records:
+                output.complete(key, {section: [to_row(record) for record in records]})
+            return len(records)
+        return wrapper
+    return decorator
+
+@streamed('matches', match_row)
+async def scrape_matches(fetcher):
+    """Scrape match data from T20 dashboard; None if the page is unchanged"""
     print("🏏 Scraping match data...")
 
     try:
-        await page.goto(URLS['matches'], wait_until='networkidle', timeout=30000)
-        await page.wait_for_timeout(2000)
+        # Example selectors - UPDATE THESE based on actual site
+        async with fetcher.open(URLS['matches'], '.ds-rounded-lg') as doc:
+            if doc.unchanged:
+                print("♻️  Match page unchanged since last run")
+                return None
+            cards = await doc.cards('.ds-rounded-lg', {
+                'team1': '.team1-name',
+                'team2': '.team2-name',
+                'venue': '.venue-name',
+                'date': '.match-date',
+                'result': '.match-result'
+            })
 
-        # Adjust selectors based on actual website structure
         matches = []
-
-        # Example selectors - UPDATE THESE based on actual site
-        match_cards = await page.query_selector_all('.ds-rounded-lg')
-
-        for idx, card in enumerate(match_cards[:20]):  # Limit to 20 matches
-            try:
-                # Extract match details - UPDATE selectors
-                team1 = await card.query_selector('.team1-name')
-                team2 = await card.query_selector('.team2-name')
-                venue = await card.query_selector('.venue-name')
-                date = await card.query_selector('.match-date')
-                result = await card.query_selector('.match-result')
-
-                match_data = {
-                    'match_no': idx + 1,
-                    'date': await date.inner_text() if date else 'TBD',
-                    'venue': await venue.inner_text() if venue else 'Unknown',
-                    'team1': await team1.inner_text() if team1 else 'Team 1',
-                    'team2': await team2.inner_text() if team2 else 'Team 2',
-                    'result': await result.inner_text() if result else 'TBD'
-                }
-                matches.append(match_data)
-
-            except Exception as e:
-                print(f"  ⚠️  Error scraping match {idx + 1}: {e}")
-                continue
+        for idx, card in enumerate(cards):
+            matches.append({
+                'match_no': idx + 1,
+                'date': card['date'] or 'TBD',
+                'venue': card['venue'] or 'Unknown',
+                'team1': card['team1'] or 'Team 1',
+                'team2': card['team2'] or 'Team 2',
+                'result': card['result'] or 'TBD'
+            })
 
         print(f"✅ Scraped {len(matches)} matches")
         return matches
@@ -66,46 +154,37 @@ async def scrape_matches(page):
         print(f"❌ Error scraping matches: {e}")
         return []
 
-async def scrape_batting_stats(page):
-    """Scrape batting statistics"""
+@streamed('batting', batting_row)
+async def scrape_batting_stats(fetcher):
+    """Scrape batting statistics; None if the page is unchanged"""
     print("📊 Scraping batting stats...")
 
     try:
-        await page.goto(URLS['batting'], wait_until='networkidle', timeout=30000)
-        await page.wait_for_timeout(2000)
-
-        players = []
-
         # Find stats table - UPDATE selector based on actual site
-        table = await page.query_selector('table.ds-table')
-        if not table:
+        async with fetcher.open(URLS['batting'], 'table.ds-table tbody tr') as doc:
+            if doc.unchanged:
+                print("♻️  Batting stats page unchanged since last run")
+                return None
+            rows = await doc.rows('table.ds-table tbody tr')
+        if not rows:
             print("⚠️  Batting stats table not found")
             return []
 
-        rows = await table.query_selector_all('tbody tr')
-
-        for idx, row in enumerate(rows[:20]):  # Top 20
-            try:
-                cells = await row.query_selector_all('td')
-                if len(cells) < 8:
-                    continue
-
-                player_data = {
-                    'rank': idx + 1,
-                    'player_name': await cells[0].inner_text(),
-                    'team': await cells[1].inner_text() if len(cells) > 1 else 'Unknown',
-                    'matches': int((await cells[2].inner_text()).strip()) if len(cells) > 2 else 0,
-                    'runs': int((await cells[3].inner_text()).strip()) if len(cells) > 3 else 0,
-                    'average': float((await cells[4].inner_text()).strip()) if len(cells) > 4 else 0.0,
-                    'strike_rate': float((await cells[5].inner_text()).strip()) if len(cells) > 5 else 0.0,
-                    'high_score': await cells[6].inner_text() if len(cells) > 6 else '0',
-                    'sixes': int((await cells[7].inner_text()).strip()) if len(cells) > 7 else 0
-                }
-                players.append(player_data)
-
-            except Exception as e:
-                print(f"  ⚠️  Error scraping player {idx + 1}: {e}")
+        players = []
+        for idx, cells in enumerate(rows):
+            if len(cells) < 8:
                 continue
+            players.append({
+                'rank': idx + 1,
+                'player_name': cells[0],
+                'team': cells[1],
+                'matches': parse_int(cells[2]),
+                'runs': parse_int(cells[3]),
+                'average': parse_float(cells[4]),
+                'strike_rate': parse_float(cells[5]),
+                'high_score': cells[6],
+                'sixes': parse_int(cells[7])
+            })
 
         print(f"✅ Scraped {len(players)} batting records")
         return players
@@ -114,45 +193,36 @@ async def scrape_batting_stats(page):
         print(f"❌ Error scraping batting stats: {e}")
         return []
 
-async def scrape_bowling_stats(page):
-    """Scrape bowling statistics"""
+@streamed('bowling', bowling_row)
+async def scrape_bowling_stats(fetcher):
+    """Scrape bowling statistics; None if the page is unchanged"""
     print("🎳 Scraping bowling stats...")
 
     try:
-        await page.goto(URLS['bowling'], wait_until='networkidle', timeout=30000)
-        await page.wait_for_timeout(2000)
-
-        players = []
-
         # Find stats table - UPDATE selector
-        table = await page.query_selector('table.ds-table')
-        if not table:
+        async with fetcher.open(URLS['bowling'], 'table.ds-table tbody tr') as doc:
+            if doc.unchanged:
+                print("♻️  Bowling stats page unchanged since last run")
+                return None
+            rows = await doc.rows('table.ds-table tbody tr')
+        if not rows:
             print("⚠️  Bowling stats table not found")
             return []
 
-        rows = await table.query_selector_all('tbody tr')
-
-        for idx, row in enumerate(rows[:20]):  # Top 20
-            try:
-                cells = await row.query_selector_all('td')
-                if len(cells) < 7:
-                    continue
-
-                player_data = {
-                    'rank': idx + 1,
-                    'player_name': await cells[0].inner_text(),
-                    'team': await cells[1].inner_text() if len(cells) > 1 else 'Unknown',
-                    'matches': int((await cells[2].inner_text()).strip()) if len(cells) > 2 else 0,
-                    'wickets': int((await cells[3].inner_text()).strip()) if len(cells) > 3 else 0,
-                    'average': float((await cells[4].inner_text()).strip()) if len(cells) > 4 else 0.0,
-                    'economy': float((await cells[5].inner_text()).strip()) if len(cells) > 5 else 0.0,
-                    'best_figures': await cells[6].inner_text() if len(cells) > 6 else '0/0'
-                }
-                players.append(player_data)
-
-            except Exception as e:
-                print(f"  ⚠️  Error scraping bowler {idx + 1}: {e}")
+        players = []
+        for idx, cells in enumerate(rows):
+            if len(cells) < 7:
                 continue
+            players.append({
+                'rank': idx + 1,
+                'player_name': cells[0],
+                'team': cells[1],
+                'matches': parse_int(cells[2]),
+                'wickets': parse_int(cells[3]),
+                'average': parse_float(cells[4]),
+                'economy': parse_float(cells[5]),
+                'best_figures': cells[6]
+            })
 
         print(f"✅ Scraped {len(players)} bowling records")
         return players
@@ -161,126 +231,87 @@ async def scrape_bowling_stats(page):
         print(f"❌ Error scraping bowling stats: {e}")
         return []
 
-def save_to_database(matches, batting, bowling):
-    """Save scraped data to database"""
-    print("\n💾 Saving to database...")
-
-    with app.app_context():
-        # Clear existing data
-        print("🗑️  Clearing old data...")
-        BBLMatch.query.delete()
-        BBLBatting.query.delete()
-        BBLBowling.query.delete()
-        db.session.commit()
-
-        # Import matches
-        for match in matches:
-            m = BBLMatch(
-                match_no=match.get('match_no'),
-                date=match.get('date', 'TBD'),
-                venue=match.get('venue', 'Unknown'),
-                team1=match.get('team1', 'Team 1'),
-                score1=match.get('score1', 'TBD'),
-                team2=match.get('team2', 'Team 2'),
-                score2=match.get('score2', 'TBD'),
-                result=match.get('result', 'TBD'),
-                winner=match.get('winner', 'TBD'),
-                margin=match.get('margin', 'TBD'),
-                player_of_match=match.get('player_of_match', 'TBD')
-            )
-            db.session.add(m)
-
-        # Import batting
-        for player in batting:
-            p = BBLBatting(
-                rank=player.get('rank'),
-                player_name=player.get('player_name'),
-                team=player.get('team', 'Unknown'),
-                matches=player.get('matches', 0),
-                runs=player.get('runs', 0),
-                average=player.get('average', 0.0),
-                strike_rate=player.get('strike_rate', 0.0),
-                high_score=player.get('high_score', '0'),
-                hundreds=player.get('hundreds', 0),
-                fifties=player.get('fifties', 0),
-                fours=player.get('fours', 0),
-                sixes=player.get('sixes', 0)
-            )
-            db.session.add(p)
-
-        # Import bowling
-        for player in bowling:
-            p = BBLBowling(
-                rank=player.get('rank'),
-                player_name=player.get('player_name'),
-                team=player.get('team', 'Unknown'),
-                matches=player.get('matches', 0),
-                wickets=player.get('wickets', 0),
-                best_figures=player.get('best_figures', '0/0'),
-                average=player.get('average', 0.0),
-                economy=player.get('economy', 0.0),
-                strike_rate=player.get('strike_rate', 0.0)
-            )
-            db.session.add(p)
-
-        db.session.commit()
+def save_to_database(output):
+    """Upsert the scraped sections into the database, writing only new or changed rows
 
-        print(f"✅ Saved {len(matches)} matches")
-        print(f"✅ Saved {len(batting)} batting records")
-        print(f"✅ Saved {len(bowling)} bowling records")
+    Rows are streamed from the output's JSONL files into the default league
+    and season, the one the scraped pages cover. Sections that produced
+    nothing this run (unchanged page or failed scrape) are left as stored.
+    """
+    print("\n💾 Saving to database...")
 
-async def main():
+    partition = {'league': app.config['DEFAULT_LEAGUE'], 'season': app.config['DEFAULT_SEASON']}
+    # Load into a shadow copy; readers keep the old data until it is published
+    with app.app_context(), staged_import() as stage:
+        written = 0
+        high_water = high_water_marks()
+        edited = {}
+        for section, (model, label) in SECTIONS.items():
+            if not output.counts.get(section):
+                print(f"♻️  No new {label} scraped, keeping existing rows")
+                continue
+            # Each scrape returns the complete table, so rows it no longer lists are stale
+            counts = upsert_rows(model, RowFile(output.path(section)), partition, prune=True)
+            edited[section] = counts['updated'] + counts['deleted']
+            written += counts['inserted'] + edited[section]
+            print(f"✅ {label}: {format_counts(counts)}")
+
+        # Invalidate cached pages in every worker, unless nothing changed
+        if written:
+            refresh_venues(db.session)
+            if db.engine.dialect.name != 'sqlite':
+                # Triggers keep the points table current only on SQLite
+                standings.rebuild(db.session)
+            bump_generation(rewrite=rewrites_deliveries(edited, high_water))
+        stage.changed = bool(written)
+
+    if written and app.config['FREEZE_ON_IMPORT']:
+        rendered, unchanged, removed = freeze(partitions={(partition['league'], partition['season'])})
+        print(f"🧊 Static pages: {rendered} re-rendered, {unchanged} unchanged, {removed} removed")
+
+async def main(pool_size=DEFAULT_POOL_SIZE, fast=FAST_MODE, use_cache=True,
+               output_dir=OUTPUT_DIR, resume=False):
     """Main scraping function"""
     print("="*60)
     print("🕷️  Cricket Analytics - Web Scraper")
     print("="*60)
     print()
 
-    async with async_playwright() as p:
-        # Launch browser
-        print("🌐 Launching browser...")
-        browser = await p.chromium.launch(
-            headless=True,
-            args=['--no-sandbox', '--disable-setuid-sandbox']
-        )
-
-        context = await browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        )
-
-        page = await context.new_page()
-
-        try:
-            # Scrape all data
-            matches = await scrape_matches(page)
-            batting = await scrape_batting_stats(page)
-            bowling = await scrape_bowling_stats(page)
-
-            # Save to JSON backup
-            data = {
-                'matches': matches,
-                'batting': batting,
-                'bowling': bowling
-            }
-
-            with open('scraped_data.json', 'w') as f:
-                json.dump(data, f, indent=2)
-            print("\n💾 Backup saved to scraped_data.json")
+    output = ScrapeOutput(output_dir, resume=resume)
+    # Server-rendered pages come over pooled HTTP; the browser starts only if one needs it
+    cache = PageCache() if use_cache else None
+    try:
+        async with Fetcher(pool_size=pool_size, fast=fast, first_party=URLS.values(),
+                           cache=cache) as fetcher:
+            # Scrape all sections concurrently; a failed page yields no rows
+            print(f"📑 Scraping with up to {pool_size} pages at once")
+            await gather_isolated(
+                (scrape_matches, fetcher, output),
+                (scrape_batting_stats, fetcher, output),
+                (scrape_bowling_stats, fetcher, output),
+                default=0
+            )
 
-            # Save to database
-            save_to_database(matches, batting, bowling)
+            if not any(output.counts.values()):
+                print("\n♻️  No page changed since the last run, nothing to save")
+                output.finish()
+                return
+            print(f"\n💾 Records saved to {output_dir}/")
 
-            print()
-            print("="*60)
-            print("✅ SCRAPING COMPLETE!")
-            print("="*60)
-            print()
-            print("🌐 Refresh your website:")
-            print("   → https://whatsapp.ankitrajput.cloud")
+            # Save to database
+            save_to_database(output)
+            fetcher.mark_processed()
+            output.finish()
+    finally:
+        output.close()
 
-        finally:
-            await browser.close()
+    print()
+    print("="*60)
+    print("✅ SCRAPING COMPLETE!")
+    print("="*60)
+    print()
+    print("🌐 Refresh your website:")
+    print("   → https://whatsapp.ankitrajput.cloud")
 
 if __name__ == "__main__":
     # Install playwright if not installed
@@ -292,4 +323,18 @@ if __name__ == "__main__":
         subprocess.run([sys.executable, "-m", "pip", "install", "playwright"])
         subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"])
 
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description='Scrape BBL data into the database')
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE,
+                        help=f'pages scraped concurrently (default {DEFAULT_POOL_SIZE}, env SCRAPER_POOL_SIZE)')
+    parser.add_argument('--no-fast', dest='fast', action='store_false', default=FAST_MODE,
+                        help='load every resource and wait for network idle (records the baseline)')
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                        help='download and process every page even if it has not changed')
+    parser.add_argument('--output', default=OUTPUT_DIR,
+                        help=f'directory for the JSONL output and checkpoint (default {OUTPUT_DIR})')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue an interrupted run, skipping sections it already wrote')
+    args = parser.parse_args()
+
+    asyncio.run(main(pool_size=args.pool_size, fast=args.fast, use_cache=args.use_cache,
+                     output_dir=args.output, resume=args.resume))
@@ -0,0 +1,535 @@
+"""
+Cricket Analytics - Shared Scraping Helpers
+Page pooling, concurrency and output helpers used by scrape_data.py and scrape_bigbashboard.py
+"""
+
+import os
+import json
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit, urlunsplit, urljoin, parse_qsl, urlencode
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Pages open at once on the shared browser context
+DEFAULT_POOL_SIZE = int(os.environ.get('SCRAPER_POOL_SIZE', 3))
+
+# Fast navigation blocks these and waits for the target selector instead of network idle
+FAST_MODE = os.environ.get('SCRAPER_FAST_MODE', '1') != '0'
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet', 'texttrack', 'manifest'}
+NAV_STATS_PATH = os.path.join(BASE_DIR, 'data', 'navigation_stats.json')
+
+class PagePool:
+    """A bounded set of pages on one browser context
+
+    Tasks borrow a page with `async with pool.page() as page:`; when every page
+    is in use, further tasks wait. Pages are created lazily up to `size` and
+    reused, and a page that was closed or crashed is replaced on return.
+    """
+
+    def __init__(self, context, size=DEFAULT_POOL_SIZE):
+        self.context = context
+        self.size = max(1, size)
+        self._idle = asyncio.Queue()
+        self._created = 0
+        self._lock = asyncio.Lock()
+        self._pages = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _acquire(self):
+        async with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                page = await self.context.new_page()
+                self._pages.append(page)
+                return page
+        return await self._idle.get()
+
+    @asynccontextmanager
+    async def page(self):
+        page = await self._acquire()
+        try:
+            yield page
+        finally:
+            if page.is_closed():
+                self._pages.remove(page)
+                page = await self.context.new_page()
+                self._pages.append(page)
+            self._idle.put_nowait(page)
+
+    async def run(self, func, *args, **kwargs):
+        """Call func(page, *args, **kwargs) on a borrowed page"""
+        async with self.page() as page:
+            return await func(page, *args, **kwargs)
+
+    async def close(self):
+        for page in self._pages:
+            if not page.is_closed():
+                await page.close()
+        self._pages.clear()
+
+async def gather_isolated(*jobs, default=None):
+    """Run jobs concurrently, isolating failures
+
+    Each job is a (func, *args) tuple whose func returns a coroutine. Returns
+    results in job order; a job that raises is reported and yields `default`
+    (called if callable) instead, without cancelling the others.
+    """
+    async def timed(func, *args):
+        started = time.perf_counter()
+        try:
+            return await func(*args)
+        except Exception as e:
+            print(f"❌ {func.__name__} failed: {e}")
+            return default() if callable(default) else default
+        finally:
+            print(f"⏱️  {func.__name__} finished in {time.perf_counter() - started:.1f}s")
+
+    return await asyncio.gather(*(timed(*job) for job in jobs))
+
+async def first_match(probe, candidates):
+    """Probe every candidate at once and return the first that gives a result
+
+    probe(candidate) is awaited for all candidates concurrently. The first one
+    to return a truthy value wins (ties go to the earlier candidate) and the
+    probes still running are cancelled. Returns (candidate, result), or
+    (None, None) if every probe failed or came back empty.
+    """
+    order = {candidate: i for i, candidate in enumerate(candidates)}
+    tasks = {asyncio.create_task(probe(candidate)): candidate for candidate in candidates}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda t: order[tasks[t]]):
+                if task.exception() is None and task.result():
+                    return tasks[task], task.result()
+        return None, None
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+# Fast navigation
+
+def site_domain(url_or_host):
+    """Registrable part of a host, e.g. 'static.espncricinfo.com' -> 'espncricinfo.com'"""
+    host = urlsplit(url_or_host).hostname if '//' in url_or_host else url_or_host
+    parts = (host or '').lower().split('.')
+    return '.'.join(parts[-2:])
+
+class FastNavigation:
+    """Page loads with request blocking and selector-based waits
+
+    When enabled, install() routes every request on the browser context:
+    images, fonts, stylesheets and media are aborted, as is anything from a
+    host outside the first-party domains. goto() then waits only for the DOM
+    and the target selector instead of network idle plus a fixed sleep.
+
+    Every goto() records bytes loaded, requests blocked and elapsed time per
+    URL in data/navigation_stats.json under the mode used. Savings are the
+    difference from the same URL's last full-mode load (run once with fast
+    mode off to record that baseline).
+    """
+
+    def __init__(self, enabled=FAST_MODE, first_party=(), stats_path=NAV_STATS_PATH):
+        self.enabled = enabled
+        self.first_party = {site_domain(d) for d in first_party}
+        self.stats_path = stats_path
+        self.stats = self._load_stats()
+        self._counters = {}
+
+    @property
+    def mode(self):
+        return 'fast' if self.enabled else 'full'
+
+    def _load_stats(self):
+        try:
+            with open(self.stats_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.stats_path), exist_ok=True)
+        with open(self.stats_path, 'w') as f:
+            json.dump(self.stats, f, indent=2)
+
+    async def install(self, context):
+        context.on('requestfinished', self._on_finished)
+        if self.enabled:
+            await context.route('**/*', self._on_route)
+
+    def should_block(self, request):
+        if request.resource_type in BLOCKED_RESOURCE_TYPES:
+            return True
+        if self.first_party and request.resource_type != 'document':
+            return site_domain(request.url) not in self.first_party
+        return False
+
+    def _counter(self, request):
+        try:
+            return self._counters.get(request.frame.page)
+        except Exception:
+            return None
+
+    async def _on_route(self, route):
+        if self.should_block(route.request):
+            counter = self._counter(route.request)
+            if counter is not None:
+                counter['blocked'] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _on_finished(self, request):
+        counter = self._counter(request)
+        if counter is None:
+            return
+        try:
+            sizes = await request.sizes()
+            counter['bytes'] += sizes['responseBodySize'] + sizes['responseHeadersSize']
+        except Exception:
+            pass
+
+    async def goto(self, page, url, selector=None, timeout=30000):
+        """Navigate and wait until the page is usable; raises on timeout"""
+        counter = self._counters[page] = {'bytes': 0, 'blocked': 0}
+        started = time.perf_counter()
+        try:
+            if self.enabled:
+                await page.goto(url, wait_until='domcontentloaded', timeout=timeout)
+                if selector:
+                    await page.wait_for_selector(selector, state='attached', timeout=timeout)
+            else:
+                await page.goto(url, wait_until='networkidle', timeout=timeout)
+                await page.wait_for_timeout(2000)
+        finally:
+            self._counters.pop(page, None)
+        self._record(url, counter, time.perf_counter() - started)
+
+    def _record(self, url, counter, seconds):
+        entry = {'bytes': counter['bytes'], 'blocked': counter['blocked'], 'seconds': round(seconds, 3)}
+        self.stats.setdefault(url, {})[self.mode] = entry
+
+        line = f"   ⚡ {self.mode}: {counter['bytes'] / 1024:,.0f} KB in {seconds:.1f}s"
+        if counter['blocked']:
+            line += f", {counter['blocked']} requests blocked"
+        baseline = self.stats[url].get('full')
+        if self.enabled and baseline:
+            saved_kb = (baseline['bytes'] - counter['bytes']) / 1024
+            saved_s = baseline['seconds'] - seconds
+            line += f" (saved {saved_kb:,.0f} KB, {saved_s:.1f}s vs full load)"
+        print(line)
+
+# Streaming output
+
+class ScrapeOutput:
+    """Scraped records streamed to <directory>/<section>.jsonl as work completes
+
+    Work is done in units (a section, a crawled page) identified by a key.
+    complete(key, records) appends the unit's records and then logs the key as
+    done in checkpoint.jsonl together with the size of every output file, so
+    nothing but the current unit's records is ever held in memory. The crawl
+    frontier is logged there too with queue().
+
+    With resume=True the log of an unfinished run is replayed: done units are
+    reported by is_done(), the URLs queued but not done are in pending(), and
+    each output file is cut back to its size at the last completed unit, which
+    drops any half-written records. A run that called finish() is not resumed.
+
+    Files for sections that get no records in this run are left as they were.
+    """
+
+    def __init__(self, directory, resume=False):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.checkpoint_path = os.path.join(directory, 'checkpoint.jsonl')
+        self.done = set()
+        self.queued = {}
+        self.counts = {}
+        self._files = {}
+
+        offsets = self._replay() if resume else {}
+        if not offsets and not self.done:
+            open(self.checkpoint_path, 'w').close()
+        for section, offset in offsets.items():
+            with open(self.path(section), 'ab') as f:
+                f.truncate(offset)
+        # Sections already started in the resumed run are appended to, not restarted
+        self._started = set(offsets)
+        self._log = open(self.checkpoint_path, 'a', encoding='utf-8')
+
+    def path(self, section):
+        return os.path.join(self.directory, f'{section}.jsonl')
+
+    def _replay(self):
+        """Rebuild state from the checkpoint log; returns the last file offsets"""
+        offsets = {}
+        good = 0
+        try:
+            with open(self.checkpoint_path, 'rb') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        break
+                    good += len(line)
+                    if event.get('finished'):
+                        self.done.clear()
+                        self.queued.clear()
+                        self.counts.clear()
+                        offsets.clear()
+                    elif 'queued' in event:
+                        if event['queued'] not in self.done:
+                            self.queued[event['queued']] = event['depth']
+                    elif 'done' in event:
+                        self.done.add(event['done'])
+                        self.queued.pop(event['done'], None)
+                        offsets.update(event['offsets'])
+                        for section, count in event['counts'].items():
+                            self.counts[section] = self.counts.get(section, 0) + count
+        except OSError:
+            return offsets
+        # Drop a line torn by a crash so new events start on a line of their own
+        with open(self.checkpoint_path, 'ab') as f:
+            f.truncate(good)
+        if self.done:
+            print(f"⏯️  Resuming: {len(self.done)} units done, {len(self.queued)} URLs pending")
+        return offsets
+
+    def _file(self, section):
+        f = self._files.get(section)
+        if f is None:
+            mode = 'a' if section in self._started else 'w'
+            f = self._files[section] = open(self.path(section), mode, encoding='utf-8')
+        return f
+
+    def _event(self, event):
+        self._log.write(json.dumps(event) + '\n')
+        self._log.flush()
+
+    def is_done(self, key):
+        return key in self.done
+
+    def pending(self):
+        """(url, depth) pairs queued by the resumed run but never completed"""
+        return list(self.queued.items())
+
+    def queue(self, url, depth):
+        self.queued[url] = depth
+        self._event({'queued': url, 'depth': depth})
+
+    def complete(self, key, records):
+        """Write {section: [record, ...]} for one unit of work and mark it done"""
+        offsets = {}
+        counts = {}
+        for section, rows in records.items():
+            f = self._file(section)
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+            f.flush()
+            offsets[section] = f.tell()
+            counts[section] = len(rows)
+            self.counts[section] = self.counts.get(section, 0) + len(rows)
+        self._event({'done': key, 'offsets': offsets, 'counts': counts})
+        self.done.add(key)
+        self.queued.pop(key, None)
+
+    def finish(self):
+        """Mark the run complete so a later --resume starts over"""
+        self._event({'finished': True})
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        self._log.close()
+
+# Crawling
+
+# Links to these are never pages worth opening
+SKIPPED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.pdf',
+                      '.zip', '.css', '.js', '.xml', '.json', '.mp4')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def normalize_url(url, base=None):
+    """Canonical form of a link for deduplication, or None if it is not a crawlable page
+
+    Resolves it against base, lowercases scheme and host, drops default ports,
+    fragments, utm_* parameters and trailing slashes, and sorts the query.
+    """
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(url.strip())
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return None
+    path = parts.path or '/'
+    if path.lower().endswith(SKIPPED_EXTENSIONS):
+        return None
+    if len(path) > 1:
+        path = path.rstrip('/')
+    host = parts.hostname
+    if parts.port and parts.port != DEFAULT_PORTS[parts.scheme]:
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not k.startswith('utm_')))
+    return urlunsplit((parts.scheme, host, path, query, ''))
+
+class HostRateLimiter:
+    """Space out requests to each host to at most `per_second` a second"""
+
+    def __init__(self, per_second):
+        self.interval = 1 / per_second if per_second > 0 else 0
+        self._next = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).hostname
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        await asyncio.sleep(slot - now)
+
+class Crawler:
+    """Breadth-first crawl with a shared frontier and a fixed number of workers
+
+    visit(url, depth) opens a page, handles it and returns the hrefs found on
+    it. Links are normalized and deduplicated, kept to the allowed domains,
+    and followed until max_depth. At most max_pages URLs are ever queued, and
+    if time_budget seconds pass the crawl stops with whatever it has.
+    on_queue(url, depth) is called for every URL added to the frontier.
+    """
+
+    def __init__(self, visit, workers=DEFAULT_POOL_SIZE, max_depth=2, max_pages=200,
+                 rate=2.0, allowed_domains=(), time_budget=None, on_queue=None):
+        self.visit = visit
+        self.on_queue = on_queue
+        self.workers = max(1, workers)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.limiter = HostRateLimiter(rate)
+        self.allowed = {site_domain(d) for d in allowed_domains}
+        self.time_budget = time_budget
+        self.seen = set()
+        self.stats = {'visited': 0, 'failed': 0, 'over_budget': 0}
+        self._queue = asyncio.Queue()
+
+    def mark_seen(self, url):
+        """Treat url as already crawled, e.g. the page the seeds came from"""
+        url = normalize_url(url)
+        if url:
+            self.seen.add(url)
+
+    def enqueue(self, url, depth, base=None):
+        url = normalize_url(url, base)
+        if url is None or url in self.seen or depth > self.max_depth:
+            return
+        if self.allowed and site_domain(url) not in self.allowed:
+            return
+        if len(self.seen) >= self.max_pages:
+            self.stats['over_budget'] += 1
+            return
+        self.seen.add(url)
+        self._queue.put_nowait((url, depth))
+        if self.on_queue is not None:
+            self.on_queue(url, depth)
+
+    async def _worker(self):
+        while True:
+            url, depth = await self._queue.get()
+            try:
+                await self.limiter.wait(url)
+                links = await self.visit(url, depth)
+                self.stats['visited'] += 1
+                for link in links or ():
+                    self.enqueue(link, depth + 1, base=url)
+            except Exception as e:
+                self.stats['failed'] += 1
+                print(f"   ⚠️  {url}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def run(self, seeds, depth=0, base=None, pending=()):
+        """Crawl from seeds (at the given depth) until the frontier is empty; returns stats
+
+        pending holds (url, depth) pairs left over from an interrupted crawl.
+        """
+        for url, url_depth in pending:
+            self.enqueue(url, url_depth)
+        for url in seeds:
+            self.enqueue(url, depth, base)
+
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await asyncio.wait_for(self._queue.join(), self.time_budget)
+        except asyncio.TimeoutError:
+            print(f"⏱️  Crawl time budget of {self.time_budget}s used up, stopping")
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return self.stats
+
+# Batched DOM extraction
+#
+# Each helper pulls everything it needs in a single page.evaluate call, instead
+# of one CDP round trip per element and per cell. Values come back as trimmed
+# strings; typed parsing happens in Python with parse_int/parse_float.
+
+ROWS_JS = """([rowSelector, cellSelector]) =>
+    Array.from(document.querySelectorAll(rowSelector)).map(row =>
+        Array.from(row.querySelectorAll(cellSelector)).map(cell => cell.innerText.trim()))
+"""
+
+CARDS_JS = """([selector, fields, htmlLimit]) =>
+    Array.from(document.querySelectorAll(selector)).map(card => {
+        const out = {text: card.innerText.trim()};
+        for (const [name, fieldSelector] of Object.entries(fields)) {
+            const el = card.querySelector(fieldSelector);
+            out[name] = el ? el.innerText.trim() : null;
+        }
+        if (htmlLimit > 0) out.html = card.innerHTML.slice(0, htmlLimit);
+        return out;
+    })
+"""
+
+LINKS_JS = """(selector) =>
+    Array.from(document.querySelectorAll(selector))
+        .filter(a => a.getAttribute('href'))
+        .map(a => ({text: a.innerText.trim(), href: a.getAttribute('href')}))
+"""
+
+async def extract_rows(page, row_selector='table tbody tr', cell_selector='td'):
+    """Return every matching row as a list of cell texts"""
+    return await page.evaluate(ROWS_JS, [row_selector, cell_selector])
+
+async def extract_cards(page, selector, fields=None, html_limit=0):
+    """Return one dict per card: its text, each field selector's text, optional html"""
+    return await page.evaluate(CARDS_JS, [selector, fields or {}, html_limit])
+
+async def extract_links(page, selector='a'):
+    """Return [{'text', 'href'}] for every link with an href"""
+    return await page.evaluate(LINKS_JS, selector)
+
+def parse_int(text, default=0):
+    """Parse scraped integers such as '1,024', '90*' or '-'"""
+    try:
+        return int(str(text).replace(',', '').rstrip('*').strip())
+    except (TypeError, ValueError):
+        return default
+
+def parse_float(text, default=0.0):
+    try:
+        return float(str(text).replace(',', '').strip())
+    except (TypeError, ValueError):
+        return default
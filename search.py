@@ -0,0 +1,99 @@
+"""
+Cricket Analytics - Player Search
+Typeahead index over player names, held in memory per worker
+"""
+
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+def normalize(text):
+    """Lower-case words of text with diacritics removed: "José Núñez" -> ["jose", "nunez"]"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    words = ''.join(ch if ch.isalnum() else ' ' for ch in stripped.casefold())
+    return words.split()
+
+class PlayerIndex:
+    """Distinct player names from several tables, searchable by word prefix
+
+    Every word of every name is kept in one sorted list of (word, name id),
+    so the names with a word starting with a prefix are one contiguous slice
+    found by binary search. A query is answered from the slice of its most
+    selective word, checking the other words against each candidate, and
+    stops as soon as it has enough names; short, common prefixes are as
+    cheap as rare ones.
+
+    The id -> name rows loaded from each source are kept, so callers can
+    add only rows with higher ids and reset when stored rows changed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.generation = None
+        self.names = []         # name id -> display name
+        self.ids = {}           # display name -> name id
+        self.words = []         # name id -> normalized words
+        self.entries = []       # sorted (word, name id)
+        self.sources = {}       # source -> {row id: player name}
+
+    def loaded(self, source):
+        """Rows indexed from source, as {row id: player name}"""
+        return self.sources.setdefault(source, {})
+
+    def last_id(self, source):
+        return max(self.loaded(source), default=0)
+
+    def add(self, source, rows):
+        """Index (id, player_name) rows of a source with ids above those already loaded"""
+        loaded = self.loaded(source)
+        fresh = []
+        for row_id, name in rows:
+            loaded[row_id] = name
+            if not name or name in self.ids:
+                continue
+            name_id = len(self.names)
+            self.ids[name] = name_id
+            self.names.append(name)
+            self.words.append(normalize(name))
+            fresh.extend((word, name_id) for word in set(self.words[name_id]))
+
+        # Small increments are inserted in place, large ones merged by a sort
+        if len(fresh) < 1000:
+            for entry in fresh:
+                insort(self.entries, entry)
+        else:
+            self.entries.extend(fresh)
+            self.entries.sort()
+
+    def _span(self, prefix):
+        lo = bisect_left(self.entries, (prefix,))
+        hi = bisect_left(self.entries, (prefix + '\U0010ffff',))
+        return lo, hi
+
+    def search(self, query, limit=10):
+        """Names with a word starting with each word of query, in word order"""
+        prefixes = normalize(query)
+        if not prefixes:
+            return []
+        spans = sorted(((self._span(p), p) for p in prefixes),
+                       key=lambda item: item[0][1] - item[0][0])
+        (lo, hi), _ = spans[0]
+        others = [p for _, p in spans[1:]]
+
+        found = []
+        seen = set()
+        for i in range(lo, hi):
+            name_id = self.entries[i][1]
+            if name_id in seen:
+                continue
+            seen.add(name_id)
+            words = self.words[name_id]
+            if all(any(word.startswith(p) for word in words) for p in others):
+                found.append(self.names[name_id])
+                if len(found) == limit:
+                    break
+        return found
@@ -0,0 +1,171 @@
+"""
+Cricket Analytics - Atomic Data Publishing
+Runs an import against a shadow copy of the database and publishes it in one rename
+"""
+
+import os
+import fcntl
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine
+
+from app import app, db
+from database import install_engine_profile
+
+PUBLISH_TIMEOUT = 60
+
+# The shadow is thrown away if the import dies, so it can skip syncing to disk
+SHADOW_PRAGMAS = dict(app.config['SQLITE_PRAGMAS'], synchronous='off')
+
+class Stage:
+    """Handle yielded by staged_import(); clear .changed to skip publishing"""
+    def __init__(self):
+        self.changed = True
+
+def sqlite_path(engine):
+    """Filesystem path of a file-backed SQLite engine, else None"""
+    url = engine.url
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    return url.database
+
+@contextmanager
+def import_lock(path):
+    """Serialise imports so two runs never build from the same snapshot"""
+    with open(path + '.import.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def copy_database(source_path, target_path, timeout=PUBLISH_TIMEOUT):
+    """Copy one SQLite database to a new file with the online backup API
+
+    The copy reads one consistent snapshot of the source, and with the live
+    database in WAL mode its readers keep reading while it runs.
+    """
+    source = sqlite3.connect(source_path, timeout=timeout)
+    target = sqlite3.connect(target_path, timeout=timeout)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def snapshot_files(live_path):
+    """Snapshot files of a live database, oldest first"""
+    directory, name = os.path.split(live_path)
+    prefix = name + '.snapshot-'
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory or '.')
+                  if f.startswith(prefix) and f[len(prefix):].isdigit())
+
+def publish(shadow_path, live_path):
+    """Point the live path at the shadow in one rename
+
+    The live path becomes a symlink to the snapshot file. Connections already
+    open keep reading the file they opened, and SQLite names the WAL after
+    the link's target, so the two files never share one. Pooled connections
+    move to the new file at their next checkout (database.install_engine_profile).
+    """
+    fd = os.open(shadow_path, os.O_RDONLY)
+    try:
+        # The shadow was written with synchronous=off
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    link = shadow_path + '.link'
+    os.symlink(os.path.basename(shadow_path), link)
+    os.replace(link, live_path)
+    directory = os.open(os.path.dirname(live_path) or '.', os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+def remove_old_snapshots(live_path, keep=2):
+    """Delete all but the newest snapshots; the previous one may still be being read"""
+    for path in snapshot_files(live_path)[:-keep]:
+        for name in (path, path + '-wal', path + '-shm'):
+            if os.path.exists(name):
+                os.remove(name)
+
+def data_version(conn):
+    return conn.execute('PRAGMA data_version').fetchone()[0]
+
+@contextmanager
+def staged_import():
+    """Run the body's db.session work against a shadow copy, then publish it
+
+    The live database is copied to a new snapshot file and the app's default
+    engine is pointed at the copy for the duration of the block, so the
+    import holds no locks on the live file and readers keep serving the
+    previous snapshot. When the block finishes, the session is committed and
+    the live path is switched to the snapshot by one rename. If the block
+    raises, the shadow is discarded and the live data is untouched.
+
+    Nothing else may write to the live database during the block: the
+    snapshot replaces it whole. Writers that go through import_lock()
+    (imports, migrations) wait their turn, and a write by anything else is
+    detected before publishing and fails the import instead of being lost.
+
+    On server databases (PostgreSQL) a single transaction already gives readers
+    the previous snapshot until commit, so the block just runs in one.
+
+    Set stage.changed = False inside the block when nothing was written, and
+    the shadow is dropped without touching the live file.
+    """
+    live_engine = db.engine
+    live_path = sqlite_path(live_engine)
+    stage = Stage()
+    if live_path is None:
+        try:
+            yield stage
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return
+
+    shadow_path = f'{live_path}.snapshot-{time.time_ns()}'
+    engines = db.engines
+    published = False
+    with import_lock(live_path):
+        watch = sqlite3.connect(live_path, timeout=PUBLISH_TIMEOUT)
+        try:
+            version = data_version(watch)
+            copy_database(live_path, shadow_path)
+
+            db.session.remove()
+            shadow_engine = create_engine('sqlite:///' + shadow_path)
+            install_engine_profile(shadow_engine, SHADOW_PRAGMAS)
+            # db.engines is the per-app engine map Flask-SQLAlchemy's session binds through
+            engines[None] = shadow_engine
+            try:
+                yield stage
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+                engines[None] = live_engine
+                shadow_engine.dispose()
+
+            if stage.changed:
+                if data_version(watch) != version:
+                    raise RuntimeError(f"{live_path} was written to during the import; "
+                                       f"nothing was published, run the import again")
+                started = time.perf_counter()
+                publish(shadow_path, live_path)
+                published = True
+                print(f"🔄 Published new data snapshot in {time.perf_counter() - started:.2f}s")
+                remove_old_snapshots(live_path)
+        finally:
+            watch.close()
+            if not published:
+                for path in (shadow_path, shadow_path + '-wal', shadow_path + '-shm'):
+                    if os.path.exists(path):
+                        os.remove(path)
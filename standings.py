@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Cricket Analytics - Points Table
+Keeps the standing table in step with bbl_match using SQLite triggers
+
+There is one points table per league and season. Every insert, update or
+delete of a match row subtracts the old row's contribution and adds the
+new one for both teams in that row's season, so the table is never
+recomputed as a whole. rebuild() recomputes it from scratch and verify()
+compares the two, for checking the triggers against the match data.
+
+Usage:
+    python standings.py verify    # compare the table with a full recompute
+    python standings.py rebuild   # recompute the table from every match
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import text
+
+WIN_POINTS = 2
+NO_RESULT_POINTS = 1
+# Legal balls in a full innings; a side bowled out is charged the full quota for NRR
+INNINGS_BALLS = 120
+
+TRIGGER_COLUMNS = ('team1', 'team2', 'result', 'winner', 'runs1', 'wickets1', 'balls1',
+                   'runs2', 'wickets2', 'balls2')
+
+# Columns identifying a row of the points table
+KEY_COLUMNS = ('league', 'season', 'team')
+
+COUNT_COLUMNS = ('played', 'won', 'lost', 'no_result', 'points',
+                 'runs_for', 'balls_for', 'runs_against', 'balls_against')
+
+NRR = ('CASE WHEN balls_for > 0 AND balls_against > 0 '
+       'THEN runs_for * 6.0 / balls_for - runs_against * 6.0 / balls_against ELSE 0 END')
+
+def contribution(row, us, them, sign=1):
+    """Expressions for one team's share of a match row, as (*KEY_COLUMNS, *COUNT_COLUMNS)
+
+    row is the alias of the match row (NEW, OLD or a table alias); us and
+    them are 1 or 2. Also returns the WHERE condition for a counted match:
+    one with a winner from either side, or one recorded as no result.
+    """
+    decided = f"{row}.winner IN ({row}.team1, {row}.team2)"
+    no_result = (f"NOT ({decided}) AND (lower({row}.result) LIKE '%no result%' "
+                 f"OR lower({row}.result) LIKE '%abandon%' "
+                 f"OR lower({row}.winner) IN ('no result', 'abandoned'))")
+
+    def flag(condition):
+        return f"CASE WHEN {condition} THEN {sign} ELSE 0 END"
+
+    def if_decided(value):
+        return f"CASE WHEN {decided} THEN {sign} * ({value}) ELSE 0 END"
+
+    def balls(side):
+        return (f"CASE WHEN {row}.wickets{side} >= 10 THEN {INNINGS_BALLS} "
+                f"ELSE COALESCE({row}.balls{side}, {INNINGS_BALLS}) END")
+
+    columns = [
+        f"{row}.league",
+        f"{row}.season",
+        f"{row}.team{us}",
+        f"{sign}",
+        flag(f"{row}.winner = {row}.team{us}"),
+        flag(f"{row}.winner = {row}.team{them}"),
+        flag(no_result),
+        f"CASE WHEN {row}.winner = {row}.team{us} THEN {sign * WIN_POINTS} "
+        f"WHEN {no_result} THEN {sign * NO_RESULT_POINTS} ELSE 0 END",
+        if_decided(f"COALESCE({row}.runs{us}, 0)"),
+        if_decided(balls(us)),
+        if_decided(f"COALESCE({row}.runs{them}, 0)"),
+        if_decided(balls(them)),
+    ]
+    where = f"{row}.team{us} IS NOT NULL AND (({decided}) OR ({no_result}))"
+    return columns, where
+
+def apply_statements(row, sign):
+    """Statements adding (sign=1) or removing (sign=-1) a match row's contribution"""
+    names = ', '.join(KEY_COLUMNS + COUNT_COLUMNS)
+    keys = ', '.join(KEY_COLUMNS)
+    updates = ', '.join(f"{c} = {c} + excluded.{c}" for c in COUNT_COLUMNS)
+    statements = []
+    for us, them in ((1, 2), (2, 1)):
+        columns, where = contribution(row, us, them, sign)
+        statements.append(
+            f"INSERT INTO standing ({names}) SELECT {', '.join(columns)} WHERE {where} "
+            f"ON CONFLICT ({keys}) DO UPDATE SET {updates};"
+        )
+    teams = (f"league = {row}.league AND season = {row}.season "
+             f"AND team IN ({row}.team1, {row}.team2)")
+    statements.append(f"DELETE FROM standing WHERE played <= 0 AND {teams};")
+    statements.append(f"UPDATE standing SET nrr = {NRR} WHERE {teams};")
+    return statements
+
+def trigger_ddl():
+    """CREATE TRIGGER statements keeping standing in step with bbl_match"""
+    watched = ', '.join(TRIGGER_COLUMNS)
+    bodies = {
+        'standing_match_insert': ('AFTER INSERT ON bbl_match', apply_statements('NEW', 1)),
+        'standing_match_delete': ('AFTER DELETE ON bbl_match', apply_statements('OLD', -1)),
+        'standing_match_update': (f'AFTER UPDATE OF {watched} ON bbl_match',
+                                  apply_statements('OLD', -1) + apply_statements('NEW', 1)),
+    }
+    return {name: f"CREATE TRIGGER {name} {event} FOR EACH ROW BEGIN\n    "
+                  + '\n    '.join(statements) + '\nEND'
+            for name, (event, statements) in bodies.items()}
+
+def install_triggers(conn):
+    """(Re)create the triggers; returns False on databases other than SQLite"""
+    if conn.dialect.name != 'sqlite':
+        print("⚠️  Standings triggers only support SQLite; run `python standings.py rebuild` after imports")
+        return False
+    for name, ddl in trigger_ddl().items():
+        conn.execute(text(f'DROP TRIGGER IF EXISTS {name}'))
+        conn.execute(text(ddl))
+    return True
+
+def recomputed_query():
+    """SELECT of every season's points table computed directly from bbl_match"""
+    sides = []
+    for us, them in ((1, 2), (2, 1)):
+        columns, where = contribution('m', us, them)
+        named = ', '.join(f"{expr} AS {name}" for expr, name in zip(columns, KEY_COLUMNS + COUNT_COLUMNS))
+        sides.append(f"SELECT {named} FROM bbl_match m WHERE {where}")
+    sums = ', '.join(f"SUM({name}) AS {name}" for name in COUNT_COLUMNS)
+    keys = ', '.join(KEY_COLUMNS)
+    return f"SELECT {keys}, {sums} FROM ({' UNION ALL '.join(sides)}) AS sides GROUP BY {keys}"
+
+def rebuild(conn):
+    """Replace the table with a full recompute; returns the number of rows"""
+    names = ', '.join(KEY_COLUMNS + COUNT_COLUMNS)
+    conn.execute(text('DELETE FROM standing'))
+    conn.execute(text(f"INSERT INTO standing ({names}) {recomputed_query()}"))
+    conn.execute(text(f"UPDATE standing SET nrr = {NRR}"))
+    return conn.execute(text('SELECT COUNT(*) FROM standing')).scalar()
+
+def verify(conn):
+    """Rows differing from a full recompute, as ((league, season, team), stored, expected)"""
+    names = KEY_COLUMNS + COUNT_COLUMNS
+    width = len(KEY_COLUMNS)
+    stored = {tuple(row[:width]): tuple(row[width:])
+              for row in conn.execute(text(f"SELECT {', '.join(names)} FROM standing"))}
+    expected = {tuple(row[:width]): tuple(row[width:]) for row in conn.execute(text(recomputed_query()))}
+    return [(key, stored.get(key), expected.get(key))
+            for key in sorted(set(stored) | set(expected))
+            if stored.get(key) != expected.get(key)]
+
+def main():
+    from app import app, db
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'verify'
+    with app.app_context(), db.engine.begin() as conn:
+        if command == 'rebuild':
+            print(f"✅ Rebuilt standings for {rebuild(conn)} teams across all seasons")
+        elif command == 'verify':
+            mismatches = verify(conn)
+            for (league, season, team), stored, expected in mismatches:
+                print(f"❌ {league} {season} {team}: stored {stored}, expected {expected}")
+            if mismatches:
+                print(f"\n❌ {len(mismatches)} rows differ; run `python standings.py rebuild`")
+                sys.exit(1)
+            print("✅ Standings match a full recompute")
+        else:
+            print(__doc__)
+            sys.exit(2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Cricket Analytics - Stats Snapshot
+Columnar in-memory copy of the batting, bowling and match tables, held per worker
+"""
+
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+class StatsTable:
+    """One league and season of one table: slotted row records plus sort orders
+
+    Rows are namedtuples in id order, so they carry no per-row __dict__ and
+    templates read them like model objects. Each column is also held as an
+    array, and when the table is built every column gets a dense rank per
+    row and the row order ascending by (value, id). A leaderboard or a
+    sorted page is a slice of that order; descending is the same order
+    reversed, which puts NULLs last and ties in descending id, exactly as
+    SQLite's ORDER BY column DESC, id DESC would.
+    """
+
+    def __init__(self, record, rows):
+        self.record = record
+        self.rows = rows
+        self.columns = {}
+        self.ranks = {}
+        self.orders = {}
+        for i, name in enumerate(record._fields):
+            values = np.empty(len(rows), dtype=object)
+            values[:] = [row[i] for row in rows]
+            self.columns[name] = values
+            # None ranks below every value, like NULL in SQLite
+            distinct = sorted({value for value in values if value is not None})
+            position = {value: rank for rank, value in enumerate(distinct, 1)}
+            ranks = np.fromiter((position.get(value, 0) for value in values), dtype=np.int64, count=len(rows))
+            self.ranks[name] = ranks
+            self.orders[name] = np.argsort(ranks, kind='stable')
+        self.ids = np.array(self.columns['id'], dtype=np.int64) if rows else np.empty(0, np.int64)
+        self._folded = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def equals(self, name, value):
+        """Boolean mask of rows whose column equals value"""
+        return self.columns[name] == value
+
+    def contains(self, names, text):
+        """Boolean mask of rows where any of the columns contains text, ignoring case"""
+        text = text.lower()
+        mask = np.zeros(len(self.rows), dtype=bool)
+        for name in names:
+            if name not in self._folded:
+                self._folded[name] = [(value or '').lower() for value in self.columns[name]]
+            mask |= np.fromiter((text in value for value in self._folded[name]), dtype=bool,
+                                count=len(self.rows))
+        return mask
+
+    def ordered(self, keys, where=None):
+        """Row positions sorted by keys, a list of (column, descending) pairs
+
+        Ties fall back to id, in the direction of the last key. A single key
+        uses its precomputed order; several are combined from the ranks.
+        """
+        if len(keys) == 1:
+            name, descending = keys[0]
+            order = self.orders[name][::-1] if descending else self.orders[name]
+        else:
+            descending = keys[-1][1]
+            sort_keys = [-self.ids if descending else self.ids]
+            sort_keys += [-self.ranks[name] if desc else self.ranks[name] for name, desc in reversed(keys)]
+            order = np.lexsort(sort_keys)
+        if where is not None:
+            order = order[where[order]]
+        return order
+
+    def top(self, metric, n=None, descending=True, where=None):
+        """Rows with a value for metric, best first, optionally only where the mask is set"""
+        ranked = self.ranks[metric] > 0
+        where = ranked if where is None else where & ranked
+        order = self.ordered([(metric, descending)], where)
+        return [self.rows[i] for i in (order[:n] if n else order)]
+
+    def first(self, metric, descending=True):
+        rows = self.top(metric, 1, descending)
+        return rows[0] if rows else None
+
+class StatsSnapshot:
+    """Every league and season of the stats tables, rebuilt whenever the data changes
+
+    load() takes each table's rows as plain tuples from one SELECT, so no ORM
+    objects are built; after that every read is served from memory. The
+    tables are small, so a new data generation simply reloads everything.
+
+    Not thread safe on its own; hold .lock while loading.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.generation = None
+        self.tables = {}        # table -> {(league, season): StatsTable}
+        self.records = {}       # table -> namedtuple class of its rows
+        self.metrics = {}       # table -> numeric columns a leaderboard can rank by
+        self._lookups = {}
+
+    def load(self, sources):
+        """Replace every table at once from {table: (columns, rows, metrics)}
+
+        rows are tuples of columns, which must include league and season.
+        Readers holding the old tables keep a consistent copy until they finish.
+        """
+        tables, records, metrics = {}, {}, {}
+        for name, (columns, rows, table_metrics) in sources.items():
+            record = namedtuple(f'{name.title()}Row', columns)
+            partitions = {}
+            for row in rows:
+                row = record._make(row)
+                partitions.setdefault((row.league, row.season), []).append(row)
+            tables[name] = {key: StatsTable(record, partition) for key, partition in partitions.items()}
+            records[name] = record
+            metrics[name] = tuple(table_metrics)
+        self.tables, self.records, self.metrics, self._lookups = tables, records, metrics, {}
+
+    def table(self, name, league, season):
+        """The table's rows for one league and season; empty when there are none"""
+        table = self.tables[name].get((league, season))
+        if table is None:
+            table = StatsTable(self.records[name], [])
+        return table
+
+    def seasons(self, name):
+        """(league, season) pairs with rows in the table"""
+        return list(self.tables[name])
+
+    def lookup(self, name, column, value):
+        """Rows of every season whose column equals value"""
+        key = (name, column)
+        if key not in self._lookups:
+            index = {}
+            for table in self.tables[name].values():
+                for row in table.rows:
+                    index.setdefault(getattr(row, column), []).append(row)
+            self._lookups[key] = index
+        return self._lookups[key].get(value, [])
@@ -0,0 +1,62 @@
+"""
+Shared fixtures: the app pointed at a throwaway database and caches
+
+The environment is set before app.py is imported, so no test ever touches
+data/ in the working tree.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+DATA_DIR = tempfile.mkdtemp(prefix='cricket-tests-')
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(DATA_DIR, 'cricket_data.db'),
+    'RESPONSE_CACHE_PATH': os.path.join(DATA_DIR, 'response_cache.db'),
+    'METRICS_PATH': os.path.join(DATA_DIR, 'metrics.db'),
+    'FREEZE_DIR': os.path.join(DATA_DIR, 'frozen'),
+    'FREEZE_ON_IMPORT': '0',
+    'METRICS_ENABLED': '0',
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, response_cache, Standing  # noqa: E402
+import migrations  # noqa: E402
+
+PARTITION = {'league': 'bbl', 'season': '2024-25'}
+
+@pytest.fixture(scope='session')
+def database():
+    with app.app_context():
+        migrations.upgrade()
+        yield db
+
+@pytest.fixture
+def session(database):
+    """db.session on empty data tables; rolled back and emptied afterwards"""
+    yield database.session
+    database.session.rollback()
+    for table in reversed(database.metadata.sorted_tables):
+        database.session.execute(table.delete())
+    # Deleting matches runs the standings triggers again
+    database.session.execute(Standing.__table__.delete())
+    database.session.commit()
+
+@pytest.fixture
+def client(session):
+    response_cache.clear()
+    yield app.test_client()
+    response_cache.clear()
+
+def batting_row(player, team='Sydney Sixers', runs=100, **values):
+    return {'rank': 1, 'player_name': player, 'team': team, 'matches': 10, 'runs': runs,
+            'average': 25.0, 'strike_rate': 140.0, 'high_score': 60, 'hundreds': 0,
+            'fifties': 1, 'fours': 10, 'sixes': 5, **values}
+
+def match_row(match_no, team1='Sydney Sixers', team2='Perth Scorchers', score1='150/6 (20)',
+              score2='151/4 (18.3)', winner='Perth Scorchers', margin='6 wickets', **values):
+    return {'match_no': match_no, 'date': '2024-12-15', 'venue': 'SCG', 'team1': team1,
+            'score1': score1, 'team2': team2, 'score2': score2, 'result': f'{winner} won',
+            'winner': winner, 'margin': margin, 'player_of_match': 'Someone', **values}
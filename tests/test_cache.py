@@ -0,0 +1,53 @@
+from app import BBLBatting, response_cache, bump_generation
+from import_data import upsert_rows
+
+from conftest import PARTITION, batting_row
+
+URL = '/api/stats/batting'
+
+def lookups():
+    return response_cache.hits, response_cache.misses
+
+def test_repeat_request_is_a_hit(client):
+    hits, misses = lookups()
+    first = client.get(URL)
+    second = client.get(URL)
+    assert first.data == second.data
+    assert lookups() == (hits + 1, misses + 1)
+
+def test_unread_params_share_one_entry(client):
+    client.get(URL)
+    hits, misses = lookups()
+    client.get(URL + '?utm_source=x')
+    client.get(URL + '?page=2&_=123')
+    assert lookups() == (hits + 2, misses)
+
+def test_listed_params_are_part_of_the_key(client):
+    client.get(URL)
+    hits, misses = lookups()
+    client.get(URL + '?season=2023-24')
+    client.get(URL + '?league=wbbl&season=2023-24')
+    client.get(URL + '?season=2023-24')
+    assert lookups() == (hits + 1, misses + 2)
+
+def test_etag_and_conditional_get(client):
+    response = client.get(URL)
+    etag = response.headers['ETag']
+    assert etag.startswith('"gen-')
+    assert response.headers['Last-Modified']
+    assert client.get(URL, headers={'If-None-Match': etag}).status_code == 304
+
+def test_new_generation_changes_etag_and_body(client, session):
+    response = client.get(URL)
+    etag = response.headers['ETag']
+
+    # Give back the connection the request left read-only, as its app context would
+    session.rollback()
+    upsert_rows(BBLBatting, [batting_row('New Player', runs=999)], PARTITION)
+    bump_generation()
+    session.commit()
+
+    changed = client.get(URL, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['labels'][0] == 'New Player'
@@ -0,0 +1,50 @@
+from app import BBLBatting
+from import_data import RowFile, upsert_rows, format_counts
+
+from conftest import PARTITION, batting_row
+
+def stored(session):
+    return {row.player_name: row.runs for row in session.query(BBLBatting).filter_by(**PARTITION)}
+
+def test_insert_then_unchanged(session):
+    rows = [batting_row('A'), batting_row('B')]
+    assert upsert_rows(BBLBatting, rows, PARTITION) == {
+        'inserted': 2, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'repeated': 0}
+    assert upsert_rows(BBLBatting, rows, PARTITION) == {
+        'inserted': 0, 'updated': 0, 'unchanged': 2, 'deleted': 0, 'repeated': 0}
+    assert stored(session) == {'A': 100, 'B': 100}
+
+def test_update_and_insert_in_one_file(session):
+    upsert_rows(BBLBatting, [batting_row('A'), batting_row('B')], PARTITION)
+    counts = upsert_rows(BBLBatting, [batting_row('A', runs=150), batting_row('B'), batting_row('C')],
+                         PARTITION)
+    assert (counts['inserted'], counts['updated'], counts['unchanged']) == (1, 1, 1)
+    assert stored(session) == {'A': 150, 'B': 100, 'C': 100}
+
+def test_prune_deletes_only_missing_keys_of_the_partition(session):
+    upsert_rows(BBLBatting, [batting_row('A'), batting_row('B')], PARTITION)
+    other = {'league': 'wbbl', 'season': '2024-25'}
+    upsert_rows(BBLBatting, [batting_row('B')], other)
+
+    counts = upsert_rows(BBLBatting, [batting_row('A')], PARTITION, prune=True)
+    assert (counts['unchanged'], counts['deleted']) == (1, 1)
+    assert stored(session) == {'A': 100}
+    assert session.query(BBLBatting).filter_by(**other).count() == 1
+
+def test_same_player_in_two_teams_is_two_keys(session):
+    rows = [batting_row('A', team='Sydney Sixers'), batting_row('A', team='Perth Scorchers')]
+    assert upsert_rows(BBLBatting, rows, PARTITION)['inserted'] == 2
+
+def test_repeated_key_is_counted_once_and_last_row_wins(session):
+    rows = [batting_row('A', runs=10), batting_row('B'), batting_row('A', runs=30)]
+    counts = upsert_rows(BBLBatting, rows, PARTITION, chunk_size=1)
+    assert counts == {'inserted': 2, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'repeated': 1}
+    assert stored(session) == {'A': 30, 'B': 100}
+    assert format_counts(counts).endswith('(1 repeated keys, last row kept)')
+
+def test_row_file_is_read_for_keys_and_rows(session, tmp_path):
+    path = tmp_path / 'batting.csv'
+    path.write_text('player_name,team,runs\nA,Sydney Sixers,10\nA,Sydney Sixers,20\n')
+    counts = upsert_rows(BBLBatting, RowFile(str(path)), PARTITION)
+    assert (counts['inserted'], counts['repeated']) == (1, 1)
+    assert stored(session) == {'A': 20}
@@ -0,0 +1,66 @@
+import os
+import time
+
+import pytest
+
+from page_cache import PageCache
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PageCache(str(tmp_path), ttl=60, max_bytes=250)
+    yield cache
+    cache.close()
+
+def objects(cache):
+    return sorted(os.listdir(cache.objects))
+
+def test_identical_bodies_are_stored_once(cache):
+    a = cache.store('https://example.com/a', 'x' * 100)
+    b = cache.store('https://example.com/b', 'x' * 100)
+    assert a == b
+    assert objects(cache) == [a]
+    assert cache.total == 100
+
+def test_replaced_body_is_deleted(cache):
+    old = cache.store('https://example.com/a', 'x' * 100)
+    new = cache.store('https://example.com/a', 'y' * 100)
+    assert objects(cache) == [new]
+    assert old != new
+    assert cache.total == 100
+
+def test_shared_body_survives_replacement(cache):
+    shared = cache.store('https://example.com/a', 'x' * 100)
+    cache.store('https://example.com/b', 'x' * 100)
+    cache.store('https://example.com/a', 'y' * 100)
+    assert shared in objects(cache)
+    assert cache.total == 200
+
+def test_least_recently_used_body_is_evicted(cache):
+    cache.store('https://example.com/a', 'a' * 100)
+    time.sleep(0.01)
+    cache.store('https://example.com/b', 'b' * 100)
+    time.sleep(0.01)
+    cache.read(cache.lookup('https://example.com/a'))
+    time.sleep(0.01)
+    cache.store('https://example.com/c', 'c' * 100)
+
+    assert cache.lookup('https://example.com/b') is None
+    assert cache.lookup('https://example.com/a') is not None
+    assert cache.lookup('https://example.com/c') is not None
+    assert len(objects(cache)) == 2
+    assert cache.total == 200
+
+def test_total_is_recomputed_on_open(cache, tmp_path):
+    cache.store('https://example.com/a', 'a' * 100)
+    cache.store('https://example.com/b', 'a' * 100)
+    cache.store('https://example.com/c', 'c' * 50)
+    reopened = PageCache(str(tmp_path), max_bytes=250)
+    assert reopened.total == cache.total == 150
+    reopened.close()
+
+def test_processed_hash(cache):
+    sha = cache.store('https://example.com/a', 'a')
+    assert not cache.is_processed('https://example.com/a', sha)
+    cache.mark_processed([('https://example.com/a', sha)])
+    assert cache.is_processed('https://example.com/a', sha)
+    assert not cache.is_processed('https://example.com/a', cache.store('https://example.com/a', 'b'))
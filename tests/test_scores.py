@@ -0,0 +1,37 @@
+import pytest
+
+from scores import parse_score, parse_margin
+
+@pytest.mark.parametrize('text, expected', [
+    ('133/9 (20)', (133, 9, 120)),
+    ('135/6 (18.3 ov)', (135, 6, 111)),
+    ('135/6 (18.3 overs)', (135, 6, 111)),
+    (' 88 / 2 ( 9.4 ) ', (88, 2, 58)),
+    ('98 (17.2)', (98, 10, 104)),
+    ('98', (98, 10, None)),
+    ('180/4', (180, 4, None)),
+    # Australian wickets/runs order
+    ('9/133 (20)', (133, 9, 120)),
+    # Only an impossible wicket count is swapped
+    ('0/5 (1)', (0, 5, 6)),
+    ('10/10 (5)', (10, 10, 30)),
+    ('TBD', (None, None, None)),
+    ('', (None, None, None)),
+    (None, (None, None, None)),
+])
+def test_parse_score(text, expected):
+    assert parse_score(text) == expected
+
+@pytest.mark.parametrize('text, expected', [
+    ('24 runs', (24, None)),
+    ('1 run', (1, None)),
+    ('4 wickets', (None, 4)),
+    ('6 Wkts', (None, 6)),
+    ('won by 7 wickets (with 12 balls remaining)', (None, 7)),
+    ('Tied (Sixers won the Super Over)', (None, None)),
+    ('No result', (None, None)),
+    ('TBD', (None, None)),
+    (None, (None, None)),
+])
+def test_parse_margin(text, expected):
+    assert parse_margin(text) == expected
@@ -0,0 +1,62 @@
+import json
+
+from scraping import ScrapeOutput
+
+def records(output, section):
+    with open(output.path(section)) as f:
+        return [json.loads(line) for line in f]
+
+def test_resume_skips_done_units_and_keeps_pending_urls(tmp_path):
+    output = ScrapeOutput(str(tmp_path))
+    output.queue('https://example.com/a', 1)
+    output.queue('https://example.com/b', 1)
+    output.complete('https://example.com/a', {'batting': [{'player_name': 'A'}]})
+    output.close()
+
+    resumed = ScrapeOutput(str(tmp_path), resume=True)
+    assert resumed.is_done('https://example.com/a')
+    assert resumed.pending() == [('https://example.com/b', 1)]
+    assert resumed.counts == {'batting': 1}
+    resumed.complete('https://example.com/b', {'batting': [{'player_name': 'B'}]})
+    resumed.close()
+    assert [r['player_name'] for r in records(resumed, 'batting')] == ['A', 'B']
+
+def test_resume_drops_records_written_after_the_last_checkpoint(tmp_path):
+    output = ScrapeOutput(str(tmp_path))
+    output.complete('section:batting', {'batting': [{'player_name': 'A'}]})
+    output.close()
+    # A crash mid-unit: a half-written record and a torn checkpoint line
+    with open(output.path('batting'), 'a') as f:
+        f.write('{"player_name": "B"}\n{"player_na')
+    with open(output.checkpoint_path, 'a') as f:
+        f.write('{"done": "section:bow')
+
+    resumed = ScrapeOutput(str(tmp_path), resume=True)
+    assert records(resumed, 'batting') == [{'player_name': 'A'}]
+    resumed.complete('section:bowling', {'bowling': [{'player_name': 'C'}]})
+    resumed.close()
+    with open(output.checkpoint_path) as f:
+        events = [json.loads(line) for line in f]
+    assert [e['done'] for e in events] == ['section:batting', 'section:bowling']
+
+def test_finished_run_is_not_resumed(tmp_path):
+    output = ScrapeOutput(str(tmp_path))
+    output.complete('section:batting', {'batting': [{'player_name': 'A'}]})
+    output.finish()
+    output.close()
+
+    resumed = ScrapeOutput(str(tmp_path), resume=True)
+    assert not resumed.is_done('section:batting')
+    assert resumed.counts == {}
+    resumed.complete('section:batting', {'batting': [{'player_name': 'Z'}]})
+    resumed.close()
+    assert records(resumed, 'batting') == [{'player_name': 'Z'}]
+
+def test_without_resume_starts_over(tmp_path):
+    output = ScrapeOutput(str(tmp_path))
+    output.complete('section:batting', {'batting': [{'player_name': 'A'}]})
+    output.close()
+
+    fresh = ScrapeOutput(str(tmp_path))
+    assert not fresh.is_done('section:batting')
+    fresh.close()
@@ -0,0 +1,46 @@
+from app import BBLMatch, Standing
+import standings
+from import_data import upsert_rows
+
+from conftest import PARTITION, match_row
+
+def table(session):
+    return {row.team: (row.played, row.won, row.lost, row.points)
+            for row in session.query(Standing).filter_by(**PARTITION)}
+
+def test_triggers_follow_insert_update_and_delete(session):
+    conn = session.connection()
+    upsert_rows(BBLMatch, [match_row(1), match_row(2, winner='Sydney Sixers', margin='20 runs',
+                                                     score1='170/5 (20)', score2='150/9 (20)')],
+                PARTITION)
+    assert standings.verify(conn) == []
+    assert table(session) == {'Sydney Sixers': (2, 1, 1, 2), 'Perth Scorchers': (2, 1, 1, 2)}
+
+    # Match 2 is corrected to a no result
+    upsert_rows(BBLMatch, [match_row(1), match_row(2, winner='No result', result='No result',
+                                                     margin=None, score2=None)], PARTITION)
+    assert standings.verify(conn) == []
+    assert table(session) == {'Sydney Sixers': (2, 0, 1, 1), 'Perth Scorchers': (2, 1, 0, 3)}
+
+    # Match 1 is no longer listed
+    upsert_rows(BBLMatch, [match_row(2, winner='No result', result='No result', margin=None,
+                                     score2=None)], PARTITION, prune=True)
+    assert standings.verify(conn) == []
+    assert {team: row[:2] for team, row in table(session).items() if row[0]} == {
+        'Sydney Sixers': (1, 0), 'Perth Scorchers': (1, 0)}
+
+def test_verify_reports_a_stale_row(session):
+    conn = session.connection()
+    upsert_rows(BBLMatch, [match_row(1)], PARTITION)
+    session.query(Standing).filter_by(team='Perth Scorchers').update({'won': 5})
+    [(key, stored, expected)] = standings.verify(conn)
+    assert key == ('bbl', '2024-25', 'Perth Scorchers')
+    assert stored != expected
+
+def test_rebuild_matches_the_triggers(session):
+    conn = session.connection()
+    upsert_rows(BBLMatch, [match_row(1), match_row(2, winner='Sydney Sixers')], PARTITION)
+    before = table(session)
+    standings.rebuild(conn)
+    assert standings.verify(conn) == []
+    assert {team: row for team, row in table(session).items() if row[0]} == before
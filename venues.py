@@ -0,0 +1,143 @@
+"""
+Cricket Analytics - Venue Aggregates
+Normalizes free-text venue names to venue IDs and precomputes per-ground figures
+"""
+
+import re
+
+from sqlalchemy import bindparam, column, table, text
+
+from aggregates import NOT_BOWLER_WICKETS
+
+# Canonical ground -> other names it appears under (compared after venue_key())
+VENUE_ALIASES = {
+    'Melbourne Cricket Ground': ('mcg', 'melbourne'),
+    'Marvel Stadium': ('docklands', 'docklands stadium', 'etihad stadium'),
+    'Sydney Cricket Ground': ('scg', 'sydney'),
+    'Sydney Showground Stadium': ('showground', 'engie stadium', 'giants stadium'),
+    'Adelaide Oval': ('adelaide',),
+    'Bellerive Oval': ('hobart', 'blundstone arena', 'ninja stadium'),
+    'Perth Stadium': ('perth', 'optus stadium'),
+    'The Gabba': ('gabba', 'brisbane', 'brisbane cricket ground'),
+    'Manuka Oval': ('canberra',),
+    'Carrara Stadium': ('gold coast', 'metricon stadium', 'heritage bank stadium'),
+    'Kardinia Park': ('geelong', 'gmhba stadium'),
+}
+
+# Placeholders scrapers write when a venue is missing
+UNKNOWN_VENUES = {'', 'unknown', 'tbd', 'tba'}
+
+TOP_PERFORMERS = 5
+
+# Just the columns assign_venue_ids() updates, for SQL that must run on any database
+MATCH_VENUES = table('bbl_match', column('venue'), column('venue_id'))
+
+def venue_key(name):
+    """Lower-case name without punctuation or a leading "the", for alias matching"""
+    key = re.sub(r'[^a-z0-9]+', ' ', (name or '').lower()).strip()
+    return key[4:] if key.startswith('the ') else key
+
+ALIAS_INDEX = {venue_key(alias): ground
+               for ground, aliases in VENUE_ALIASES.items()
+               for alias in aliases + (ground,)}
+
+def canonical_venue(name):
+    """Canonical ground name for a venue as written in the data, or None if unknown"""
+    key = venue_key(name)
+    if key in UNKNOWN_VENUES:
+        return None
+    return ALIAS_INDEX.get(key, ' '.join((name or '').split()))
+
+def venue_slug(name):
+    return venue_key(name).replace(' ', '-')
+
+def assign_venue_ids(conn):
+    """Create a venue row per canonical ground and point every match at its venue
+
+    Runs one UPDATE per distinct venue string, so the cost follows the number
+    of grounds rather than the number of matches.
+    """
+    ids = dict(conn.execute(text('SELECT slug, id FROM venue')).all())
+    assignments = []
+    for (raw,) in conn.execute(text('SELECT DISTINCT venue FROM bbl_match')).all():
+        name = canonical_venue(raw)
+        venue_id = None
+        if name is not None:
+            slug = venue_slug(name)
+            if slug not in ids:
+                conn.execute(text('INSERT INTO venue (name, slug) VALUES (:name, :slug)'),
+                             {'name': name, 'slug': slug})
+                ids[slug] = conn.execute(text('SELECT id FROM venue WHERE slug = :slug'),
+                                         {'slug': slug}).scalar()
+            venue_id = ids[slug]
+        assignments.append({'new_venue_id': venue_id, 'raw': raw})
+    if assignments:
+        conn.execute(MATCH_VENUES.update()
+                     .where(MATCH_VENUES.c.venue.is_not_distinct_from(bindparam('raw')),
+                            MATCH_VENUES.c.venue_id.is_distinct_from(bindparam('new_venue_id')))
+                     .values(venue_id=bindparam('new_venue_id')), assignments)
+
+def refresh_venue_stats(conn):
+    """Recompute venue_stats from the matches played at each venue, per league and season"""
+    conn.execute(text('DELETE FROM venue_stats'))
+    conn.execute(text(
+        'INSERT INTO venue_stats (league, season, venue_id, matches, results, bat_first_wins, chase_wins, '
+        'first_innings, avg_first_innings, avg_second_innings, highest_total) '
+        'SELECT league, season, venue_id, COUNT(*), '
+        'SUM(CASE WHEN winner IN (team1, team2) THEN 1 ELSE 0 END), '
+        'SUM(CASE WHEN winner = team1 THEN 1 ELSE 0 END), '
+        'SUM(CASE WHEN winner = team2 THEN 1 ELSE 0 END), '
+        'COUNT(runs1), AVG(runs1), AVG(runs2), '
+        'COALESCE(MAX(CASE WHEN runs2 > runs1 THEN runs2 ELSE COALESCE(runs1, runs2) END), 0) '
+        'FROM bbl_match WHERE venue_id IS NOT NULL GROUP BY league, season, venue_id'
+    ))
+
+def refresh_venue_performers(conn, top=TOP_PERFORMERS):
+    """Recompute the leading batters, bowlers and award winners at each venue, per league and season
+
+    Batting and bowling come from ball-by-ball deliveries, and awards from
+    the player of the match column, so a venue without deliveries loaded
+    still lists its award winners.
+    """
+    not_bowler = ', '.join(f"'{kind}'" for kind in sorted(NOT_BOWLER_WICKETS))
+    wide = "COALESCE(d.extra_type, '') = 'wide'"
+    wide_or_noball = "COALESCE(d.extra_type, '') IN ('wide', 'noball')"
+    conceded = f"SUM(COALESCE(d.runs, 0) + CASE WHEN {wide_or_noball} THEN COALESCE(d.extras, 0) ELSE 0 END)"
+    bowler_wickets = (f"SUM(CASE WHEN COALESCE(d.wicket_kind, '') <> '' "
+                      f"AND lower(d.wicket_kind) NOT IN ({not_bowler}) THEN 1 ELSE 0 END)")
+    deliveries = ('delivery d JOIN bbl_match m ON m.league = d.league '
+                  'AND m.season = d.season AND m.match_no = d.match_no')
+
+    # role -> (player, team, runs, balls, wickets, awards, ranking, source, extra condition)
+    rankings = {
+        'batting': ('d.batter', 'MAX(d.batting_team)', 'SUM(d.runs)',
+                    f'SUM(CASE WHEN {wide} THEN 0 ELSE 1 END)', 'NULL', 'NULL',
+                    'SUM(d.runs) DESC, COUNT(*) ASC', deliveries, ''),
+        'bowling': ('d.bowler', 'MAX(d.bowling_team)', conceded,
+                    f'SUM(CASE WHEN {wide_or_noball} THEN 0 ELSE 1 END)', bowler_wickets, 'NULL',
+                    f'{bowler_wickets} DESC, {conceded} ASC', deliveries, ''),
+        'player_of_match': ('m.player_of_match', 'MAX(m.winner)', 'NULL', 'NULL', 'NULL', 'COUNT(*)',
+                            'COUNT(*) DESC', 'bbl_match m',
+                            "AND COALESCE(m.player_of_match, '') NOT IN ('', 'TBD')"),
+    }
+
+    conn.execute(text('DELETE FROM venue_performer'))
+    for role, (player, team, runs, balls, wickets, awards, ranking, source, condition) in rankings.items():
+        conn.execute(text(
+            'INSERT INTO venue_performer (league, season, venue_id, role, rank, player, team, '
+            'runs, balls, wickets, awards) '
+            f"SELECT league, season, venue_id, '{role}', position, player, team, runs, balls, wickets, awards FROM ("
+            f'SELECT m.league, m.season, m.venue_id, {player} AS player, {team} AS team, {runs} AS runs, '
+            f'{balls} AS balls, {wickets} AS wickets, {awards} AS awards, '
+            f'ROW_NUMBER() OVER (PARTITION BY m.league, m.season, m.venue_id '
+            f'ORDER BY {ranking}, {player}) AS position '
+            f'FROM {source} WHERE m.venue_id IS NOT NULL {condition} '
+            f'GROUP BY m.league, m.season, m.venue_id, {player}'
+            ') WHERE position <= :top'
+        ), {'top': top})
+
+def refresh_venues(conn):
+    """Bring venue IDs and every per-venue table up to date; call at import time"""
+    assign_venue_ids(conn)
+    refresh_venue_stats(conn)
+    refresh_venue_performers(conn)